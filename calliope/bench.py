@@ -0,0 +1,363 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+bench.py
+~~~~~~~~
+
+Performance benchmarks. Runs the phases of a model run (initialization,
+data reading, time resolution adjustment, model generation, solving and
+solution processing) on versions of a model scaled along locations,
+technologies and timesteps, and reports wall time and peak memory use
+per phase as JSON that can be compared across commits.
+
+"""
+
+from collections import OrderedDict
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import pandas as pd
+
+from . import core
+from . import utils
+from ._version import __version__
+
+
+PHASES = ['initialize', 'read_data', 'initialize_time', 'generate_model',
+          'solve', 'update_parameters', 'load_solution', 'other']
+
+# Levels of each scaling series, as fractions of the model's locations
+# and technologies and as numbers of days
+SCALING = OrderedDict([
+    ('x', [0.25, 0.5, 1.0]),
+    ('y', [0.25, 0.5, 1.0]),
+    ('t', [7, 14, 28]),
+])
+
+# Number of days used along the series that do not scale timesteps
+BASE_DAYS = 7
+
+CLUSTERING = {
+    'function': 'apply_clustering',
+    'function_options': {'clustering_func': 'get_clusters_kmeans',
+                         'how': 'mean', 'k': 3}
+}
+
+# (mode, time clustering) combinations that are run for every case.
+# Time clustering is not compatible with operational mode.
+VARIANTS = [('plan', False), ('plan', True), ('operate', False)]
+
+
+def _reset_peak():
+    """
+    Reset the traced memory peak and return the amount of memory
+    the new peak is relative to.
+
+    """
+    if hasattr(tracemalloc, 'reset_peak'):  # Python >= 3.9
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+    else:
+        tracemalloc.clear_traces()
+        return 0
+
+
+class PhaseRecorder(object):
+    """
+    Accumulates wall time and peak memory per named phase. Phases may
+    be nested, in which case time is attributed to the innermost one.
+
+    Peak memory is the largest increase of memory allocated by Python
+    over the start of any stretch of time spent in a phase, in MB,
+    as measured by ``tracemalloc``. Memory used by the solver process
+    is not included.
+
+    """
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.phases = OrderedDict()
+        self._stack = []
+        self._start = None
+        self._memory_base = 0
+
+    def _begin(self):
+        self._start = time.perf_counter()
+        if self.track_memory:
+            self._memory_base = _reset_peak()
+
+    def _end(self):
+        if not self._stack:
+            return None
+        result = self.phases.setdefault(
+            self._stack[-1], OrderedDict([('time', 0.0), ('peak_memory', 0.0)])
+        )
+        result['time'] += time.perf_counter() - self._start
+        if self.track_memory:
+            peak = tracemalloc.get_traced_memory()[1] - self._memory_base
+            result['peak_memory'] = max(result['peak_memory'], peak / 2**20)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self._end()
+        self._stack.append(name)
+        self._begin()
+        try:
+            yield
+        finally:
+            self._end()
+            self._stack.pop()
+            self._begin()
+
+
+def _timed(phase, method):
+    def timed_method(self, *args, **kwargs):
+        with self._recorder.phase(phase):
+            return getattr(core.Model, method)(self, *args, **kwargs)
+    timed_method.__name__ = method
+    return timed_method
+
+
+class BenchmarkModel(core.Model):
+    """
+    Model which records the time and memory used by each phase of
+    its initialization and run in ``self.recorder``.
+
+    """
+    def __init__(self, config_run=None, override=None, track_memory=True):
+        self._recorder = PhaseRecorder(track_memory=track_memory)
+        with self._recorder.phase('initialize'):
+            super(BenchmarkModel, self).__init__(config_run, override)
+
+    @property
+    def recorder(self):
+        return self._recorder
+
+    read_data = _timed('read_data', 'read_data')
+    initialize_time = _timed('initialize_time', 'initialize_time')
+    generate_model = _timed('generate_model', 'generate_model')
+    solve = _timed('solve', 'solve')
+    update_parameters = _timed('update_parameters', 'update_parameters')
+    load_solution = _timed('load_solution', 'load_solution')
+    load_solution_iterative = _timed('load_solution',
+                                     'load_solution_iterative')
+    run = _timed('other', 'run')
+
+
+def _copy(config_run):
+    # Models modify run configurations given as AttrDict in place
+    if isinstance(config_run, utils.AttrDict):
+        return config_run.copy()
+    return config_run
+
+
+def _get_subset(items, fraction):
+    n = max(1, int(round(len(items) * fraction)))
+    return items[:n]
+
+
+def get_cases(config_run=None, override=None, quick=False):
+    """
+    Returns a list of benchmark cases, each a dict with a ``name``, the
+    ``scale`` (series and level) and the run configuration ``override``
+    to apply to ``config_run``, in addition to ``override``.
+
+    Each scaling series varies one of locations (``x``), technologies
+    (``y``) or timesteps (``t``), keeping the others at their full size
+    and ``BASE_DAYS`` days of timesteps respectively. Location subsets
+    contain parent locations first and keep only the links between the
+    selected locations. Technology subsets always keep demand
+    technologies and unmet demand.
+
+    If ``quick`` is True, only the smallest level of each series is used.
+
+    """
+    base = core.Model(_copy(config_run), _copy(override))
+    t_start = base._sets['t'][0]
+    # Parent locations first, so that small subsets contain the
+    # locations with demand in typical models
+    levels = base._locations['_level']
+    locations = sorted(base._sets['x'], key=lambda x: (levels[x], x))
+    demand = set(base._sets['y_demand'])
+    techs = sorted(y for y in base._sets['y']
+                   if y not in base._sets['y_trans'] and y not in demand
+                   and not y.startswith('unmet_demand'))
+    kept_techs = sorted(y for y in base._sets['y']
+                        if y in demand or y.startswith('unmet_demand'))
+    links = base.config_model.get_key('links', default=None) or {}
+
+    def subset_t(days):
+        t_end = t_start + pd.Timedelta(days, unit='D') - pd.Timedelta(1, 'h')
+        return [str(t_start), str(t_end)]
+
+    cases = []
+    for series, levels in SCALING.items():
+        if quick:
+            levels = levels[:1]
+        for level in levels:
+            case_override = utils.AttrDict({'subset_t': subset_t(BASE_DAYS)})
+            if series == 'x':
+                subset = _get_subset(locations, level)
+                case_override['subset_x'] = subset
+                kept_links = {k: v for k, v in links.items()
+                              if all(i in subset for i in k.split(','))}
+                if len(kept_links) < len(links):
+                    # Replaced in config_run first, then in config_model
+                    case_override.set_key(
+                        'override.links._REPLACE_._REPLACE_',
+                        kept_links or None
+                    )
+            elif series == 'y':
+                case_override['subset_y'] = (kept_techs
+                                             + _get_subset(techs, level))
+            elif series == 't':
+                case_override['subset_t'] = subset_t(level)
+            cases.append({
+                'name': '{}={}'.format(series, level),
+                'scale': OrderedDict([('series', series), ('level', level)]),
+                'override': case_override,
+            })
+    return cases
+
+
+def run_case(config_run, override, mode='plan', clustering=False,
+             track_memory=True):
+    """
+    Run the model given by ``config_run`` and ``override`` in the given
+    ``mode``, optionally with time clustering, and return a dict with
+    the model size and the time and peak memory of each phase.
+
+    """
+    override = utils.AttrDict(override).copy()
+    override['mode'] = mode
+    if clustering:
+        override['time'] = utils.AttrDict(CLUSTERING)
+    if track_memory:
+        tracemalloc.start()
+    try:
+        model = BenchmarkModel(_copy(config_run), override,
+                               track_memory=track_memory)
+        model.run()
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+    phases = model.recorder.phases
+    if model.backend == 'matrix':
+        n_variables, n_constraints = model.mp.n_cols, model.mp.n_rows
+    else:
+        n_variables = model.m.nvariables()
+        n_constraints = model.m.nconstraints()
+    return OrderedDict([
+        ('size', OrderedDict([
+            ('x', len(model._sets['x'])),
+            ('y', len(model._sets['y'])),
+            ('t', len(model.data['t'])),
+            ('variables', n_variables),
+            ('constraints', n_constraints),
+        ])),
+        ('phases', OrderedDict((p, phases[p]) for p in PHASES if p in phases)),
+        ('total_time', sum(p['time'] for p in phases.values())),
+    ])
+
+
+def _get_git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(config_run=None, override=None, quick=False,
+                   track_memory=True, variants=None, log=None):
+    """
+    Run all benchmark cases for ``config_run`` (by default, the included
+    example model) in each of the ``variants`` (default: ``VARIANTS``),
+    returning a dict suitable for saving as JSON.
+
+    ``override`` is applied to all cases, e.g. to choose a solver or
+    backend. ``log``, if given, is called with a message before each run.
+
+    """
+    if variants is None:
+        variants = VARIANTS
+    results = []
+    for case in get_cases(config_run, override=override, quick=quick):
+        case_override = case['override']
+        if override:
+            case_override.union(override, allow_override=True)
+        for mode, clustering in variants:
+            name = '{}:{}{}'.format(case['name'], mode,
+                                    ':clustered' if clustering else '')
+            if log:
+                log(name)
+            result = OrderedDict([
+                ('name', name),
+                ('scale', case['scale']),
+                ('mode', mode),
+                ('clustering', clustering),
+            ])
+            result.update(run_case(config_run, case_override, mode=mode,
+                                   clustering=clustering,
+                                   track_memory=track_memory))
+            results.append(result)
+    return OrderedDict([
+        ('calliope_version', __version__),
+        ('git_commit', _get_git_commit()),
+        ('python_version', platform.python_version()),
+        ('platform', platform.platform()),
+        ('time', datetime.datetime.now().strftime(core._time_format)),
+        ('config_run', config_run),
+        ('results', results),
+    ])
+
+
+def save(benchmarks, path):
+    with open(path, 'w') as f:
+        json.dump(benchmarks, f, indent=2)
+
+
+def load(path):
+    with open(path, 'r') as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def compare(baseline, current, metric='time'):
+    """
+    Compare two sets of benchmark results, as returned by
+    ``run_benchmarks`` or ``load``.
+
+    Returns a pandas DataFrame with a row for each case and phase present
+    in both, with the baseline and current value of ``metric`` (``time``
+    or ``peak_memory``) and their ratio.
+
+    """
+    baseline_results = {r['name']: r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        if result['name'] not in baseline_results:
+            continue
+        base_phases = baseline_results[result['name']]['phases']
+        for phase, values in result['phases'].items():
+            if phase not in base_phases:
+                continue
+            base_value = base_phases[phase][metric]
+            rows.append({
+                'case': result['name'],
+                'phase': phase,
+                'baseline': base_value,
+                'current': values[metric],
+                'ratio': (values[metric] / base_value
+                          if base_value else float('nan')),
+            })
+    df = pd.DataFrame(rows, columns=['case', 'phase', 'baseline',
+                                     'current', 'ratio'])
+    return df.set_index(['case', 'phase'])
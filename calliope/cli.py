@@ -19,8 +19,10 @@ import traceback
 
 import click
 
+from . import bench as benchmarks
 from . import core
 from . import _version
+from . import utils
 from .parallel import Parallelizer
 
 
@@ -195,3 +197,46 @@ def generate(run_config, path, silent, debug, pdb):
         click.echo('Generating runs from config '
                    '`{}` inside `{}`'.format(run_config, path))
         parallelizer.generate_runs()
+
+
+@cli.command(short_help='run performance benchmarks')
+@click.argument('run_config', required=False)
+@click.option('--output', '-o', 'output_path', type=str,
+              default='benchmarks.json',
+              help='Path to save JSON results to (default: benchmarks.json).')
+@click.option('--compare', type=str,
+              help='Path to JSON results of a previous benchmark run '
+                   'to compare against.')
+@click.option('--solver', type=str,
+              help='Solver to use instead of the one set in RUN_CONFIG.')
+@click.option('--quick', is_flag=True, default=False,
+              help='Only run the smallest case of each scaling series.')
+@click.option('--no_memory', is_flag=True, default=False,
+              help='Do not track memory use, which slows down runs.')
+@_debug
+@_pdb
+def bench(run_config, output_path, compare, solver, quick, no_memory,
+          debug, pdb):
+    """
+    Benchmark the phases of a model run on versions of the model given
+    by RUN_CONFIG (default: the included example model) scaled along
+    locations, technologies and timesteps, in planning mode with and
+    without time clustering and in operational mode.
+    """
+    if debug:
+        print(_get_version())
+    logging.captureWarnings(True)
+    start_time = datetime.datetime.now()
+    with format_exceptions(debug, pdb, start_time=start_time):
+        override = utils.AttrDict({'solver': solver}) if solver else None
+        results = benchmarks.run_benchmarks(
+            run_config, override=override, quick=quick,
+            track_memory=not no_memory,
+            log=lambda name: click.echo('Running {}'.format(name))
+        )
+        benchmarks.save(results, output_path)
+        click.echo('Results saved to: {}'.format(output_path))
+        if compare:
+            comparison = benchmarks.compare(benchmarks.load(compare), results)
+            click.echo(comparison.to_string())
+        print_end_time(start_time, msg='benchmark complete')
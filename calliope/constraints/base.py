@@ -9,6 +9,8 @@ Basic model constraints.
 
 """
 
+import collections
+
 import pyomo.core as po  # pylint: disable=import-error
 import numpy as np
 
@@ -31,7 +33,7 @@ def get_constraint_param(model, param_string, y, x, t):
     if param_string in model.data and y in model._sets['y_def_' + param_string]:
         return getattr(model.m, param_string)[y, x, t]
     else:
-        return model.get_option(y + '.constraints.' + param_string, x=x)
+        return model.option_table.get_constraint(param_string, y, x)
 
 def get_cost_param(model, param_string, k, y, x, t):
     """
@@ -45,16 +47,45 @@ def get_cost_param(model, param_string, k, y, x, t):
     x = location
     t = timestep
     """
-    cost_getter = utils.cost_getter(model.get_option)
-
-    @utils.memoize
-    def _cost(cost, y, k, x=None):
-        return cost_getter(cost, y, k, x=x)
-
     if param_string in model.data and y in model._sets['y_def_' + param_string]:
         return getattr(model.m, param_string)[y, x, t, k]
-    else: # Search in model.config_model
-        return _cost(param_string, y, k, x=x)
+    else: # Search in the resolved model options
+        return model.option_table.get_cost(param_string, y, k, x)
+
+def get_sparse_var(var, *index):
+    """
+    Return ``var[index]`` for variables defined over sparse index sets
+    (es_prod, es_con, ec_prod, ec_con, export), or 0 if ``index`` is
+    not a valid combination, e.g. a carrier the tech does not produce.
+
+    """
+    return var[index] if index in var else 0
+
+def get_e_eff_per_distance(model, y, x):
+    """
+    Efficiency multiplier for transmission tech ``y`` at location ``x``
+    due to per-distance losses (1.0 if no distance-dependent losses).
+
+    """
+    e_loss = model.get_option(y + '.constraints_per_distance.e_loss', x=x)
+    per_distance = model.get_option(y + '.per_distance')
+    tech, x2 = y.split(':')
+    link = model.config_model.get_key('links.'+ x + ',' + x2,
+        default=model.config_model['links'].get(x2 + ',' + x))
+    # link = None if no link exists
+    if not link:
+        return 1.0
+    try:
+        distance = link.get_key(tech + '.distance')
+    except KeyError:
+        if e_loss > 0:
+            e = exceptions.OptionNotSetError
+            raise e('Distance must be defined for link: {} '
+                    'and transmission tech: {}, as e_loss per distance '
+                    'is defined'.format(x + ',' + x2, tech))
+        else:
+            return 1.0
+    return 1 - (e_loss * (distance / per_distance))
 
 def node_resource(model):
     """
@@ -74,7 +105,7 @@ def node_resource(model):
 
     # Constraint rules
     def c_rs_rule(m, y, x, t):
-        r_scale = model.get_option(y + '.constraints.r_scale', x=x)
+        r_scale = model.option_table.get_constraint('r_scale', y, x)
         r_eff = get_constraint_param(model, 'r_eff', y, x, t)
         force_r = get_constraint_param(model, 'force_r', y, x, t)
         r_avail = (m.r[y, x, t]
@@ -111,65 +142,50 @@ def node_energy_balance(model):
     """
     m = model.m
     d = model.data
-    time_res = model.data['_time_res'].to_series()
-
-    def get_e_eff_per_distance(model, y, x):
-        e_loss = model.get_option(y + '.constraints_per_distance.e_loss', x=x)
-        per_distance = model.get_option(y + '.per_distance')
-        tech, x2 = y.split(':')
-        link = model.config_model.get_key('links.'+ x + ',' + x2,
-            default=model.config_model['links'].get(x2 + ',' + x))
-        # link = None if no link exists
-        if not link:
-            return 1.0
-        try:
-            distance = link.get_key(tech + '.distance')
-        except KeyError:
-            if e_loss > 0:
-                e = exceptions.OptionNotSetError
-                raise e('Distance must be defined for link: {} '
-                        'and transmission tech: {}, as e_loss per distance '
-                        'is defined'.format(x + ',' + x2, tech))
-            else:
-                return 1.0
-        return 1 - (e_loss * (distance / per_distance))
+    time_res = model.time_index.get_time_res
+    options = model.option_table
 
     # Variables
     m.s = po.Var(m.y_pc, m.x, m.t, within=po.NonNegativeReals)
-    m.es_prod = po.Var(m.c, m.y, m.x, m.t, within=po.NonNegativeReals)
-    m.es_con = po.Var(m.c, m.y, m.x, m.t, within=po.NegativeReals)
-    m.export = po.Var(m.y_export, m.x, m.t, within=po.NonNegativeReals)
+    m.es_prod = po.Var(m.cyx_prod, m.t, within=po.NonNegativeReals)
+    m.es_con = po.Var(m.cyx_con, m.t, within=po.NegativeReals)
+    m.export = po.Var(m.yx_export, m.t, within=po.NonNegativeReals)
 
     # Constraint rules
     def transmission_rule(m, y, x, t):
         y_remote, x_remote = transmission.get_remotes(y, x)
         e_eff = get_constraint_param(model, 'e_eff', y, x, t)
-        if y_remote in m.y_trans:
-            c = model.get_option(y + '.carrier')
-            return (m.es_prod[c, y, x, t]
-                    == -1 * m.es_con[c, y_remote, x_remote, t]
+        c = options.carrier[y]
+        if y_remote in m.y_trans and ((c, y, x, t) in m.es_prod or
+                                      (c, y_remote, x_remote, t) in m.es_con):
+            return (get_sparse_var(m.es_prod, c, y, x, t)
+                    == -1 * get_sparse_var(m.es_con, c, y_remote, x_remote, t)
                     * e_eff
-                    * get_e_eff_per_distance(model, y, x))
+                    * options.get_e_eff_per_distance(y, x))
         else:
             return po.Constraint.NoConstraint
 
     def conversion_rule(m, y, x, t):
-        c_prod = model.get_option(y + '.carrier')
-        c_source = model.get_option(y + '.source_carrier')
+        c_prod = options.carrier[y]
+        c_source = options.source_carrier[y]
+        if (c_prod, y, x, t) not in m.es_prod:
+            # Tech not allowed at this location
+            return po.Constraint.NoConstraint
         e_eff = get_constraint_param(model, 'e_eff', y, x, t)
-        export = m.export[y, x, t] if model.get_option(y + '.export', x=x) else 0
+        export = get_sparse_var(m.export, y, x, t)
         return (m.es_prod[c_prod, y, x, t] + export
                 == -1 * m.es_con[c_source, y, x, t] * e_eff)
 
     def pc_rule(m, y, x, t):
         e_eff = get_constraint_param(model, 'e_eff', y, x, t)
+        c = options.carrier[y]
         # TODO once Pyomo supports it,
         # let this update conditionally on param update!
         if po.value(e_eff) == 0:
             e_prod = 0
         else:
-            e_prod = sum(m.es_prod[c, y, x, t] for c in m.c) / e_eff
-        e_con = sum(m.es_con[c, y, x, t] for c in m.c) * e_eff
+            e_prod = get_sparse_var(m.es_prod, c, y, x, t) / e_eff
+        e_con = get_sparse_var(m.es_con, c, y, x, t) * e_eff
 
         # If this tech is in the set of techs allowing rb, include it
         if y in m.y_rb:
@@ -179,10 +195,10 @@ def node_energy_balance(model):
 
         # If this tech allows export outside the system, include it
         export = m.export[y, x, t] / e_eff \
-            if model.get_option(y + '.export', x=x) else 0
+            if (y, x, t) in m.export else 0
 
         # A) Case where no storage allowed
-        s_cap_max = model.get_option(y + '.constraints.s_cap.max', x=x)
+        s_cap_max = options.get_constraint('s_cap.max', y, x)
         use_s_time = get_constraint_param(model, 'use_s_time', y, x, t)
         if ( s_cap_max == 0 and
                 not use_s_time):
@@ -203,7 +219,7 @@ def node_energy_balance(model):
             else:
                 s_loss = get_constraint_param(model, 's_loss', y, x, t)
                 s_minus_one = (((1 - s_loss)
-                                ** time_res.at[model.prev_t(t)])
+                                ** time_res(model.prev_t(t)))
                                * m.s[y, x, model.prev_t(t)])
             return (m.s[y, x, t] == s_minus_one + rs
                     + rbs - e_prod - e_con - export)
@@ -229,18 +245,18 @@ def node_constraints_build(model):
     """
     m = model.m
     d = model.data
+    options = model.option_table
 
     def get_var_constraint(model_var, y, var, x,
                            _equals=None, _max=None, _min=None,
                            scale=None):
 
         if not _equals:
-            _equals = model.get_option(y + '.constraints.'
-                                       + var + '.equals', x=x)
+            _equals = options.get_constraint(var + '.equals', y, x)
         if not _max:
-            _max = model.get_option(y + '.constraints.' + var + '.max', x=x)
+            _max = options.get_constraint(var + '.max', y, x)
         if not _min:
-            _min = model.get_option(y + '.constraints.' + var + '.min', x=x)
+            _min = options.get_constraint(var + '.min', y, x)
         if scale:
             _equals = scale * _equals
             _min = scale * _min
@@ -276,12 +292,12 @@ def node_constraints_build(model):
 
     # Constraint rules
     def c_s_cap_rule(m, y, x):
-        if model.get_option(y + '.constraints.use_s_time', x=x):
-            scale = model.get_option(y + '.constraints.e_cap_scale', x=x)
-            s_time_max = model.get_option(y + '.constraints.s_time.max', x=x)
-            e_cap = model.get_option(y + '.constraints.e_cap.equals', x=x)
+        if options.get_constraint('use_s_time', y, x):
+            scale = options.get_constraint('e_cap_scale', y, x)
+            s_time_max = options.get_constraint('s_time.max', y, x)
+            e_cap = options.get_constraint('e_cap.equals', y, x)
             if not e_cap:
-                e_cap = model.get_option(y + '.constraints.e_cap.max', x=x)
+                e_cap = options.get_constraint('e_cap.max', y, x)
             e_eff_ref = model.get_eff_ref('e', y)
             s_cap_max = s_time_max * e_cap * scale / e_eff_ref
         else:
@@ -290,22 +306,22 @@ def node_constraints_build(model):
         return get_var_constraint(m.s_cap[y, x], y, 's_cap', x, _max=s_cap_max)
 
     def c_r_cap_rule(m, y, x):
-        if model.get_option(y + '.constraints.r_cap_equals_e_cap', x=x):
+        if options.get_constraint('r_cap_equals_e_cap', y, x):
             return m.r_cap[y, x] == m.e_cap[y, x]
         else:
             return get_var_constraint(m.r_cap[y, x], y, 'r_cap', x)
 
     def c_r_area_rule(m, y, x):
-        area_per_cap = model.get_option(y + '.constraints.r_area_per_e_cap', x=x)
+        area_per_cap = options.get_constraint('r_area_per_e_cap', y, x)
         if area_per_cap:
             return m.r_area[y, x] == m.e_cap[y, x] * area_per_cap
         else:
-            e_cap_max = model.get_option(y + '.constraints.e_cap.max', x=x)
+            e_cap_max = options.get_constraint('e_cap.max', y, x)
             if e_cap_max == 0:
                 # If a technology has no e_cap here, we force r_area to zero,
                 # so as not to accrue spurious costs
                 return m.r_area[y, x] == 0
-            elif model.get_option(y + '.constraints.r_area.max', x=x) is False:
+            elif options.get_constraint('r_area.max', y, x) is False:
                 return m.r_area[y, x] == 1
             else:
                 return get_var_constraint(m.r_area[y, x], y, 'r_area', x)
@@ -315,17 +331,17 @@ def node_constraints_build(model):
         if not model._locations.at[x, y] == 1:
             return m.e_cap[y, x] == 0
         else:
-            e_cap_scale = model.get_option(y + '.constraints.e_cap_scale', x=x)
+            e_cap_scale = options.get_constraint('e_cap_scale', y, x)
             return get_var_constraint(m.e_cap[y, x], y, 'e_cap', x,
                                       scale=e_cap_scale)
 
     def c_e_cap_gross_net_rule(m, y, x):
-        c_eff = model.get_option(y + '.constraints.c_eff', x=x)
+        c_eff = options.get_constraint('c_eff', y, x)
         return m.e_cap[y, x] * c_eff == m.e_cap_net[y, x]
 
     def c_rb_cap_rule(m, y, x):
-        follow = model.get_option(y + '.constraints.rb_cap_follow', x=x)
-        mode = model.get_option(y + '.constraints.rb_cap_follow_mode', x=x)
+        follow = options.get_constraint('rb_cap_follow', y, x)
+        mode = options.get_constraint('rb_cap_follow_mode', y, x)
 
         # First deal with the special case of ``rb_cap_follow`` being set
         if follow:
@@ -359,30 +375,31 @@ def node_constraints_build(model):
 
 def node_constraints_operational(model):
     m = model.m
-    time_res = model.data['_time_res'].to_series()
+    time_res = model.time_index.get_time_res
 
     # Constraint rules
     def c_rs_max_upper_rule(m, y, x, t):
-        return m.rs[y, x, t] <= time_res.at[t] * m.r_cap[y, x]
+        return m.rs[y, x, t] <= time_res(t) * m.r_cap[y, x]
 
     def c_rs_max_lower_rule(m, y, x, t):
-        return m.rs[y, x, t] >= -1 * time_res.at[t] * m.r_cap[y, x]
+        return m.rs[y, x, t] >= -1 * time_res(t) * m.r_cap[y, x]
 
+    # NB: es_prod and es_con are only defined for the carriers a tech
+    # produces and consumes, so no need to check for the carrier here
     def c_es_prod_max_rule(m, c, y, x, t):
         e_prod = get_constraint_param(model, 'e_prod', y, x, t)
-        export = m.export[y, x, t] if model.get_option(y + '.export', x=x) else 0
-        if (e_prod is True and
-                c == model.get_option(y + '.carrier')):
-            return m.es_prod[c, y, x, t] + export <= time_res.at[t] * m.e_cap[y, x]
+        export = get_sparse_var(m.export, y, x, t)
+        if e_prod is True:
+            return m.es_prod[c, y, x, t] + export <= time_res(t) * m.e_cap[y, x]
         else:
             return m.es_prod[c, y, x, t] + export == 0
 
     def c_es_prod_min_rule(m, c, y, x, t):
         min_use = get_constraint_param(model, 'e_cap_min_use', y, x, t)
-        export = m.export[y, x, t] if model.get_option(y + '.export', x=x) else 0
-        if (min_use and c == model.get_option(y + '.carrier')):
+        export = get_sparse_var(m.export, y, x, t)
+        if min_use:
             return (m.es_prod[c, y, x, t] + export
-                    >= time_res.at[t] * m.e_cap[y, x] * min_use)
+                    >= time_res(t) * m.e_cap[y, x] * min_use)
         else:
             return po.Constraint.NoConstraint
 
@@ -390,11 +407,8 @@ def node_constraints_operational(model):
         e_con = get_constraint_param(model, 'e_con', y, x, t)
         if y in m.y_conv:
             return po.Constraint.Skip
-        else:
-            carrier = '.carrier'
-        if (e_con is True and
-                c == model.get_option(y + carrier)):
-            return m.es_con[c, y, x, t] >= (-1 * time_res.at[t]
+        if e_con is True:
+            return m.es_con[c, y, x, t] >= (-1 * time_res(t)
                                             * m.e_cap[y, x])
         else:
             return m.es_con[c, y, x, t] == 0
@@ -407,18 +421,18 @@ def node_constraints_operational(model):
         if (rb_startup and t >= model.data.startup_time_bounds):
             return m.rbs[y, x, t] == 0
         else:
-            return m.rbs[y, x, t] <= time_res.at[t] * m.rb_cap[y, x]
+            return m.rbs[y, x, t] <= time_res(t) * m.rb_cap[y, x]
 
     # Constraints
     m.c_rs_max_upper = po.Constraint(m.y_def_r, m.x, m.t,
                                      rule=c_rs_max_upper_rule)
     m.c_rs_max_lower = po.Constraint(m.y_def_r, m.x, m.t,
                                      rule=c_rs_max_lower_rule)
-    m.c_es_prod_max = po.Constraint(m.c, m.y, m.x, m.t,
+    m.c_es_prod_max = po.Constraint(m.cyx_prod, m.t,
                                     rule=c_es_prod_max_rule)
-    m.c_es_prod_min = po.Constraint(m.c, m.y, m.x, m.t,
+    m.c_es_prod_min = po.Constraint(m.cyx_prod, m.t,
                                     rule=c_es_prod_min_rule)
-    m.c_es_con_max = po.Constraint(m.c, m.y, m.x, m.t,
+    m.c_es_con_max = po.Constraint(m.cyx_con, m.t,
                                    rule=c_es_con_max_rule)
     m.c_s_max = po.Constraint(m.y_pc, m.x, m.t,
                               rule=c_s_max_rule)
@@ -459,14 +473,14 @@ def node_parasitics(model):
     m = model.m
 
     # Variables
-    m.ec_prod = po.Var(m.c, m.y_p, m.x, m.t, within=po.NonNegativeReals)
-    m.ec_con = po.Var(m.c, m.y_p, m.x, m.t, within=po.NegativeReals)
+    m.ec_prod = po.Var(m.cyx_prod_p, m.t, within=po.NonNegativeReals)
+    m.ec_con = po.Var(m.cyx_con_p, m.t, within=po.NegativeReals)
 
     # Constraint rules
     def c_ec_prod_rule(m, c, y, x, t):
         return (m.ec_prod[c, y, x, t]
                 == m.es_prod[c, y, x, t]
-                * model.get_option(y + '.constraints.c_eff', x=x))
+                * model.option_table.get_constraint('c_eff', y, x))
 
     def c_ec_con_rule(m, c, y, x, t):
         if y in m.y_trans or y in m.y_conv:
@@ -474,7 +488,7 @@ def node_parasitics(model):
             # do not double count c_eff
             c_eff = 1.0
         else:
-            c_eff = model.get_option(y + '.constraints.c_eff', x=x)
+            c_eff = model.option_table.get_constraint('c_eff', y, x)
         if c_eff > 0:
             return (m.ec_con[c, y, x, t]
                     == m.es_con[c, y, x, t]
@@ -483,8 +497,8 @@ def node_parasitics(model):
             return (m.ec_con[c, y, x, t] == 0)
 
     # Constraints
-    m.c_ec_prod = po.Constraint(m.c, m.y_p, m.x, m.t, rule=c_ec_prod_rule)
-    m.c_ec_con = po.Constraint(m.c, m.y_p, m.x, m.t, rule=c_ec_con_rule)
+    m.c_ec_prod = po.Constraint(m.cyx_prod_p, m.t, rule=c_ec_prod_rule)
+    m.c_ec_con = po.Constraint(m.cyx_con_p, m.t, rule=c_ec_con_rule)
 
 
 def node_costs(model):
@@ -500,24 +514,13 @@ def node_costs(model):
 
     """
     m = model.m
-    time_res = model.data['_time_res'].to_series()
-    weights = model.data['_weights'].to_series()
-
-    cost_getter = utils.cost_getter(model.get_option)
-    depreciation_getter = utils.depreciation_getter(model.get_option)
-    cost_per_distance_getter = utils.cost_per_distance_getter(model.config_model)
+    weight = model.time_index.get_weight
+    time_res_sum = model.time_index.time_res_sum
 
-    @utils.memoize
-    def _depreciation_rate(y, k):
-        return depreciation_getter(y, k)
-
-    @utils.memoize
-    def _cost(cost, y, k, x=None):
-        return cost_getter(cost, y, k, x=x)
-
-    @utils.memoize
-    def _cost_per_distance(cost, y, k, x):
-        return cost_per_distance_getter(cost, y, k, x)
+    options = model.option_table
+    _depreciation_rate = options.get_depreciation_rate
+    _cost = options.get_cost
+    _cost_per_distance = options.get_cost_per_distance
 
     def _check_and_set(cost, y, x, k):
         """
@@ -581,7 +584,7 @@ def node_costs(model):
 
         return (
             m.cost_con[y, x, k] == _depreciation_rate(y, k) *
-            (sum(time_res * weights) / 8760) *
+            (time_res_sum / 8760) *
             (cost_s_cap + cost_r_cap + cost_r_area + cost_rb_cap +
              cost_e_cap)
         )
@@ -594,7 +597,7 @@ def node_costs(model):
             return (m.cost_op_fixed[y, x, k] ==
                     _cost('om_frac', y, k, x) * m.cost_con[y, x, k]
                     + (_cost('om_fixed', y, k, x) * m.e_cap[y, x] *
-                       (sum(time_res * weights) / 8760)))
+                       (time_res_sum / 8760)))
         else:
             return m.cost_op_fixed[y, x, k] == 0
 
@@ -613,12 +616,12 @@ def node_costs(model):
         # Note: only counting es_prod for operational costs.
         # This should generally be a reasonable assumption to make.
         if y in m.y:
-            carrier = model.get_option(y + '.carrier')
-            export = m.export[y, x, t] if model.get_option(y + '.export', x=x) else 0
+            carrier = model.option_table.carrier[y]
+            export = get_sparse_var(m.export, y, x, t)
             return (
-                m.cost_op_var[y, x, t, k] == weights.loc[t] * (
+                m.cost_op_var[y, x, t, k] == weight(t) * (
                 get_cost_param(model,'om_var', k, y, x, t) *
-                (m.es_prod[carrier, y, x, t] + export) +
+                (get_sparse_var(m.es_prod, carrier, y, x, t) + export) +
                 get_cost_param(model, 'export', k, y, x, t) * export)
             )
         else:
@@ -633,7 +636,7 @@ def node_costs(model):
             return (
                 m.cost_op_fuel[y, x, t, k] ==
                 om_fuel *
-                weights.loc[t] *
+                weight(t) *
                 (m.rs[y, x, t] / r_eff)
             )
         else: #in case r_eff is zero, to avoid an infinite value for cost_op_fuel
@@ -645,7 +648,7 @@ def node_costs(model):
             return (
                 m.cost_op_rb[y, x, t, k] ==
                 get_cost_param(model,'om_rb',k,y,x,t) *
-                weights.loc[t] *
+                weight(t) *
                 (m.rbs[y, x, t] / rb_eff)
             )
         else:
@@ -682,6 +685,14 @@ def model_constraints(model):
             children = [i for i in children if len(get_children(i)) == 0]
         return children
 
+    # Variables producing or consuming each carrier at each location:
+    # ec_prod/ec_con for techs with parasitics, es_prod/es_con otherwise
+    balance_vars = collections.defaultdict(list)
+    for var, var_p, idx in [(m.es_prod, m.ec_prod, m.cyx_prod),
+                            (m.es_con, m.ec_con, m.cyx_con)]:
+        for c, y, x in idx:
+            balance_vars[c, x].append((var_p if y in m.y_p else var, y))
+
     # Constraint rules
     def c_system_balance_rule(m, c, x, t):
         # Balacing takes place at top-most (level 0) locations, as well
@@ -689,14 +700,11 @@ def model_constraints(model):
         if (model._locations.at[x, '_level'] == 0
                 or len(get_children(x)) > 0):
             family = get_children(x) + [x]  # list of children + parent
-            balance = (sum(m.es_prod[c, y, xs, t]
-                           for xs in family for y in m.y_np)
-                       + sum(m.ec_prod[c, y, xs, t]
-                             for xs in family for y in m.y_p)
-                       + sum(m.es_con[c, y, xs, t]
-                             for xs in family for y in m.y_np)
-                       + sum(m.ec_con[c, y, xs, t]
-                             for xs in family for y in m.y_p))
+            terms = [var[c, y, xs, t] for xs in family
+                     for var, y in balance_vars[c, xs]]
+            if not terms:
+                return po.Constraint.NoConstraint
+            balance = sum(terms)
             if c == 'power':
                 return balance == 0
             else:  # e.g. for heat
@@ -11,6 +11,8 @@ Optionally loaded constraints.
 
 import pyomo.core as po  # pylint: disable=import-error
 
+from .base import get_sparse_var
+
 
 def ramping_rate(model):
     """
@@ -20,7 +22,7 @@ def ramping_rate(model):
 
     """
     m = model.m
-    time_res = model.data['_time_res'].to_series()
+    time_res = model.time_index.get_time_res
 
     # Constraint rules
     def _ramping_rule(m, y, x, t, direction):
@@ -36,12 +38,17 @@ def ramping_rate(model):
             if m.t.order_dict[t] == 0:
                 return po.Constraint.NoConstraint
             else:
-                carrier = model.get_option(y + '.carrier')
+                carrier = model.option_table.carrier[y]
+                if (carrier, y, x, t) not in m.es_prod:
+                    # Tech not allowed at this location
+                    return po.Constraint.NoConstraint
                 diff = ((m.es_prod[carrier, y, x, t]
-                         + m.es_con[carrier, y, x, t]) / time_res.at[t]
+                         + get_sparse_var(m.es_con, carrier, y, x, t))
+                        / time_res(t)
                         - (m.es_prod[carrier, y, x, model.prev_t(t)]
-                           + m.es_con[carrier, y, x, model.prev_t(t)])
-                        / time_res.at[model.prev_t(t)])
+                           + get_sparse_var(m.es_con, carrier, y, x,
+                                            model.prev_t(t)))
+                        / time_res(model.prev_t(t)))
                 max_ramping_rate = ramping_rate_value * m.e_cap[y, x]
                 if direction == 'up':
                     return diff <= max_ramping_rate
@@ -110,9 +117,9 @@ def group_fraction(model):
         sign, fraction = sign_fraction(output_group, 'output')
         techs = techs_to_consider(supply_techs, 'output')
         rhs = (fraction
-               * sum(m.es_prod[c, y, x, t] for y in techs
+               * sum(get_sparse_var(m.es_prod, c, y, x, t) for y in techs
                      for x in m.x for t in m.t))
-        lhs = sum(m.es_prod[c, y, x, t]
+        lhs = sum(get_sparse_var(m.es_prod, c, y, x, t)
                   for y in model.get_group_members(output_group) for x in m.x
                   for t in m.t)
         return equalizer(lhs, rhs, sign)
@@ -134,7 +141,7 @@ def group_fraction(model):
         y = 'demand_power'
         # Calculate demand peak taking into account both r_scale and time_res
         peak = (float(sum(model.m.r[y, x, peak_timestep]
-                      * model.get_option(y + '.constraints.r_scale', x=x)
+                      * model.option_table.get_constraint('r_scale', y, x)
                       for x in model.m.x))
                 / model.data.time_res_series.at[peak_timestep])
         rhs = fraction * (-1 - margin) * peak
@@ -198,7 +205,7 @@ def max_r_area_per_loc(model):
             descendants = _get_descendants(x)
         all_x = descendants + [x]
         r_area_sum = sum(m.r_area[y, _x] for y in m.y_def_r for _x in all_x if
-                         model.get_option(y + '.constraints.r_area.max', x=_x)
+                         model.option_table.get_constraint('r_area.max', y, _x)
                          is not False)
         # r_area_sum will be ``0`` if either ``m.y_def_r`` or ``all_x`` are empty
         if not isinstance(r_area_sum, int):
@@ -12,6 +12,8 @@ Planning constraints.
 import numpy as np
 import pyomo.core as po  # pylint: disable=import-error
 
+from .base import get_sparse_var
+
 
 def node_constraints_build_total(model):
     """
@@ -46,10 +48,10 @@ def system_margin(model):
 
     """
     m = model.m
-    time_res = model.data['_time_res'].to_series()
+    time_res = model.time_index.get_time_res
 
     def carrier(y):
-        return model.get_option(y + '.carrier')
+        return model.option_table.carrier[y]
 
     # Constraint rules
     def c_system_margin_rule(m, c):
@@ -57,9 +59,10 @@ def system_margin(model):
         margin = model.config_model.system_margin.get_key(c, default=0)
         if margin:
             t = model.t_max_demand[c]
-            return (sum(m.es_prod[c, y, x, t] for y in m.y for x in m.x)
+            return (sum(get_sparse_var(m.es_prod, c, y, x, t)
+                        for y in m.y for x in m.x)
                     * (1 + margin)
-                    <= time_res.at[t]
+                    <= time_res(t)
                     * sum((m.e_cap[y, x] / model.get_eff_ref('e', y, x))
                           for y in m.y if carrier(y) == c
                           for x in m.x))
@@ -9,14 +9,18 @@ Core model functionality via the Model class.
 
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import collections
 import datetime
 import functools
 import inspect
 import itertools
 import logging
+import numbers
 import os
 import random
 import shutil
+import tempfile
 import time
 import warnings
 
@@ -32,12 +36,18 @@ from pyutilib.services import TempfileManager  # pylint: disable=import-error
 from ._version import __version__
 from . import exceptions
 from . import constraints
+from . import csv_cache
 from . import locations
+from . import matrix
+from . import option_table
+from . import problem_cache
 from . import output
 from . import sets
-from . import time_funcs  # pylint: disable=unused-import
+from . import time_index
+from . import time_funcs
 from . import time_masks  # pylint: disable=unused-import
 from . import utils
+from . import validation
 
 # Enable simple format when printing ModelWarnings
 formatwarning_orig = warnings.formatwarning
@@ -58,6 +68,43 @@ def _formatwarning(message, category, filename, lineno, line=None):
 warnings.formatwarning = _formatwarning
 
 
+def _write_window_file(node, directory, index, encoding_policy=None):
+    """
+    Write the node variables of the operational mode window ``index``
+    to their own NetCDF file in ``directory``, encoded following
+    ``encoding_policy`` (see :func:`calliope.output.get_netcdf_encoding`),
+    returning its path.
+
+    """
+    path = os.path.join(directory, 'window_{:05d}.nc'.format(index))
+    encoding = output.get_netcdf_encoding(node, encoding_policy)
+    node.to_netcdf(path, format='netCDF4', encoding=encoding)
+    return path
+
+
+def _open_window_files(paths):
+    """
+    Combine the window files written by _write_window_file() along t.
+    If Dask is available, the files are opened lazily, else they are
+    all loaded into memory, with a warning.
+
+    """
+    try:
+        import dask  # pylint: disable=unused-variable
+    except ImportError:
+        warnings.warn(
+            'Dask is not installed, so the streamed window files are '
+            'loaded into memory to build the solution.',
+            exceptions.ModelWarning
+        )
+        datasets = []
+        for path in paths:
+            with xr.open_dataset(path) as ds:
+                datasets.append(ds.load())
+        return xr.concat(datasets, dim='t')
+    return xr.open_mfdataset(paths, concat_dim='t')
+
+
 @functools.lru_cache(maxsize=1)
 def get_default_techs(foo=0):  # pylint: disable=unused-argument
     """
@@ -181,11 +228,37 @@ class Model(BaseModel):
 
         # Get timeseries constraints/costs
         self.initialize_timeseries()
+        self.mode = self.config_run.mode
+        self.backend = self.config_run.get_key('backend', default='pyomo')
+        # A problem cache hit provides the processed data and the
+        # generated problem, so reading the data is skipped
+        if self._load_problem_cache():
+            return None
         # Read data and apply time resolution adjustments
         self.read_data()
-        self.mode = self.config_run.mode
         self.initialize_time()
 
+    def _load_problem_cache(self):
+        """
+        If the ``problem_cache`` run setting is given and the backend
+        is ``matrix``, compute the cache key from the model inputs and,
+        on a cache hit, restore the model data, sets and generated
+        problem from the cache. Returns True on a cache hit.
+
+        """
+        self.mp = None
+        self._problem_cache_key = None
+        cache_dir = self.config_run.get_key('problem_cache', default=False)
+        if not cache_dir or self.backend != 'matrix':
+            return False
+        self._problem_cache_key = problem_cache.get_key(self)
+        cached = problem_cache.load(self._problem_cache_key, cache_dir)
+        if cached is None:
+            return False
+        self.data, self._sets, self.mp = cached
+        self.time_index = time_index.TimeIndex(self.data)
+        return True
+
     def override_model_config(self, override_dict):
         od = override_dict
         if 'data_path' in od.keys_nested():
@@ -280,7 +353,13 @@ class Model(BaseModel):
 
         time_config = self.config_run.get('time', False)
         if not time_config:
+            self.data.load()  # Materialize chunked data, if any
+            self.time_index = time_index.TimeIndex(self.data)
             return None  # Nothing more to do here
+        elif self.config_run.get_key('data_chunks', default=False):
+            # For analysis purposes, keep old data around. Dask arrays
+            # are never changed in place, so the data on disk is shared
+            self.data_original = self.data.copy(deep=False)
         else:
             # For analysis purposes, keep old data around
             self.data_original = self.data.copy(deep=True)
@@ -327,6 +406,9 @@ class Model(BaseModel):
                     msg = 'Time settings incompatible with operational mode'
                     raise exceptions.ModelError(msg)
 
+        # Materialize chunked data, if any, now that it has been reduced
+        self.data.load()
+        self.time_index = time_index.TimeIndex(self.data)
         return None
 
     def get_distances(self):
@@ -359,26 +441,11 @@ class Model(BaseModel):
         in the model's set of timestamps. Raises ModelError if out of bounds.
 
         """
-        idx = self.data['t'].to_index()
-        if isinstance(offset, pd.tslib.Timedelta):
-            loc = idx.get_loc(timestamp + offset)
-        else:  # integer
-            loc = idx.get_loc(timestamp) + offset
-        if loc < 0:
-            raise exceptions.ModelError(
-                'Attempted to get a timestep before the first one.'
-            )
-        else:
-            try:
-                return idx[loc]
-            except IndexError:  # Beyond length of index
-                raise exceptions.ModelError(
-                    'Attempted to get a timestep beoynd the last one.'
-                )
+        return self.time_index.get_t(timestamp, offset)
 
     def prev_t(self, timestamp):
         """Return the timestep prior to the given timestep."""
-        return self.get_t(timestamp, offset=-1)
+        return self.time_index.prev_t(timestamp)
 
     def get_timeres(self, verify=False):
         """Returns resolution of data in hours.
@@ -456,6 +523,11 @@ class Model(BaseModel):
 
     def flush_option_cache(self):
         self.option_cache = {}
+        self.option_table = None
+
+    def _init_option_table(self):
+        if self.option_table is None:
+            self.option_table = option_table.OptionTable(self)
 
     def get_name(self, y):
         try:
@@ -651,19 +723,45 @@ class Model(BaseModel):
                 self.config_run.subset_t[1]
             )
 
+    def _get_time_axis(self):
+        """
+        Returns the full DatetimeIndex of the model, generated from the
+        ``time_axis`` model setting if given, else read from set_t.csv.
+
+        """
+        time_axis = self.config_model.get_key('time_axis', default=False)
+        if time_axis:
+            missing = [k for k in ['start', 'freq', 'periods']
+                       if k not in time_axis]
+            if missing:
+                e = exceptions.ModelError
+                raise e('`time_axis` must define `start`, `freq` and '
+                        '`periods`, missing: {}'.format(missing))
+            return pd.date_range(start=pd.Timestamp(time_axis.start),
+                                 freq=time_axis.freq,
+                                 periods=int(time_axis.periods))
+        else:
+            _t = csv_cache.read_csv(
+                os.path.join(self.config_model.data_path, 'set_t.csv'),
+                cache_dir=self._get_csv_cache_dir(),
+                header=None, index_col=1, parse_dates=[1]
+            )
+            return _t.index
+
     def initialize_sets(self):
         self._sets = utils.AttrDict()
         self.config_model
 
         # t: time
-        _t = pd.read_csv(
-            os.path.join(self.config_model.data_path, 'set_t.csv'),
-            header=None, index_col=1, parse_dates=[1]
-        )
-        self._set_t_original = _t.index
+        self._set_t_original = self._get_time_axis()
+        _t = pd.Series(np.arange(len(self._set_t_original)),
+                       index=self._set_t_original)
         if self.config_run.get_key('subset_t', default=False):
             _t = _t.loc[self.config_run.subset_t[0]:self.config_run.subset_t[1]]
         self._sets['t'] = _t.index
+        # Rows of the time series files to read, which are positional
+        # with respect to the full time axis
+        self._t_rows = slice(_t.iloc[0], _t.iloc[-1] + 1)
 
         # x: locations
         _x = list(self.config_model.locations.keys())
@@ -714,27 +812,64 @@ class Model(BaseModel):
                         'in the model definition '
                         '({}, {}).'.format(y, self.get_option(y + '.parent')))
 
+        # Sparse (c, y, x) sets for dispatch variables
+        self._sets = {**self._sets, **sets.init_sparse_sets(self)}
+
+    def _get_csv_cache_dir(self):
+        return self.config_run.get_key('csv_cache', default=False)
+
     @utils.memoize
     def _get_option_from_csv(self, filename):
         """Read CSV time series"""
         d_path = os.path.join(self.config_model.data_path, filename)
-        df = pd.read_csv(d_path, index_col=0)
-        df.index = self._set_t_original
-        df = df.loc[self._sets['t'], :]  # Subset in case necessary
+        df = csv_cache.read_csv(d_path, cache_dir=self._get_csv_cache_dir(),
+                                index_col=0)
+        # Rows are positional, so the file's index column is not parsed
+        # but must have one row per timestep of the full time axis
+        if len(df) != len(self._set_t_original):
+            e = exceptions.ModelError
+            raise e('File has invalid index. Ensure that it has the same '
+                    'date range and resolution as the model time axis: {}.'
+                    '\n\nExpected {} rows, found {}'.format(
+                        filename, len(self._set_t_original), len(df)))
+        self._check_csv_time_index(filename, df.index)
+        # Subset in case necessary. The frame is shared by all readers
+        # of the file and may be memory-mapped read-only from the CSV
+        # cache, so it is only copied where it is changed
+        df = df.iloc[self._t_rows, :]
+        df.index = self._sets['t']
         # Fill columns that weren't defined with NaN
         # missing_cols = list(set(self.data._x) - set(df.columns))
         # for c in missing_cols:
         #     df[c] = np.nan
+        return df
 
-        # Ensure that the read file's index matches the data's timesteps
-        mismatch = df.index.difference(self._sets['t'])
-        if len(mismatch) > 0:
+    def _check_csv_time_index(self, filename, index):
+        """
+        Raise a ModelError unless the first and last entries of the
+        index of time series file ``filename`` match the model time
+        axis. The index is either row positions from 0, or timestamps,
+        of which only these two are parsed.
+
+        """
+        t = self._set_t_original
+        first, last = index[0], index[-1]
+        if index.dtype.kind in 'iu':
+            expected = (0, len(t) - 1)
+            found = (first, last)
+        else:
+            expected = (t[0], t[-1])
+            try:
+                found = tuple(pd.to_datetime([first, last]))
+            except (ValueError, TypeError):
+                found = (first, last)
+        if found != expected:
             e = exceptions.ModelError
-            entries = mismatch.tolist()
             raise e('File has invalid index. Ensure that it has the same '
-                    'date range and resolution as set_t.csv: {}.\n\n'
-                    'Invalid entries: {}'.format(filename, entries))
-        return df
+                    'date range and resolution as the model time axis: {}.'
+                    '\n\nExpected first and last entries {} and {}, found '
+                    '{} and {}'.format(filename, expected[0], expected[1],
+                                       first, last))
 
     def _get_filename(self, param, option, y, x):
         # If we have a string, it must be `file` or `file=..`
@@ -756,7 +891,7 @@ class Model(BaseModel):
                     f = y + '_' + '_'.join(param) + '.csv'
         return f
 
-    def _apply_x_map(self, df, x_map, x=None):
+    def _apply_x_map(self, df, x_map, x=None, param=None, y=None):
         # Format is <name in model config>:<name in data>
         x_map_dict = {i.split(':')[0].strip():
                       i.split(':')[1].strip()
@@ -767,109 +902,221 @@ class Model(BaseModel):
         # those are also used somewhere!
         if x is None:
             x = list(x_map_dict.keys())
+        elif isinstance(x, list):
+            x = [i for i in x if i in x_map_dict]
         elif x in x_map_dict:
             x = [x]
         else:
             x = []
+        # Mapping errors are added to the validation report, which is
+        # checked once all data has been read
+        report = self._validation
         for this_x in x:
             try:
                 x_m = x_map_dict[this_x]
             except KeyError:
-                e = exceptions.ModelError
-                raise e('x_map defined but does not map '
-                        'location defined in model config: '
-                        '{}, with {}'.format(this_x, x_map_str))
+                report.add('error', 'x_map',
+                           'x_map defined but does not map location '
+                           'defined in model config, with {}'.format(x_map_str),
+                           param=param, y=y, x=this_x)
+                continue
             if x_m not in df.columns:
-                e = exceptions.ModelError
-                raise e('Trying to map to a column not '
-                        'contained in data: {}, for region '
-                        '{}, with {}'
-                        .format(x_m, this_x, x_map_str))
+                report.add('error', 'x_map',
+                           'Trying to map to a column not contained in '
+                           'data: {}, with {}'.format(x_m, x_map_str),
+                           param=param, y=y, x=this_x)
+                continue
             df[this_x] = df[x_m]
         return df
 
     def _read_param_for_tech(self, param, y, time_res, option, x=None):
-        k = '{}.{}:{}'.format(param, y, x)
+        """
+        Read the (t, x) DataFrame of ``param`` for tech ``y`` from
+        ``option``, for all locations if ``x`` is None, else for a
+        location or a list of locations that share the same option
+        and x_map. A list of locations returns a DataFrame with a
+        column for each of them.
+
+        """
+        xs = x if isinstance(x, list) else [x]
+        keys = ['{}.{}:{}'.format(param, y, i) for i in xs]
         if (param == 'r' or isinstance(option, str)) and option != float('inf'):
             self._sets['y_def_' + param].add(y)
+        # Frames read from file are shared, see _get_option_from_csv
+        shared = False
         if isinstance(option, str) and option != float('inf'):  # if option is string, read a file
+            shared = True
             f = self._get_filename(param, option, y, x)
-            df = self._get_option_from_csv(f)
-            self.debug.data_sources.set_key(k, 'file:' + f)
+            if f in self._timeseries_files:
+                df = self._timeseries_files[f]
+            else:
+                df = self._get_option_from_csv(f)
+            source = 'file:' + f
 
         else:  # option is numeric
             df = pd.DataFrame(
                 option,
                 index=self._sets['t'], columns=self._sets['x']
             )
-            self.debug.data_sources.set_key(k, 'model_config')
+            source = 'model_config'
+        for k in keys:
+            self.debug.data_sources.set_key(k, source)
 
         # Apply x_map if necessary
-        x_map = self.get_option(y + '.x_map', x=x)
+        x_map = self.get_option(y + '.x_map', x=xs[0])
         if x_map is not None:
-            df = self._apply_x_map(df, x_map, x)
-
-        if param == 'r' and (x in df.columns or x is None):
-            if x is None:
-                x_slice = slice(None)
-            else:
-                x_slice = x
-            # Convert power to energy for r, if necessary
-            r_unit = self.get_option(y + '.constraints.r_unit', x=x)
-            if r_unit == 'power':
-                df.loc[:, x_slice] = df.loc[:, x_slice] * time_res
-
-            # Scale r to a given maximum if necessary
-            scale = self.get_option(
-                y + '.constraints.r_scale_to_peak', x=x
-            )
-            if scale:
-                df.loc[:, x_slice] = self.scale_to_peak(df.loc[:, x_slice], scale)
-
-        if x is not None:
+            df = self._apply_x_map(df.copy() if shared else df, x_map, x,
+                                   param=param, y=y)
+            shared = False
+
+        if isinstance(x, list):
+            x_slices = [i for i in xs if i in df.columns]
+            # Locations without a column in the data are errors, unless
+            # their x_map has already been reported as wrong
+            reported = set((v.param, v.y, v.x) for v in self._validation.errors)
+            for i in xs:
+                if i not in x_slices and (param, y, i) not in reported:
+                    self._validation.add(
+                        'error', 'missing_column',
+                        'No data for this location in `{}`'.format(source),
+                        param=param, y=y, x=i
+                    )
+                    k = '{}.{}:{}'.format(param, y, i)
+                    self.debug.data_sources.set_key(k, '_NOT_FOUND_')
+            # Work off a copy of the columns, so that the DataFrame of
+            # a file, which is shared by all its readers, is not changed
+            df = df.reindex(columns=xs)
+            shared = False
+        elif x is None:
+            x_slices = [slice(None)]
+        else:
+            x_slices = [x] if x in df.columns else []
+
+        if param == 'r':
+            for x_slice in x_slices:
+                x_option = None if isinstance(x_slice, slice) else x_slice
+                r_unit = self.get_option(y + '.constraints.r_unit', x=x_option)
+                scale = self.get_option(
+                    y + '.constraints.r_scale_to_peak', x=x_option
+                )
+                if shared and (r_unit == 'power' or scale):
+                    df = df.copy()
+                    shared = False
+                # Convert power to energy for r, if necessary
+                if r_unit == 'power':
+                    df.loc[:, x_slice] = df.loc[:, x_slice] * time_res
+
+                # Scale r to a given maximum if necessary
+                if scale:
+                    df.loc[:, x_slice] = self.scale_to_peak(df.loc[:, x_slice], scale)
+
+        if x is not None and not isinstance(x, list):
             df = df.loc[:, x]
         return df
 
-    def _validate_param_df(self, param, y, df):
+    def _read_param_overrides(self, param, y, time_res, df, option,
+                              get_option_x):
+        """
+        Return ``df`` updated with the values of all locations whose
+        option, as returned by ``get_option_x(x)``, differs from the
+        generic ``option``. Locations are grouped by option and x_map,
+        so that each distinct file or value is read once and its
+        columns assigned at once. ``df`` is copied if there are any
+        such locations, since it may be shared by all readers of a file.
+
+        """
+        groups = collections.OrderedDict()
         for x in self._sets['x']:
-            if x not in df.columns:
-                if self._locations.at[x, y] == 0:
+            option_x = get_option_x(x)
+            if option != option_x:
+                x_map = self.get_option(y + '.x_map', x=x)
+                groups.setdefault((option_x, x_map), []).append(x)
+        if groups:
+            df = df.copy()
+        for (option_x, _), xs in groups.items():
+            values = self._read_param_for_tech(param, y, time_res,
+                                               option_x, x=xs)
+            for x in xs:
+                if x not in df.columns:
                     df[x] = np.nan
+            df.loc[:, xs] = values.values
+        return df
+
+    def _get_timeseries_filenames(self):
+        """
+        Returns the set of all files from which time series parameters
+        are read, for any tech and location.
+
+        """
+        filenames = set()
+        for param in self.config_model.timeseries_constraints:
+            for y in self._sets['y']:
+                if 'om' in param or 'export' in param:
+                    options = [(self.get_cost(param, y, k, x=x), x)
+                               for k in self._sets['k']
+                               for x in [None] + list(self._sets['x'])]
                 else:
-                    df[x] = 0
-                    k = '{}.{}:{}'.format(param, y, x)
-                    w = exceptions.ModelWarning
-                    message = 'Could not load data for {}'.format(k)
-                    warnings.warn(message, w)
-                    v = '_NOT_FOUND_'
-                    self.debug.data_sources.set_key(k, v)
+                    j = '.'.join([y, 'constraints', param])
+                    options = [(self.get_option(j, x=x), x)
+                               for x in [None] + list(self._sets['x'])]
+                for option, x in options:
+                    if isinstance(option, str):
+                        filenames.add(self._get_filename(param, option, y, x))
+        return filenames
+
+    def _load_timeseries_files(self):
+        """
+        Read all time series files concurrently, with the number of
+        threads given by the ``read_threads`` run setting, and
+        return a dict mapping filenames to the parsed DataFrames.
+
+        """
+        threads = self.config_run.get_key('read_threads', default=1)
+        filenames = sorted(self._get_timeseries_filenames())
+        if threads <= 1 or len(filenames) <= 1:
+            # Files are read on demand by _read_param_for_tech
+            return {}
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            dfs = executor.map(self._get_option_from_csv, filenames)
+            return dict(zip(filenames, dfs))
+
+    def _validate_param_df(self, param, y, df):
+        """
+        Return ``df`` with a column for each location, set to NaN for
+        locations where tech ``y`` is not allowed and else to 0 with a
+        warning. ``df`` is copied if any column is missing, since it
+        may be shared by all readers of a file.
+
+        """
+        missing = [x for x in self._sets['x'] if x not in df.columns]
+        if not missing:
+            return df
+        df = df.copy()
+        allowed = (self._locations.loc[missing, y] != 0).to_dict()
+        for x in missing:
+            if not allowed[x]:
+                df[x] = np.nan
+            else:
+                df[x] = 0
+                k = '{}.{}:{}'.format(param, y, x)
+                self._validation.add('warning', 'missing_data',
+                                     'Could not load data, set to 0',
+                                     param=param, y=y, x=x)
+                v = '_NOT_FOUND_'
+                self.debug.data_sources.set_key(k, v)
+        return df
 
     def _validate_param_dataset_consistency(self, dataset):
-        sources = self.debug.data_sources
-        missing_data = [kk for kk in sources.keys_nested()
-                        if sources.get_key(kk) == '_NOT_FOUND_']
-        if len(missing_data) > 0:
-            message = ('The following parameter values could not be read '
-                       'from file. They were automatically set to `0`: '
-                       + ', '.join(missing_data))
-            warnings.warn(message, exceptions.ModelWarning)
-
-        # Finally, check data consistency. For now, demand must be <= 0,
-        # and supply >=0, at all times.
-        # FIXME update these checks on implementing conditional param updates.
-        for y in self._sets['y_def_r']:
-            base_tech = self.get_parent(y)
-            possible_x = [x for x in self._sets['x']
-                          if self._locations.at[x, y] != 0]
-            for x in possible_x:
-                series = dataset['r'].loc[{'y': y, 'x': x}].to_pandas()
-                err_suffix = 'for tech: {}, at location: {}'.format(y, x)
-                if base_tech == 'demand':
-                    err = 'Demand resource must be <=0, ' + err_suffix
-                    assert (series <= 0).all(), err
-                elif base_tech == 'supply':
-                    err = 'Supply resource must be >=0, ' + err_suffix
-                    assert (series >= 0).all(), err
+        """
+        Check the assembled ``dataset``, raising a ModelError listing
+        every violation found while reading and checking the data,
+        or issuing a single ModelWarning if there are only warnings.
+        The report is kept in ``self.debug.validation``.
+
+        """
+        validation.validate_dataset(self, dataset, self._validation)
+        self.debug.validation = self._validation
+        self._validation.raise_or_warn()
 
     def read_data(self):
         """
@@ -879,6 +1126,20 @@ class Model(BaseModel):
         data = {}
         attrs = {}
         self.debug.data_sources = utils.AttrDict()
+        self._validation = validation.ValidationReport()
+
+        # With `data_chunks`, each time series is moved to disk as soon
+        # as it has been read, see _get_param_array
+        chunks = self.config_run.get_key('data_chunks', default=False)
+        if chunks:
+            try:
+                import dask.array  # pylint: disable=import-error,unused-variable
+            except ImportError:
+                e = exceptions.ModelError
+                raise e('The `data_chunks` setting requires Dask.')
+            self._data_chunks_dir = tempfile.TemporaryDirectory(
+                prefix='calliope_data_'
+            )
 
         # `time_res` never changes, so always reflects the spacing
         # of time step indices
@@ -905,6 +1166,13 @@ class Model(BaseModel):
                                self.config_model.timeseries_constraints}
         self._sets = {**self._sets, **ts_sets_constraints}
 
+        # Read all time series files up front, concurrently if enabled,
+        # unless they are to be held in memory one at a time
+        if chunks:
+            self._timeseries_files = {}
+        else:
+            self._timeseries_files = self._load_timeseries_files()
+
         for param in self.config_model.timeseries_constraints: #constraints
             param_data = {}
             if 'om' in param or 'export' in param: # cost constraints
@@ -917,19 +1185,16 @@ class Model(BaseModel):
 
                         cost_ts[k] = self._read_param_for_tech(param, y, time_res,
                                                        option, x=None)
-                        for x in self._sets['x']:
-                            # Check for each x whether it defines an override
-                            # that is different from the generic option, and if so,
-                            # update the dataframe
-                            option_x = self.get_cost(param, y, k, x=x)
-                            if option != option_x:
-                                cost_ts[k].loc[:, x] = self._read_param_for_tech(
-                                                            param, y, time_res,
-                                                            option_x, x=x)
-
-                        self._validate_param_df(param, y, cost_ts[k])  # Have all `x` been set?
+                        # Then update the dataframe for all x that define
+                        # an override different from the generic option
+                        cost_ts[k] = self._read_param_overrides(
+                            param, y, time_res, cost_ts[k], option,
+                            lambda x: self.get_cost(param, y, k, x=x)
+                        )
+
+                        cost_ts[k] = self._validate_param_df(param, y, cost_ts[k])  # Have all `x` been set?
                     # Create
-                    cost_ts = {k: xr.DataArray(v, dims=['t', 'x']) for k, v in cost_ts.items()}
+                    cost_ts = {k: self._get_param_array(v) for k, v in cost_ts.items()}
                     param_data[y] = xr.Dataset(cost_ts).to_array(dim='k')
             else:
                 for y in self._sets['y']:
@@ -940,20 +1205,23 @@ class Model(BaseModel):
 
                     constraint_ts = self._read_param_for_tech(param, y,
                                             time_res, option, x=None)
-                    for x in self._sets['x']:
-                        # Check for each x whether it defines an override
-                        # that is different from the generic option, and if so,
-                        # update the dataframe
-                        option_x = self.get_option(j, x=x)
-                        if option != option_x:
-                            constraint_ts.loc[:, x] = self._read_param_for_tech(param,
-                                                     y, time_res, option_x, x=x)
-
-                    self._validate_param_df(param, y, constraint_ts)  # Have all `x` been set?
-                    param_data[y] = xr.DataArray(constraint_ts, dims=['t', 'x'])
+                    # Then update the dataframe for all x that define
+                    # an override different from the generic option
+                    constraint_ts = self._read_param_overrides(
+                        param, y, time_res, constraint_ts, option,
+                        lambda x: self.get_option(j, x=x)
+                    )
+
+                    constraint_ts = self._validate_param_df(param, y, constraint_ts)  # Have all `x` been set?
+                    param_data[y] = self._get_param_array(constraint_ts)
 
             # Turn param_data into a DataArray
             data[param] = xr.Dataset(param_data).to_array(dim='y')
+            # Parameters that are constant over time are stored without
+            # their `t` dimension. `r` always keeps it since time masks
+            # and clustering operate on it
+            if param != 'r':
+                data[param] = time_funcs.reduce_constant_t(data[param])
 
         dataset = xr.Dataset(data)
         dataset.attrs = attrs
@@ -961,12 +1229,45 @@ class Model(BaseModel):
         # Check data consistency
         self._validate_param_dataset_consistency(dataset)
 
+        # With `data_chunks`, back the remaining data with Dask arrays
+        # chunked along t as well, so that time resolution adjustments
+        # are evaluated lazily
+        if chunks:
+            dataset = dataset.chunk({'t': int(chunks)})
+
         # Make sure there are no NaNs anywhere in the data
         # to prevent potential solver problems
         dataset = dataset.fillna(0)
 
+        self._timeseries_files = {}
         self.data = dataset
 
+    def _get_param_array(self, df):
+        """
+        Returns the (t, x) DataFrame ``df`` of a time series parameter
+        as a DataArray. With the ``data_chunks`` run setting, the values
+        are written to a file in a temporary directory kept for the
+        lifetime of the model instead, and the DataArray is backed by a
+        Dask array chunked along t that memory-maps the file, so that
+        only one time series is held in memory at a time.
+
+        """
+        chunks = self.config_run.get_key('data_chunks', default=False)
+        if not chunks:
+            return xr.DataArray(df, dims=['t', 'x'])
+        import dask.array as da  # pylint: disable=import-error
+        fd, path = tempfile.mkstemp(suffix='.npy',
+                                    dir=self._data_chunks_dir.name)
+        os.close(fd)
+        np.save(path, df.values.astype(float))
+        # Files read for this time series are no longer needed in memory
+        Model._get_option_from_csv.cache_clear()
+        values = np.load(path, mmap_mode='r')
+        values = da.from_array(values, chunks=(int(chunks), values.shape[1]),
+                               name='calliope-data-' + os.path.basename(path))
+        return xr.DataArray(values, dims=['t', 'x'],
+                            coords={'t': df.index, 'x': list(df.columns)})
+
     def _get_t_max_demand(self):
         """Return timestep index with maximum demand"""
         # FIXME needs unit tests
@@ -975,7 +1276,9 @@ class Model(BaseModel):
             ys = [y for y in self.data['y'].values
                   if self.get_option(y + '.carrier') == c]
             # Get copy of r data array
-            r_carrier = self.data['r'].loc[{'y': ys}].copy()
+            r_carrier = time_funcs.broadcast_t(
+                self.data['r'].loc[{'y': ys}], self.data['t']
+            ).copy()
             # Only kep negative (=demand) values
             r_carrier.values[r_carrier.values > 0] = 0
             t_max_demands[c] = (r_carrier.sum(dim='y').sum(dim='x')
@@ -1002,56 +1305,159 @@ class Model(BaseModel):
     def _param_populator(self, src_data, src_param, levels):
         """
         Returns a `getter` function that returns (x, t)-specific
-        values for parameters, used in parameter updating
+        values for parameters, used in parameter updating. Parameters
+        stored without a `t` dimension return the same value for all t.
         """
+        has_t = 't' in src_data[src_param].dims
+        levels = [i for i in levels if i != 't' or has_t]
         getter_data = (src_data[src_param].to_dataframe().reorder_levels(levels)
                                                          .to_dict()[src_param])
         def getter_constraint(m, y, x, t):  # pylint: disable=unused-argument
-            return getter_data[(y, x, t)]
+            return getter_data[(y, x, t) if has_t else (y, x)]
         def getter_cost(m, y, x, t, k):  # pylint: disable=unused-argument
-            return getter_data[(y, x, t, k)]
-        if len(src_data[src_param].dims) == 4: # costs
+            return getter_data[(y, x, t, k) if has_t else (y, x, k)]
+        if 'k' in src_data[src_param].dims: # costs
             return getter_cost
         else: # all other constraints
             return getter_constraint
 
-    def _param_updater(self, src_data, src_param, t_offset=None):
+    def _param_updater(self, param, param_object):
         """
-        Returns a `getter` function that returns (x, t)-specific
-        values for parameters, used in parameter updating
+        Returns a function that bulk-updates the mutable Pyomo Param
+        ``param_object`` from ``self.data[param]``, used in parameter
+        updating. The Param keys and their positions in the data array
+        are computed once; the returned function takes an integer
+        timestep offset and returns the keys whose value changed.
+
         """
-        if len(src_data[src_param].dims) == 4: # costs
-            levels = ['y', 'x', 't', 'k']
-        else: # all other constraints
-            levels = ['y', 'x', 't']
-        getter_data = (src_data[src_param].to_dataframe()
-                                          .reorder_levels(levels)
-                                          .to_dict()[src_param])
-        def getter(m, i):  # pylint: disable=unused-argument
-            # i is the key of the Pyomo Param, which is (y, x, t)
-            # for constraints and (y, x, t, k) for costs
-            j = list(i)
-            if t_offset:
-                j[2] = self.get_t(j[2], t_offset) # change time
-            return getter_data[tuple(j)]
-
-        return getter
+        dims = [i for i in ['y', 'x', 't', 'k'] if i in self.data[param].dims]
+        # Position of each data dimension in the Param keys, which are
+        # indexed over t even if the data is constant over time
+        key_dims = ['y', 'x', 't', 'k'] if 'k' in dims else ['y', 'x', 't']
+        key_axes = [key_dims.index(i) for i in dims]
+        positions = []
+        for dim in dims:
+            if dim == 't':
+                positions.append(self.time_index.pos)
+            else:
+                coord = self.data[param].coords[dim].values
+                positions.append({v: i for i, v in enumerate(coord)})
+        keys = list(param_object.keys())
+        if not keys:
+            return lambda t_offset: []
+        if len(dims) == 1:
+            keys_tuples = [(i, ) for i in keys]
+        else:
+            keys_tuples = keys
+        index = [np.array([pos[k[i]] for k in keys_tuples], dtype=int)
+                 for i, pos in zip(key_axes, positions)]
+        t_axis = dims.index('t') if 't' in dims else None
+        state = {'values': None}
+
+        def updater(t_offset=0):
+            idx = list(index)
+            if t_axis is not None and t_offset:
+                idx[t_axis] = idx[t_axis] + t_offset
+            values = (self.data[param].transpose(*dims).values[tuple(idx)]
+                      .astype(float))
+            if state['values'] is None:
+                changed = np.ones(len(keys), dtype=bool)
+            else:
+                changed = values != state['values']
+            state['values'] = values
+            changed_keys = [keys[i] for i in np.flatnonzero(changed)]
+            param_object.store_values(
+                dict(zip(changed_keys, values[changed].tolist())),
+                check=False)
+            return changed_keys
+
+        return updater
+
+    def _get_param_updaters(self):
+        """Returns the Param updaters for the current model, creating
+        them on first use."""
+        if getattr(self, '_param_updaters', (None, ))[0] is not self.m:
+            # Parameters stored without a `t` dimension are constant
+            # over time, so never change between windows
+            params = [i for i in self.config_model.timeseries_constraints
+                      if 't' in self.data[i].dims]
+            params.append('s_init')
+            updaters = {param: self._param_updater(param,
+                                                   getattr(self.m, param))
+                        for param in params}
+            self._param_updaters = (self.m, updaters)
+        return self._param_updaters[1]
 
     def update_parameters(self, t_offset):
-        d = self.data
+        """
+        Update the mutable Params of the model to the data shifted by
+        ``t_offset``, and the storage initialization to the current
+        ``self.data['s_init']``.
 
-        for param in self.config_model.timeseries_constraints:
-            y_set = list(self._sets['y_def_' + param])
-            initializer = self._param_updater(d, param, t_offset)
-            param_object = getattr(self.m, param)
-            for i in param_object.iterkeys():
-                param_object[i] = initializer(self.m, i)
+        Returns a dict with the keys of the entries of each Param whose
+        value changed.
 
-        s_init = self.data['s_init'].to_dataframe().to_dict()['s_init']
-        s_init_initializer = lambda m, y, x: float(s_init[x, y])
-        for y in self.m.y_pc:
-            for x in self.m.x:
-                self.m.s_init[y, x] = s_init_initializer(self.m, y, x)
+        """
+        if not isinstance(t_offset, (int, np.integer)):
+            # Convert a time offset into a number of timesteps
+            t_first = next(iter(self.m.t))
+            t_offset = (self.time_index.get_loc(t_first + t_offset)
+                        - self.time_index.get_loc(t_first))
+
+        changed = {}
+        for param, updater in self._get_param_updaters().items():
+            shift = 0 if param == 's_init' else t_offset
+            changed[param] = updater(shift)
+        return changed
+
+    def _get_var_shifts(self, t_offset):
+        """
+        Returns, for each time-indexed variable of the current model,
+        its entries and for each entry the position of the entry at
+        the same index ``t_offset`` timesteps later, or at the last
+        timestep if that is beyond the model's timesteps. Computed
+        once per generated model and offset.
+
+        """
+        if getattr(self, '_var_shifts', (None, ))[0] is not self.m:
+            self._var_shifts = (self.m, {})
+        cache = self._var_shifts[1]
+        if t_offset not in cache:
+            t_list = list(self.m.t)
+            t_pos = {t: i for i, t in enumerate(t_list)}
+            shifts = {}
+            for var in self.m.component_objects(po.Var, active=True):
+                set_tuple = getattr(var.index_set(), 'set_tuple', [])
+                names = [i.name for i in set_tuple]
+                if 't' not in names:
+                    continue
+                # Sparse sets make up several entries of the flat keys
+                t_axis = sum(i.dimen for i in set_tuple[:names.index('t')])
+                keys = list(var.keys())
+                entries = {k: i for i, k in enumerate(keys)}
+                source = np.arange(len(keys))
+                for i, k in enumerate(keys):
+                    pos = min(t_pos[k[t_axis]] + t_offset, len(t_list) - 1)
+                    k_src = k[:t_axis] + (t_list[pos], ) + k[t_axis + 1:]
+                    source[i] = entries.get(k_src, i)
+                shifts[var.name] = ([var[k] for k in keys], source)
+            cache[t_offset] = shifts
+        return cache[t_offset]
+
+    def shift_variable_values(self, t_offset):
+        """
+        Shift the values of all time-indexed variables back by
+        ``t_offset`` timesteps, so that the solution of the previous
+        window for a point in time becomes the starting point for the
+        timestep at which the next window sees that point in time.
+        The last ``t_offset`` timesteps take the values of the last
+        timestep. Used to warmstart the next window.
+
+        """
+        for var_data, source in self._get_var_shifts(t_offset).values():
+            values = [var_data[i].value for i in source]
+            for v, value in zip(var_data, values):
+                v.value = value
 
     def _set_t_end(self):
         # t_end is the timestep previous to t_start + horizon,
@@ -1081,11 +1487,30 @@ class Model(BaseModel):
         #
         # Setup
         #
-        self.m = m = po.ConcreteModel()
         d = self.data
         self.t_start = t_start
         self.t_max_demand = self._get_t_max_demand()
 
+        if self.backend == 'matrix':
+            # The matrix backend builds the problem directly as a sparse
+            # coefficient matrix, there is no Pyomo model instance
+            self.m = None
+            if self.mp is None or not self.mp.cached:
+                self._init_option_table()
+                self.mp = matrix.generate(self)
+                if self._problem_cache_key:
+                    cache_dir = self.config_run.problem_cache
+                    problem_cache.store(self._problem_cache_key, self,
+                                        self.mp, cache_dir)
+            return None
+        elif self.backend != 'pyomo':
+            e = exceptions.ModelError
+            raise e('Invalid backend: `{}`'.format(self.backend))
+
+        self._init_option_table()
+
+        self.m = m = po.ConcreteModel()
+
         #
         # Sets
         #
@@ -1133,6 +1558,14 @@ class Model(BaseModel):
         # Technologies without parasitics
         set_no_parasitics = set(self._sets['y']) - set(self._sets['y_p'])
         m.y_np = po.Set(initialize=set_no_parasitics, within=m.y)
+        # Valid (carrier, tech, location) combinations for es_prod/es_con,
+        # and the subsets for techs with parasitics, for ec_prod/ec_con
+        m.cyx_prod = po.Set(initialize=self._sets['cyx_prod'], dimen=3, ordered=True)
+        m.cyx_con = po.Set(initialize=self._sets['cyx_con'], dimen=3, ordered=True)
+        m.cyx_prod_p = po.Set(initialize=self._sets['cyx_prod_p'], dimen=3, ordered=True)
+        m.cyx_con_p = po.Set(initialize=self._sets['cyx_con_p'], dimen=3, ordered=True)
+        # Valid (tech, location) combinations for export
+        m.yx_export = po.Set(initialize=self._sets['yx_export'], dimen=2, ordered=True)
 
         #
         # Parameters
@@ -1140,7 +1573,7 @@ class Model(BaseModel):
 
         for param in self.config_model.timeseries_constraints:
             y_set = list(getattr(m, 'y_def_' + param))
-            if len(d[param].dims) == 4: # costs
+            if 'k' in d[param].dims: # costs
                 initializer = self._param_populator(d, param, ['y', 'x', 't', 'k'])
                 setattr(m, param, po.Param(y_set, m.x, m.t, m.k,
                                            initialize=initializer, mutable=True))
@@ -1250,7 +1683,9 @@ class Model(BaseModel):
     def _solve(self, warmstart, solver_kwargs):
         warning = None
         solver = self.config_run.get_key('solver')
-        if warmstart:
+        if self.backend == 'matrix':
+            results = self.opt.solve(self.mp.path, tee=True, **solver_kwargs)
+        elif warmstart:
             try:
                 results = self.opt.solve(self.m, warmstart=True,
                                          tee=True, **solver_kwargs)
@@ -1287,7 +1722,8 @@ class Model(BaseModel):
                     self.opt.options[k] = cr.solver_options.get_key(k)
             except KeyError:
                 pass
-            if cr.get_key('debug.symbolic_solver_labels', default=False):
+            if (cr.get_key('debug.symbolic_solver_labels', default=False)
+                    and self.backend != 'matrix'):
                 solver_kwargs['symbolic_solver_labels'] = True
         if cr.get_key('debug.keep_temp_files', default=False):
             solver_kwargs['keepfiles'] = True
@@ -1302,6 +1738,12 @@ class Model(BaseModel):
             os.makedirs(logdir)
             TempfileManager.tempdir = logdir
 
+        if self.backend == 'matrix' and not self.mp.cached:
+            fd, self.mp.path = tempfile.mkstemp(prefix='calliope_', suffix='.lp',
+                                                dir=TempfileManager.tempdir)
+            os.close(fd)
+            self.mp.write_lp(self.mp.path)
+
         self.run_times["preprocessed"] = time.time()
         if self.verbose:
             print('[{}] Model preprocessing took {:.2f} seconds.'
@@ -1312,6 +1754,10 @@ class Model(BaseModel):
         except:
             logging.critical('Solver output:\n{}'.format('\n'.join(self.pyomo_output)))
             raise
+        finally:
+            if (self.backend == 'matrix' and not self.mp.cached and
+                    not cr.get_key('debug.keep_temp_files', default=False)):
+                os.remove(self.mp.path)
 
         if warnmsg:
             warnings.warn(warnmsg, exceptions.ModelWarning)
@@ -1322,36 +1768,97 @@ class Model(BaseModel):
             print('[{}] Solving model took {:.2f} seconds.'
                   .format(_get_time(), self.run_times["solved"] - self.run_times["preprocessed"]))
 
+    # Products derived from the solution by process_solution(), mapped to
+    # the products they need in the solution to be computed
+    _SOLUTION_PRODUCTS = collections.OrderedDict([
+        ('levelized_cost', []),
+        ('capacity_factor', []),
+        ('metadata', []),
+        ('summary', ['levelized_cost']),
+        ('groups', []),
+        ('shares', ['metadata', 'summary', 'groups']),
+    ])
+
+    def _get_solution_products(self):
+        products = self.config_run.get_key('output.products', default='all')
+        if products == 'all':
+            return list(self._SOLUTION_PRODUCTS.keys())
+        if not isinstance(products, list):
+            products = [products]
+        unknown = [i for i in products if i not in self._SOLUTION_PRODUCTS]
+        if unknown:
+            e = exceptions.ModelError
+            raise e('Unknown solution product(s) in `output.products`: {}. '
+                    'Available: {}'.format(unknown,
+                                           list(self._SOLUTION_PRODUCTS)))
+        return products
+
+    def _compute_solution_product(self, name):
+        if name == 'levelized_cost':
+            return self.get_levelized_cost()
+        elif name == 'capacity_factor':
+            return self.get_capacity_factor()
+        elif name == 'metadata':
+            df, index_name = self.get_metadata(), 'y'
+        elif name == 'summary':
+            df, index_name = self.get_summary(), 'techs'
+        elif name == 'groups':
+            df, index_name = self.get_groups(), 'techs'
+        elif name == 'shares':
+            groups = self.solution['groups'].to_pandas()
+            df, index_name = self.get_shares(groups), 'techs'
+        df.columns.name = 'cols_' + name
+        df.index.name = index_name
+        return xr.DataArray(df)
+
+    def get_solution_product(self, name):
+        """
+        Return the solution product ``name`` (one of ``levelized_cost``,
+        ``capacity_factor``, ``metadata``, ``summary``, ``groups`` or
+        ``shares``) as a DataArray. Products not selected with the
+        ``output.products`` run setting are computed on first access
+        and then added to ``self.solution``.
+
+        """
+        if name not in self._SOLUTION_PRODUCTS:
+            raise KeyError('Unknown solution product: {}'.format(name))
+        if name not in self.solution.data_vars:
+            self._add_solution_products([name])
+        return self.solution[name]
+
+    def _add_solution_products(self, names):
+        """
+        Compute the solution products ``names`` and any products they
+        depend on, merging all products whose dependencies are already
+        in the solution into it at once.
+
+        """
+        pending = []
+        for name in names:
+            for i in self._SOLUTION_PRODUCTS[name] + [name]:
+                if i not in self.solution.data_vars and i not in pending:
+                    pending.append(i)
+        pending = [i for i in self._SOLUTION_PRODUCTS if i in pending]
+        while pending:
+            ready = [i for i in pending
+                     if all(j in self.solution.data_vars
+                            for j in self._SOLUTION_PRODUCTS[i])]
+            products = xr.Dataset({i: self._compute_solution_product(i)
+                                   for i in ready})
+            self.solution = self.solution.merge(products)
+            pending = [i for i in pending if i not in ready]
+
     def process_solution(self):
         """
         Called from both load_solution() and load_solution_iterative()
+
+        Only the products selected with ``output.products`` (all of them
+        by default) are computed here, see get_solution_product().
+
         """
-        # Add levelized cost
-        self.solution = self.solution.merge(self.get_levelized_cost().to_dataset(name='levelized_cost'))
-        # Add capacity factor
-        self.solution = self.solution.merge(self.get_capacity_factor().to_dataset(name='capacity_factor'))
-        # Add metadata
-        md = self.get_metadata()
-        md.columns.name = 'cols_metadata'
-        md.index.name = 'y'
-        self.solution = self.solution.merge(xr.DataArray(md).to_dataset(name='metadata'))
-        # Add summary
-        summary = self.get_summary()
-        summary.columns.name = 'cols_summary'
-        summary.index.name = 'techs'
-        self.solution = self.solution.merge(xr.DataArray(summary).to_dataset(name='summary'))
-        # Add groups
-        groups = self.get_groups()
-        groups.columns.name = 'cols_groups'
-        groups.index.name = 'techs'
-        self.solution = self.solution.merge(xr.DataArray(groups).to_dataset(name='groups'))
-        # Add shares
-        shares = self.get_shares(groups)
-        shares.columns.name = 'cols_shares'
-        shares.index.name = 'techs'
-        self.solution = self.solution.merge(xr.DataArray(shares).to_dataset(name='shares'))
         # Add time resolution
         self.solution = self.solution.merge(self.data['_time_res'].copy(deep=True).to_dataset(name='time_res'))
+        self._add_solution_products(self._get_solution_products())
         # Add model and run configuration
         self.solution.attrs['config_run'] = self.config_run
         self.solution.attrs['config_model'] = self.config_model
@@ -1376,7 +1883,32 @@ class Model(BaseModel):
             indices as strings, e.g. ('y', 'x', 't');
             if not given, they are auto-detected
 
+        Variables are extracted once per solve, and a copy of the
+        extracted variable is returned on each call.
+
+        """
+        return self._get_cached_var(var, dims, standardize_coords).copy()
+
+    def _get_cached_var(self, var, dims=None, standardize_coords=True):
+        """
+        Like get_var(), but returns the cached object itself, which
+        must not be modified in place.
+
         """
+        key = ('var', var, tuple(dims) if dims else None, standardize_coords)
+        cache = self._get_solution_cache()
+        if key not in cache:
+            cache[key] = self._get_var(var, dims, standardize_coords)
+        return cache[key]
+
+    def _get_solution_cache(self):
+        if not hasattr(self, '_solution_cache'):
+            self._solution_cache = {}
+        return self._solution_cache
+
+    def _get_var(self, var, dims=None, standardize_coords=True):
+        if self.backend == 'matrix':
+            return self._get_matrix_var(var, dims)
         m = self.m
         try:
             var_container = getattr(m, var)
@@ -1385,9 +1917,24 @@ class Model(BaseModel):
         # Get dims
         if not dims:
             dims = [i.name for i in var_container.index_set().set_tuple]
+        # Expand sparse sets into the dimensions they span, and keep
+        # track of the full coordinates to reindex them to
+        full_coords = {}
+        expanded_dims = []
+        for dim in dims:
+            if dim in sets.SPARSE_SETS:
+                expanded_dims += sets.SPARSE_SETS[dim]
+                full_coords.update({d: self._sets[d]
+                                    for d in sets.SPARSE_SETS[dim]})
+            else:
+                expanded_dims.append(dim)
+        dims = expanded_dims
         # Make sure standard coordinate names are used
         if standardize_coords:
+            full_coords = {k.split('_')[0]: v for k, v in full_coords.items()}
             dims = [i.split('_')[0] for i in dims]
+        if len(dims) >= 3:
+            return self._get_var_array(var, var_container, dims, full_coords)
         result = pd.DataFrame.from_dict(var_container.get_values(), orient='index')
         if result.empty:
             raise exceptions.ModelError('Variable {} has no data.'.format(var))
@@ -1400,23 +1947,96 @@ class Model(BaseModel):
             # if len(dims) is 2, we already have a well-formed DataFrame
             result = result.unstack(level=0)
             result = result.sort_index()
-        else:  # len(dims) >= 3
-            result = xr.DataArray.from_series(result)
+        return result
+
+    def _get_var_positions(self, var, var_container, dims, full_coords):
+        """
+        Returns the sorted coordinates of each of ``dims``, for each of
+        them an integer array of the positions of the variable's index
+        entries along it, and the list of the variable's entries in
+        the same order. Computed once per generated model.
+
+        """
+        if getattr(self, '_var_positions', (None, ))[0] is not self.m:
+            self._var_positions = (self.m, {})
+        cache = self._var_positions[1]
+        key = (var, tuple(dims))
+        if key not in cache:
+            keys = list(var_container.keys())
+            if not keys:
+                raise exceptions.ModelError('Variable {} has no data.'.format(var))
+            coords = []
+            positions = []
+            for i, dim in enumerate(dims):
+                values = [k[i] for k in keys]
+                if dim in full_coords:
+                    # Combinations not in the sparse set are left at zero
+                    coord = sorted(full_coords[dim])
+                else:
+                    coord = sorted(set(values))
+                pos = {v: j for j, v in enumerate(coord)}
+                coords.append(coord)
+                positions.append(np.array([pos[v] for v in values], dtype=int))
+            var_data = [var_container[k] for k in keys]
+            cache[key] = (coords, tuple(positions), var_data)
+        return cache[key]
+
+    def _get_var_array(self, var, var_container, dims, full_coords):
+        """
+        Return variable ``var`` as an xarray.DataArray over ``dims``,
+        filling a preallocated array with the variable values by their
+        precomputed positions.
+
+        """
+        coords, positions, var_data = self._get_var_positions(
+            var, var_container, dims, full_coords
+        )
+        # Unset values (None) become NaN
+        values = np.array([v.value for v in var_data], dtype=float)
+        if full_coords:
+            result = np.zeros([len(i) for i in coords])
+            values[np.isnan(values)] = 0
+        else:
+            result = np.full([len(i) for i in coords], np.nan)
+        result[positions] = values
+        return xr.DataArray(result, dims=dims, coords=dict(zip(dims, coords)))
+
+    def _get_matrix_var(self, var, dims=None):
+        result = self.mp.get_var(var)
+        if dims:
+            result = result.rename(dict(zip(result.dims, dims)))
+        if len(result.dims) == 1:
+            result = result.to_pandas().sort_index()
+        elif len(result.dims) == 2:
+            # Same orientation as the Pyomo results, dims[0] as columns
+            result = result.to_pandas().T.sort_index()
         return result
 
     def get_ec(self, what='prod'):
-        es = self.get_var('es_' + what)
+        key = ('ec', what)
+        cache = self._get_solution_cache()
+        if key not in cache:
+            cache[key] = self._get_ec(what)
+        return cache[key].copy()
+
+    def _get_ec(self, what):
+        es = self._get_cached_var('es_' + what)
         try:
-            ec = self.get_var('ec_' + what)
+            ec = self._get_cached_var('ec_' + what)
         except exceptions.ModelError:  # ec has no data
             # Skip all the rest and return es straight away
             return es
         # For those techs that have an `ec`, replace their `es` with `ec`,
         # for the others, `ec` is `es`, so no change needed
-        for carrier in ec.coords['c'].values:
-            for tech in ec.coords['y'].values:
-                es.loc[dict(c=carrier, y=tech)] = ec.loc[dict(c=carrier, y=tech)]
-        return es  # the variable is called es, but the thing is now ec
+        has_ec = xr.DataArray(
+            np.in1d(es['c'].values, ec['c'].values)[:, np.newaxis]
+            & np.in1d(es['y'].values, ec['y'].values)[np.newaxis, :],
+            dims=['c', 'y'], coords={'c': es['c'], 'y': es['y']}
+        )
+        has_ec = xr.broadcast(has_ec, es)[0].transpose(*es.dims)
+        ec = ec.reindex_like(es).transpose(*es.dims)
+        return xr.DataArray(np.where(has_ec.values, ec.values, es.values),
+                            dims=es.dims, coords=es.coords)
 
     def get_ec_sum(self):
         ec = self.get_ec('prod') + self.get_ec('con')
@@ -1523,14 +2143,11 @@ class Model(BaseModel):
         return arr
 
     def _get_time_res_sum(self):
-        m = self.m
-        time_res = self.data['_time_res'].to_series()
-        weights = self.data['_weights'].to_series()
-
         try:  # Try loading time_res_sum from operational mode
             time_res_sum = self.data.attrs['time_res_sum']
         except KeyError:
-            time_res_sum = sum(time_res.at[t] * weights.at[t] for t in m.t)
+            time_res_sum = float((self.data['_time_res']
+                                  * self.data['_weights']).sum())
         return time_res_sum
 
     def get_capacity_factor(self):
@@ -1597,39 +2214,33 @@ class Model(BaseModel):
         # df['type'] = df.index.map(self.get_parent)
 
         # Get the basename of each tech (i.e., 'hvac' for 'hvac:location1')
-        df['index_name'] = df.index
-        basenames = [i[0] for i in df.index_name.str.split(':').tolist()]
-
-        # Add this to the summary df
-        df['basename'] = basenames
-
-        # Now go through each transmission tech and sum it up into one row,
-        # appending this to the summary df
-        transmission_basetechs = set([t for t in df.basename
-                                      if self.get_parent(t)
-                                      == 'transmission'])
-
-        for basename in transmission_basetechs:
-            if df.basename.str.contains(basename).any():
-                temp = df.query('basename == "{}"'.format(basename))
-                temp_sum = temp.sum()
-                cf_cost_cols = (['cf'] +
-                                [c for c in df.columns if 'cost_' in c])
-                temp_cf_cost = temp.loc[:, cf_cost_cols] \
-                                   .mul(temp.loc[:, 'e_prod'], axis=0) \
-                                   .sum() / temp.loc[:, 'e_prod'].sum()
-                temp_sum.loc[cf_cost_cols] = temp_cf_cost
-                temp_sum.index_name = basename
-                temp_sum.type = 'transmission'
-                df = df.append(temp_sum, ignore_index=True)
+        basenames = pd.Series([i.split(':')[0] for i in df.index],
+                              index=df.index)
+        is_transmission = {b: self.get_parent(b) == 'transmission'
+                           for b in basenames.unique()}
+        basenames = basenames[basenames.map(is_transmission).astype(bool)]
+
+        # Sum up each transmission tech into one row per basename, with
+        # capacity factor and costs weighted by production, and append
+        # these to the summary df
+        if len(basenames) > 0:
+            transmission = df.loc[basenames.index, :]
+            grouped = transmission.groupby(basenames)
+            totals = grouped.sum()
+            cf_cost_cols = (['cf'] +
+                            [c for c in df.columns if 'cost_' in c])
+            weighted = (transmission.loc[:, cf_cost_cols]
+                                    .mul(transmission.loc[:, 'e_prod'], axis=0)
+                                    .groupby(basenames).sum())
+            with np.errstate(divide='ignore', invalid='ignore'):
+                totals.loc[:, cf_cost_cols] = weighted.div(totals['e_prod'],
+                                                           axis=0)
+            df = pd.concat([df, totals.sort_index()])
 
         # Finally, drop the transmission techs with ':' in their name,
-        # only keeping the summary rows, drop temporary columns, and re-set
-        # the index
-        df = df[~df.index_name.str.contains(':')]
-        df = df.set_index('index_name')
+        # only keeping the summary rows
+        df = df[~df.index.str.contains(':')]
         df.index.name = 'y'
-        df = df.drop(['basename'], axis=1)
 
         return df.sort_values(by=sort_by, ascending=False)
 
@@ -1654,22 +2265,54 @@ class Model(BaseModel):
         return df
 
     def get_shares(self, groups):
-        from . import analysis
+        """
+        Returns the share of each group's members in the total of all
+        techs of the group's type, for e_prod, e_con and e_cap, as
+        :func:`calliope.analysis.get_group_share` does for one group.
+
+        """
         vars_ = ['e_prod', 'e_con', 'e_cap']
-        df = pd.DataFrame(index=groups.index, columns=vars_)
-        for var in vars_:
-            for index, row in groups.iterrows():
-                group_members = row['members'].split('|')
-                group_type = row['type']
-                share = analysis.get_group_share(self.solution, group_members,
-                                                 group_type, var=var)
-                df.at[index, var] = share.to_pandas()
-        return df
+        summary = self.solution['summary'].to_pandas().loc[:, vars_]
+        summary = summary.astype(float).fillna(0)
+        meta_type = self.solution['metadata'].to_pandas()['type']
+        pos = {y: i for i, y in enumerate(summary.index)}
+
+        def get_techs(techs, group_type):
+            if group_type == 'transmission':
+                # Transmission techs are in the summary by base tech name
+                techs = set([i.split(':')[0] for i in techs])
+            return [pos[i] for i in techs]
+
+        # Membership matrices of groups x summary techs, for the group's
+        # members and for all techs of the group's type
+        members = np.zeros((len(groups), len(summary)))
+        totals = np.zeros((len(groups), len(summary)))
+        type_techs = {}
+        for i, (group_members, group_type) in enumerate(
+                zip(groups['members'], groups['type'])):
+            if group_type not in type_techs:
+                type_techs[group_type] = get_techs(
+                    meta_type.index[meta_type == group_type], group_type
+                )
+            members[i, get_techs(group_members.split('|'), group_type)] = 1
+            totals[i, type_techs[group_type]] = 1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            shares = members.dot(summary.values) / totals.dot(summary.values)
+        return pd.DataFrame(shares, index=groups.index, columns=vars_)
+
+    def load_solution_iterative(self, node_vars, totals, costs):
+        """
+        ``node_vars`` is a list with the node variables of each window,
+        either as Datasets or as paths to the NetCDF files they were
+        streamed to, and ``totals`` and ``costs`` are summed over all
+        windows.
 
-    def load_solution_iterative(self, node_vars, total_vars, cost_vars):
-        totals = sum(total_vars)
-        costs = sum(cost_vars)
-        node = xr.concat(node_vars, dim='t')
+        """
+        if node_vars and not isinstance(node_vars[0], xr.Dataset):
+            node = _open_window_files(node_vars)
+        else:
+            node = xr.concat(node_vars, dim='t')
         # We are simply concatenating the same timesteps over and over again
         # when we concatenate the indivudal runs, so we need to set the
         # correct time axis again
@@ -1694,7 +2337,6 @@ class Model(BaseModel):
         """
         o = self.config_model
         d = self.data
-        time_res = d['_time_res'].to_series()
         window_adj = int(self.config_model.opmode.window / d.attrs['time_res'])
         steps = [self._sets['t'][i]
                  for i in range(len(self._sets['t']))
@@ -1702,9 +2344,16 @@ class Model(BaseModel):
         # Remove the last step - since we look forward at each step,
         # it would take us beyond actually existing data
         steps = steps[:-1]
+        # If streaming, each window's node variables are written to their
+        # own file in this directory as soon as they are extracted, and
+        # only the file paths are kept in node_vars
+        stream_dir = self.config_run.get_key('output.stream', default=False)
+        if stream_dir:
+            os.makedirs(stream_dir, exist_ok=True)
         node_vars = []
-        total_vars = []
-        cost_vars = []
+        # Totals and costs are summed up as we go
+        totals = 0
+        costs = 0
         d.attrs['time_res_sum'] = 0
         # This will fail if the time range given is too short, i.e. there are
         # no future timesteps to consider.
@@ -1723,8 +2372,11 @@ class Model(BaseModel):
                 # we use an offset when updating parameter data so that
                 # the correct values are read into the "incorrect" timesteps.
                 self.update_parameters(t_offset=step - steps[0])
+                if iterative_warmstart:
+                    # Start from the previous window's solution, moved
+                    # to the timesteps of the current window
+                    self.shift_variable_values(window_adj)
                 self.solve(warmstart=iterative_warmstart)
-            self.load_results()
 
             # Gather relevant model results over decision interval, so
             # we only grab [0:window/time_res_static] steps, where
@@ -1736,15 +2388,22 @@ class Model(BaseModel):
                 # Non-final iterations only save data from window
                 stepsize = int(self.config_model.opmode.window / d.attrs['time_res'])
 
-            node = self.get_node_variables()
-            node_vars.append(node[dict(t=slice(0, stepsize))])
+            node = self.get_node_variables()[dict(t=slice(0, stepsize))]
+            if stream_dir:
+                window_start = index * window_adj
+                node['t'] = self._sets['t'][window_start:window_start + stepsize]
+                node_vars.append(_write_window_file(
+                    node, stream_dir, index,
+                    self.config_run.get_key('output.encoding', default=None)
+                ))
+            else:
+                node_vars.append(node)
             # Get totals
-            totals = self.get_totals(t_subset=slice(0, stepsize))
-            total_vars.append(totals)
-            costs = self.get_costs(t_subset=slice(0, stepsize)).to_dataset(name='costs')
-            cost_vars.append(costs)
+            totals = totals + self.get_totals(t_subset=slice(0, stepsize))
+            costs = costs + self.get_costs(t_subset=slice(0, stepsize)).to_dataset(name='costs')
 
-            timesteps = [time_res.at[t] for t in self.m.t][0:stepsize]
+            timesteps = [self.time_index.get_time_res(t)
+                         for t in self.m.t][0:stepsize]
             d.attrs['time_res_sum'] += sum(timesteps)
 
             # Save state of storage for carry over to next iteration
@@ -1756,13 +2415,18 @@ class Model(BaseModel):
             storage_state_index = int(storage_state_index)
             d['s_init'] = s[dict(t=storage_state_index)].to_pandas().T
 
-        self.load_solution_iterative(node_vars, total_vars, cost_vars)
+        self.load_solution_iterative(node_vars, totals, costs)
 
     def load_results(self):
         """Load results into model instance for access via model variables."""
+        # Variables extracted from the previous solution are stale
+        self._solution_cache = {}
         not_optimal = (self.results['Solver'][0]['Termination condition'].key
                        != 'optimal')
-        r = self.m.solutions.load_from(self.results)
+        if self.backend == 'matrix':
+            r = self.mp.load_results(self.results)
+        else:
+            r = self.m.solutions.load_from(self.results)
         if r is False or not_optimal:
             logging.critical('Solver output:\n{}'.format('\n'.join(self.pyomo_output)))
             logging.critical(self.results.Problem)
@@ -1774,7 +2438,11 @@ class Model(BaseModel):
             raise exceptions.ModelError(message)
 
     def save_solution(self, how):
-        """Save model solution. ``how`` can be 'netcdf' or 'csv'"""
+        """
+        Save model solution. ``how`` can be 'netcdf', 'zarr', 'parquet',
+        'feather' or 'csv'
+
+        """
 
         if 'path' not in self.config_run.output:
             self.config_run.output['path'] = 'Output'
@@ -1793,10 +2461,18 @@ class Model(BaseModel):
             subset_name = 'y_def_' + param
             # Only if the set has some members
             if len(self._sets[subset_name]) > 0:
-                self.solution[param] = self.data[param]
+                # Broadcast parameters stored without a `t` dimension,
+                # so that the saved solution always has it
+                self.solution[param] = time_funcs.broadcast_t(
+                    self.data[param], self.data['t']
+                )
 
         if how == 'netcdf':
             self._save_netcdf4()
+        elif how == 'zarr':
+            self._save_zarr()
+        elif how in ['parquet', 'feather']:
+            self._save_columnar(how)
         elif how == 'csv':
             self._save_csv()
         else:
@@ -1833,17 +2509,183 @@ class Model(BaseModel):
 
         # Metadata
         for k in ['config_model', 'config_run']:
-            # Serialize config dicts to YAML strings
-            sol.attrs[k] = sol.attrs[k].to_yaml()
+            # Serialize config dicts to YAML strings, from the model so
+            # that saving more than once works
+            sol.attrs[k] = getattr(self, k).to_yaml()
         sol.attrs['run_time'] = self.run_times["runtime"]
         sol.attrs['calliope_version'] = __version__
 
-        encoding = {k: {'zlib': True, 'complevel': 4} for k in self.solution.data_vars}
+        encoding = output.get_netcdf_encoding(
+            self.solution,
+            self.config_run.get_key('output.encoding', default=None)
+        )
         self.solution.to_netcdf(store_file, format='netCDF4', encoding=encoding)
         self.solution.close()  # Force-close NetCDF file after writing
 
         return store_file  # Return the path to the NetCDF file we used
 
+    def _save_zarr(self):
+        """
+        Save solution as a Zarr store in the directory ``solution.zarr``
+        in ``self.config_run.output.path``, chunked along the dimensions
+        given in ``self.config_run.output.chunks``
+
+        """
+        try:
+            import zarr  # pylint: disable=import-error
+        except ImportError:
+            e = exceptions.ModelError
+            raise e('Saving the solution as `zarr` requires Zarr.')
+        try:
+            import dask.array as da  # pylint: disable=import-error
+        except ImportError:
+            da = None
+
+        sol = self.solution
+        store_dir = os.path.join(self.config_run.output.path, 'solution.zarr')
+        if os.path.exists(store_dir):
+            i = 0
+            alt_dir = os.path.join(self.config_run.output.path,
+                                   'solution_{}.zarr')
+            while os.path.exists(alt_dir.format(i)):
+                i += 1
+            alt_dir = alt_dir.format(i)
+            message = ('Directory `{}` exists, '
+                       'using `{}` instead.'.format(store_dir, alt_dir))
+            logging.warning(message)
+            store_dir = alt_dir
+
+        chunks = self.config_run.get_key('output.chunks', default={})
+
+        # Write to a temporary directory first so that readers never see
+        # an incomplete store
+        group = zarr.open_group(store_dir + '.tmp', mode='w')
+        for k in sol.variables:
+            var = sol[k].variable
+            data = var.data
+            attrs = {'_ARRAY_DIMENSIONS': list(var.dims)}
+            if var.dtype.kind == 'O':
+                # Zarr can't store arbitrary objects, so store strings,
+                # with missing values set to a fill value so that
+                # read_zarr() can turn them back into NaN
+                values = np.asarray(data)
+                missing = pd.isnull(values)
+                data = values.astype(str)
+                data[missing] = output.ZARR_OBJECT_FILL_VALUE
+                attrs['_FillValue'] = output.ZARR_OBJECT_FILL_VALUE
+            if chunks and var.ndim > 0:
+                array_chunks = tuple(int(chunks.get(dim, size)) for dim, size
+                                     in zip(var.dims, var.shape))
+            else:
+                array_chunks = True
+            array = group.create_dataset(k, shape=var.shape, dtype=data.dtype,
+                                         chunks=array_chunks)
+            array.attrs.update(attrs)
+            if da is not None and var.ndim > 0:
+                # Write one Zarr chunk per Dask chunk, in parallel, and
+                # without loading Dask-backed variables into memory
+                if isinstance(data, da.Array):
+                    data = data.rechunk(array.chunks)
+                else:
+                    data = da.from_array(data, chunks=array.chunks)
+                da.store(data, array, lock=False)
+            else:
+                array[...] = np.asarray(data)
+
+        # Metadata
+        group.attrs['coordinates'] = list(sol.coords)
+        # Serialize config dicts to YAML strings
+        group.attrs['config_model'] = self.config_model.to_yaml()
+        group.attrs['config_run'] = self.config_run.to_yaml()
+        group.attrs['run_time'] = self.run_times["runtime"]
+        group.attrs['calliope_version'] = __version__
+        os.replace(store_dir + '.tmp', store_dir)
+
+        return store_dir
+
+    def _save_columnar(self, how):
+        """
+        Save solution as Parquet or Feather files (``how``) to
+        ``self.config_run.output.path``, with one table for all variables
+        sharing the same dimensions, which has a column for each of these
+        dimensions and for each variable. The dimensions of each table
+        and variable are stored in ``metadata.yaml``.
+
+        """
+        try:
+            import pyarrow  # pylint: disable=import-error
+            if how == 'parquet':
+                import pyarrow.parquet  # pylint: disable=import-error
+            else:
+                import pyarrow.feather  # pylint: disable=import-error
+        except ImportError:
+            e = exceptions.ModelError
+            raise e('Saving the solution as `{}` requires pyarrow.'.format(how))
+
+        sol = self.solution
+        variables_by_dims = collections.OrderedDict()
+        for k in sorted(sol.data_vars):
+            variables_by_dims.setdefault(sol[k].dims, []).append(k)
+
+        tables = utils.AttrDict()
+        for dims, variables in variables_by_dims.items():
+            if dims:
+                table = '-'.join(dims)
+                df = sol[variables].to_dataframe()
+                table_dims = list(df.index.names)
+                df = df.reset_index()
+            else:
+                table = 'scalars'
+                df = pd.DataFrame({k: [sol[k].values[()]] for k in variables})
+                table_dims = []
+            # Object columns must hold a single type. Numbers in them are
+            # moved to a separate numeric column, and anything else that
+            # isn't missing is stored as strings
+            split = []
+            for col in variables:
+                if df[col].dtype.kind != 'O':
+                    continue
+                values = df[col]
+                is_number = values.map(
+                    lambda v: isinstance(v, numbers.Number)
+                    and not pd.isnull(v)
+                )
+                if is_number.any():
+                    df[col + output.COLUMNAR_NUMERIC_SUFFIX] = pd.to_numeric(
+                        values.where(is_number), errors='coerce'
+                    )
+                    split.append(col)
+                is_string = values.notnull() & ~is_number
+                df[col] = values.where(is_string).where(
+                    ~is_string, values.astype(str)
+                )
+            out_path = os.path.join(self.config_run.output.path,
+                                    '{}.{}'.format(table, how))
+            if how == 'parquet':
+                pyarrow.parquet.write_table(
+                    pyarrow.Table.from_pandas(df, preserve_index=False),
+                    out_path
+                )
+            else:
+                pyarrow.feather.write_feather(df, out_path)
+            tables[table] = {
+                'dims': table_dims,
+                'variables': {k: list(sol[k].dims) for k in variables},
+                'split_numeric': split
+            }
+
+        # Metadata
+        md = utils.AttrDict()
+        md['config_run'] = self.config_run
+        md['config_model'] = self.config_model
+        md['run_time'] = self.run_times["runtime"]
+        md['calliope_version'] = __version__
+        md['table_format'] = how
+        md['tables'] = tables
+        md.to_yaml(os.path.join(self.config_run.output.path, 'metadata.yaml'))
+
+        return self.config_run.output.path
+
     def _save_csv(self):
         """Save solution as CSV files to ``self.config_run.output.path``"""
         for k in self.solution.data_vars:
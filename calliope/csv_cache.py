@@ -0,0 +1,142 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+csv_cache.py
+~~~~~~~~~~~~
+
+Persistent cache of parsed CSV files as NumPy arrays, keyed by file
+path, size and modification time, so that model initialization in new
+processes can memory-map previously parsed time series instead of
+parsing the CSV text again.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def get_key(path, **kwargs):
+    """
+    Returns a hex digest identifying the CSV file at ``path`` as parsed
+    with the given ``pandas.read_csv`` keyword arguments, from its
+    absolute path, size and modification time.
+
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    h = hashlib.sha256()
+    h.update(repr((path, stat.st_size, stat.st_mtime_ns,
+                   sorted((k, repr(v)) for k, v in kwargs.items())))
+             .encode('utf-8'))
+    return h.hexdigest()
+
+
+def _get_paths(cache_dir, key):
+    base = os.path.join(cache_dir, key)
+    return base + '.values.npy', base + '.index.npy', base + '.json'
+
+
+def _index_to_array(index):
+    """
+    Returns ``index`` as an array that can be saved without pickling,
+    or None if it can't be: numeric and datetime indexes are saved as
+    they are, and indexes of strings, e.g. unparsed dates, as a
+    fixed-width unicode array.
+
+    """
+    if index.dtype.kind in 'biufM' and getattr(index, 'tz', None) is None:
+        return index.values
+    if (index.dtype.kind == 'O' and len(index) > 0
+            and all(isinstance(i, str) for i in index)):
+        return np.array(index.tolist(), dtype=str)
+    return None
+
+
+def _is_cacheable(df):
+    # Only frames with a single numeric dtype for all values can be
+    # stored as a plain array and memory-mapped
+    dtypes = set(df.dtypes)
+    return len(dtypes) == 1 and dtypes.pop().kind in 'biufM'
+
+
+def _load(cache_dir, key):
+    values_path, index_path, meta_path = _get_paths(cache_dir, key)
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        values = np.load(values_path, mmap_mode='r')
+        index = np.load(index_path)
+    except (OSError, ValueError) as e:
+        logging.debug('Invalid CSV cache entry {}: {}'.format(key, e))
+        return None
+    if (values.shape != (len(index), len(meta['columns']))
+            or index.dtype.str != meta['index_dtype']):
+        logging.debug('Invalid CSV cache entry: {}'.format(key))
+        return None
+    if index.dtype.kind == 'M':
+        index = pd.DatetimeIndex(index, name=meta['index_name'])
+    elif index.dtype.kind == 'U':
+        index = pd.Index(index.astype(object), name=meta['index_name'])
+    else:
+        index = pd.Index(index, name=meta['index_name'])
+    return pd.DataFrame(values, index=index, columns=meta['columns'],
+                        copy=False)
+
+
+def _to_json(value):
+    # Labels of CSV files read without a header are NumPy integers
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _store(cache_dir, key, df, index):
+    os.makedirs(cache_dir, exist_ok=True)
+    values_path, index_path, meta_path = _get_paths(cache_dir, key)
+    np.save(values_path, df.values)
+    np.save(index_path, index)
+    # The metadata file is written last and atomically, since its
+    # presence marks a complete cache entry
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({'columns': [_to_json(i) for i in df.columns],
+                   'index_name': _to_json(df.index.name),
+                   'index_dtype': index.dtype.str}, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def read_csv(path, cache_dir=None, **kwargs):
+    """
+    Read the CSV file at ``path`` with ``pandas.read_csv``, passing on
+    any keyword arguments.
+
+    If ``cache_dir`` is given, the parsed values and index are stored
+    there as ``.npy`` files on first read, and memory-mapped from the
+    cache on subsequent reads of the unchanged file. The values of a
+    DataFrame loaded from the cache are read-only, so must be copied
+    before being changed. Files with values of mixed types, or with
+    an index that isn't numeric, dates or strings, are not cached.
+
+    """
+    if not cache_dir:
+        return pd.read_csv(path, **kwargs)
+    key = get_key(path, **kwargs)
+    df = _load(cache_dir, key)
+    if df is not None:
+        logging.debug('CSV cache hit: {}'.format(path))
+        return df
+    logging.debug('CSV cache miss: {}'.format(path))
+    df = pd.read_csv(path, **kwargs)
+    index = _index_to_array(df.index)
+    if _is_cacheable(df) and index is not None:
+        _store(cache_dir, key, df, index)
+    else:
+        logging.info('Not caching CSV file, its values are not all of one '
+                     'numeric type or its index is not numeric, dates '
+                     'or strings: {}'.format(path))
+    return df
@@ -0,0 +1,885 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+matrix.py
+~~~~~~~~~
+
+Vectorized model generation. Builds the same linear program as the
+required constraints in ``constraints.base``, ``constraints.planning``
+and ``constraints.objective``, but assembles it block-wise as sparse
+coefficient arrays with NumPy instead of evaluating one Pyomo rule per
+index, and passes it to the solver as an LP file.
+
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from . import exceptions
+from . import transmission
+from . import utils
+from .constraints.base import get_e_eff_per_distance
+
+
+_DEFAULT_OBJECTIVE = 'constraints.objective.objective_cost_minimization'
+
+
+class Variable(object):
+    """
+    A block of consecutive LP columns spanning the cartesian product
+    of ``coords`` along ``dims``.
+
+    """
+    def __init__(self, name, dims, coords, offset, lb=None, ub=None):
+        self.name = name
+        self.dims = list(dims)
+        self.coords = [list(i) for i in coords]
+        self.shape = tuple(len(i) for i in self.coords)
+        self.size = int(np.prod(self.shape))
+        self.ids = offset + np.arange(self.size).reshape(self.shape)
+        self.lb = lb
+        self.ub = ub
+        self._positions = [{v: i for i, v in enumerate(c)}
+                           for c in self.coords]
+
+    def sel(self, **labels):
+        """
+        Return the column ids at the given labels; dimensions that are
+        not given are kept in full, in their original order.
+
+        """
+        key = tuple(self._positions[i][labels[dim]] if dim in labels
+                    else slice(None)
+                    for i, dim in enumerate(self.dims))
+        return self.ids[key]
+
+
+class MatrixProblem(object):
+    """
+    Minimal sparse LP container: variables are blocks of columns,
+    constraints are accumulated as (row, column, coefficient) triplets.
+
+    """
+    def __init__(self):
+        self.variables = OrderedDict()
+        self.n_cols = 0
+        self.n_rows = 0
+        self._rows = []
+        self._cols = []
+        self._coefs = []
+        self._senses = []
+        self._rhs = []
+        self._objective = ([], [])
+        self.values = None
+        # Path of the LP file passed to the solver, and whether it
+        # belongs to the problem cache rather than being temporary
+        self.path = None
+        self.cached = False
+
+    def add_variable(self, name, dims, coords, lb=None, ub=None):
+        var = Variable(name, dims, coords, self.n_cols, lb=lb, ub=ub)
+        self.variables[name] = var
+        self.n_cols += var.size
+        return var
+
+    def add_constraint(self, terms, sense, rhs=0, aggregate=False):
+        """
+        Add constraint rows of the form ``sum(coef * var) <sense> rhs``.
+
+        Args:
+            terms : list of ``(coef, ids)`` tuples, where ``ids`` are
+                    column ids as returned by ``Variable.sel()``
+            sense : one of '==', '<=', '>='
+            rhs : right-hand side
+            aggregate : if False (default), coefficients, ids and rhs
+                        are broadcast against each other, adding one row
+                        per element of the result. If True, all terms
+                        are summed into a single row.
+
+        """
+        if aggregate:
+            rhs = np.asarray(rhs, dtype=float).reshape(1)
+            terms = [np.broadcast_arrays(np.asarray(coef), np.asarray(ids))
+                     for coef, ids in terms]
+        else:
+            arrays = np.broadcast_arrays(np.asarray(rhs, dtype=float),
+                                         *[np.asarray(i) for t in terms for i in t])
+            rhs = arrays[0].ravel()
+            terms = zip(arrays[1::2], arrays[2::2])
+        for coef, ids in terms:
+            rows = np.zeros(ids.size, dtype=int) if aggregate else np.arange(ids.size)
+            self._rows.append(self.n_rows + rows)
+            self._cols.append(ids.ravel())
+            self._coefs.append(coef.astype(float).ravel())
+        self._senses.append(np.repeat(sense, len(rhs)))
+        self._rhs.append(rhs)
+        self.n_rows += len(rhs)
+
+    def set_objective(self, terms):
+        """Set a minimization objective from ``(coef, ids)`` terms."""
+        cols, coefs = [], []
+        for coef, ids in terms:
+            coef, ids = np.broadcast_arrays(np.asarray(coef, dtype=float),
+                                            np.asarray(ids))
+            cols.append(ids.ravel())
+            coefs.append(coef.ravel())
+        self._objective = (cols, coefs)
+
+    def _get_objective(self):
+        cols, coefs = self._objective
+        if not cols:
+            return np.zeros(0, dtype=int), np.zeros(0)
+        return _combine(np.zeros(sum(len(i) for i in cols), dtype=int),
+                        np.concatenate(cols), np.concatenate(coefs))[1:]
+
+    def _get_matrix(self):
+        """
+        Return (rows, cols, coefs) of the constraint matrix, sorted
+        by row and column, with duplicate entries summed and zero
+        entries removed.
+
+        """
+        if not self._rows:
+            return (np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                    np.zeros(0))
+        return _combine(np.concatenate(self._rows),
+                        np.concatenate(self._cols),
+                        np.concatenate(self._coefs))
+
+    def write_lp(self, path):
+        """Write the problem to ``path`` in CPLEX LP format."""
+        rows, cols, coefs = self._get_matrix()
+        obj_cols, obj_coefs = self._get_objective()
+        senses = np.concatenate(self._senses) if self._senses else []
+        rhs = np.concatenate(self._rhs) if self._rhs else []
+
+        used = np.zeros(self.n_cols, dtype=bool)
+        used[cols] = True
+        used[obj_cols] = True
+
+        with open(path, 'w') as f:
+            f.write('\\* Calliope matrix problem *\\\n\nmin\nobj:\n')
+            if len(obj_cols):
+                f.write(_format_terms(obj_coefs, obj_cols))
+            else:
+                f.write('+0 ONE_VAR_CONSTANT\n')
+            f.write('\ns.t.\n\n')
+            bounds = np.searchsorted(rows, np.arange(self.n_rows + 1))
+            for row in range(self.n_rows):
+                start, end = bounds[row], bounds[row + 1]
+                if start == end:
+                    continue  # All coefficients in this row are zero
+                f.write('c{}:\n'.format(row))
+                f.write(_format_terms(coefs[start:end], cols[start:end]))
+                sense = senses[row] if senses[row] != '==' else '='
+                f.write('{} {:.17g}\n\n'.format(sense, rhs[row]))
+            if not len(obj_cols):
+                f.write('c_one_var_constant:\n'
+                        '+1 ONE_VAR_CONSTANT\n= 1\n\n')
+            f.write('bounds\n')
+            for var in self.variables.values():
+                ids = var.ids.ravel()
+                ids = ids[used[ids]]
+                lb = '-inf' if var.lb is None else '{:.17g}'.format(var.lb)
+                ub = '+inf' if var.ub is None else '{:.17g}'.format(var.ub)
+                template = ' {} <= x{{}} <= {}\n'.format(lb, ub)
+                f.write(''.join(template.format(i) for i in ids))
+            f.write('end\n')
+
+    def clear_coefficients(self):
+        """
+        Release the constraint and objective coefficients, e.g. once
+        they have been written to an LP file. Variable metadata, and
+        thus the mapping of a solution back to variables, is kept.
+
+        """
+        self._rows, self._cols, self._coefs = [], [], []
+        self._senses, self._rhs = [], []
+        self._objective = ([], [])
+
+    def load_results(self, results):
+        """
+        Read variable values from a Pyomo results object. Returns False
+        if the results contain no solution.
+
+        """
+        if len(results.solution) == 0:
+            return False
+        self.values = values = np.zeros(self.n_cols)
+        for name, v in results.solution(0).variable.items():
+            if name.startswith('x') and name[1:].isdigit():
+                values[int(name[1:])] = v['Value']
+        return True
+
+    def get_var(self, var):
+        """Return the values of variable ``var`` as a DataArray."""
+        import xarray as xr
+        try:
+            v = self.variables[var]
+        except KeyError:
+            raise exceptions.ModelError('Variable {} inexistent.'.format(var))
+        if v.size == 0:
+            raise exceptions.ModelError('Variable {} has no data.'.format(var))
+        return xr.DataArray(self.values[v.ids],
+                            coords=list(zip(v.dims, v.coords)), dims=v.dims)
+
+
+def _combine(rows, cols, coefs):
+    order = np.lexsort((cols, rows))
+    rows, cols, coefs = rows[order], cols[order], coefs[order]
+    if len(rows):
+        start = np.ones(len(rows), dtype=bool)
+        start[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        idx = np.flatnonzero(start)
+        rows, cols = rows[idx], cols[idx]
+        coefs = np.add.reduceat(coefs, idx)
+    keep = coefs != 0
+    return rows[keep], cols[keep], coefs[keep]
+
+
+def _format_terms(coefs, cols):
+    return ''.join('{:+.17g} x{}\n'.format(v, i) for v, i in zip(coefs, cols))
+
+
+class _Params(object):
+    """
+    Time series parameters of ``model.data`` as NumPy arrays, falling
+    back to the scalar model configuration where a parameter was not
+    read from file, mirroring ``get_constraint_param`` and
+    ``get_cost_param`` in ``constraints.base``.
+
+    """
+    def __init__(self, model):
+        self.model = model
+        d = model.data
+        self.n_t = len(d['t'])
+        self._arrays = {}
+        self._y_pos = {}
+        self._x_pos = {}
+        self._k_pos = {}
+        for param in model.config_model.timeseries_constraints:
+            if param not in d:
+                continue
+            dims = ['y', 'x', 'k', 't'] if 'k' in d[param].dims else ['y', 'x', 't']
+            dims = [i for i in dims if i in d[param].dims]
+            da = d[param].transpose(*dims)
+            values = da.values
+            if 't' not in dims:
+                # Constant over time, broadcast as a read-only view
+                values = np.broadcast_to(values[..., np.newaxis],
+                                         values.shape + (self.n_t, ))
+            self._arrays[param] = values
+            self._y_pos[param] = {v: i for i, v in enumerate(da.coords['y'].values)}
+            self._x_pos[param] = {v: i for i, v in enumerate(da.coords['x'].values)}
+            if 'k' in dims:
+                self._k_pos[param] = {v: i for i, v in enumerate(da.coords['k'].values)}
+
+    def _from_data(self, param, y):
+        return (param in self._arrays and
+                y in self.model._sets['y_def_' + param])
+
+    def constraint(self, param, y, x):
+        if self._from_data(param, y):
+            return self._arrays[param][self._y_pos[param][y],
+                                       self._x_pos[param][x]]
+        else:
+            option = self.model.option_table.get_constraint(param, y, x)
+            return np.repeat(option, self.n_t)
+
+    def cost(self, param, k, y, x):
+        if self._from_data(param, y):
+            return self._arrays[param][self._y_pos[param][y],
+                                       self._x_pos[param][x],
+                                       self._k_pos[param][k]]
+        else:
+            return np.repeat(self.model.option_table.get_cost(param, y, k, x),
+                             self.n_t)
+
+
+def generate(model):
+    """
+    Build a ``MatrixProblem`` for the given plan-mode ``model``.
+
+    """
+    if model.mode != 'plan':
+        raise exceptions.ModelError(
+            'The matrix backend only supports plan mode.'
+        )
+    optional = model.config_model.get_key('constraints', default=False) or []
+    unsupported = [i for i in optional if i not in OPTIONAL_CONSTRAINTS]
+    if unsupported:
+        raise exceptions.ModelError(
+            'The matrix backend does not support the optional '
+            'constraints: {}'.format(unsupported)
+        )
+    objective = model.config_model.get_key('objective',
+                                           default=_DEFAULT_OBJECTIVE)
+    if objective != _DEFAULT_OBJECTIVE:
+        raise exceptions.ModelError(
+            'The matrix backend only supports the default objective.'
+        )
+
+    mp = MatrixProblem()
+    s = model._sets
+    t = model.data['t'].to_index()
+    c, x, k = sorted(s['c']), sorted(s['x']), sorted(s['k'])
+    y = sorted(s['y'])
+
+    mp.add_variable('rs', ['y', 'x', 't'], [y, x, t])
+    mp.add_variable('r_area', ['y', 'x'], [sorted(s['y_def_r']), x], lb=0)
+    mp.add_variable('rbs', ['y', 'x', 't'], [sorted(s['y_rb']), x, t], lb=0)
+    mp.add_variable('s', ['y', 'x', 't'], [sorted(s['y_pc']), x, t], lb=0)
+    mp.add_variable('es_prod', ['c', 'y', 'x', 't'], [c, y, x, t], lb=0)
+    mp.add_variable('es_con', ['c', 'y', 'x', 't'], [c, y, x, t], ub=0)
+    mp.add_variable('export', ['y', 'x', 't'], [sorted(s['y_export']), x, t], lb=0)
+    mp.add_variable('s_cap', ['y', 'x'], [sorted(s['y_pc']), x], lb=0)
+    mp.add_variable('r_cap', ['y', 'x'], [sorted(s['y_def_r']), x], lb=0)
+    mp.add_variable('e_cap', ['y', 'x'], [y, x], lb=0)
+    mp.add_variable('e_cap_net', ['y', 'x'], [y, x], lb=0)
+    mp.add_variable('rb_cap', ['y', 'x'], [sorted(s['y_rb']), x], lb=0)
+    mp.add_variable('ec_prod', ['c', 'y', 'x', 't'], [c, sorted(s['y_p']), x, t], lb=0)
+    mp.add_variable('ec_con', ['c', 'y', 'x', 't'], [c, sorted(s['y_p']), x, t], ub=0)
+    for var in ['cost', 'cost_con', 'cost_op_fixed', 'cost_op_variable']:
+        mp.add_variable(var, ['y', 'x', 'k'], [y, x, k])
+    for var in ['cost_op_var', 'cost_op_fuel', 'cost_op_rb']:
+        mp.add_variable(var, ['y', 'x', 't', 'k'], [y, x, t, k])
+
+    params = _Params(model)
+    for block in [node_resource, node_energy_balance, node_constraints_build,
+                  node_constraints_operational, node_constraints_transmission,
+                  node_parasitics, node_costs, model_constraints,
+                  system_margin, node_constraints_build_total]:
+        block(model, mp, params)
+    for i in optional:
+        OPTIONAL_CONSTRAINTS[i](model, mp, params)
+    objective_cost_minimization(model, mp, params)
+    return mp
+
+
+def node_resource(model, mp, params):
+    v = mp.variables
+    supply = (model.get_group_members('supply') +
+              model.get_group_members('unmet_demand'))
+    demand = model.get_group_members('demand')
+
+    for y in sorted(model._sets['y_def_r']):
+        for x in v['rs'].coords[1]:
+            r_scale = model.option_table.get_constraint('r_scale', y, x)
+            r_eff = params.constraint('r_eff', y, x)
+            force_r = params.constraint('force_r', y, x).astype(bool)
+            r_avail = params.constraint('r', y, x) * r_scale * r_eff
+            rs = v['rs'].sel(y=y, x=x)
+            r_area = v['r_area'].sel(y=y, x=x)
+            mp.add_constraint([(1, rs[force_r]),
+                               (-r_avail[force_r], r_area)], '==')
+            terms = [(1, rs[~force_r]), (-r_avail[~force_r], r_area)]
+            if y in supply:
+                mp.add_constraint(terms, '<=')
+            elif y in demand:
+                mp.add_constraint(terms, '>=')
+
+
+def node_energy_balance(model, mp, params):
+    v = mp.variables
+    s = model._sets
+    time_res = model.time_index.time_res
+    s_init = model.data['s_init']
+    storage = model.get_group_members('storage')
+
+    for y in sorted(s['y_trans']):
+        for x in v['rs'].coords[1]:
+            y_remote, x_remote = transmission.get_remotes(y, x)
+            if y_remote in s['y_trans']:
+                c = model.option_table.carrier[y]
+                e_eff = (params.constraint('e_eff', y, x)
+                         * get_e_eff_per_distance(model, y, x))
+                mp.add_constraint(
+                    [(1, v['es_prod'].sel(c=c, y=y, x=x)),
+                     (e_eff, v['es_con'].sel(c=c, y=y_remote, x=x_remote))],
+                    '==')
+
+    for y in sorted(s['y_conv']):
+        c_prod = model.option_table.carrier[y]
+        c_source = model.option_table.source_carrier[y]
+        for x in v['rs'].coords[1]:
+            e_eff = params.constraint('e_eff', y, x)
+            terms = [(1, v['es_prod'].sel(c=c_prod, y=y, x=x)),
+                     (e_eff, v['es_con'].sel(c=c_source, y=y, x=x))]
+            if model.option_table.get_export(y, x):
+                terms.append((1, v['export'].sel(y=y, x=x)))
+            mp.add_constraint(terms, '==')
+
+    for y in sorted(s['y_pc']):
+        for x in v['rs'].coords[1]:
+            e_eff = params.constraint('e_eff', y, x).astype(float)
+            with np.errstate(divide='ignore'):
+                e_eff_inv = np.where(e_eff == 0, 0, 1 / e_eff)
+            s_cap_max = model.option_table.get_constraint('s_cap.max', y, x)
+            use_s_time = params.constraint('use_s_time', y, x)[0]
+
+            # Terms for rbs - e_prod - e_con - export, as in ``pc_rule``
+            terms = [(-e_eff_inv, v['es_prod'].sel(c=c, y=y, x=x))
+                     for c in v['es_prod'].coords[0]]
+            terms += [(-e_eff, v['es_con'].sel(c=c, y=y, x=x))
+                      for c in v['es_con'].coords[0]]
+            if y in s['y_rb']:
+                terms.append((1, v['rbs'].sel(y=y, x=x)))
+            if model.option_table.get_export(y, x):
+                terms.append((-e_eff_inv, v['export'].sel(y=y, x=x)))
+
+            # A) Case where no storage allowed
+            if s_cap_max == 0 and not use_s_time:
+                terms.append((1, v['rs'].sel(y=y, x=x)))
+                mp.add_constraint(terms, '==')
+
+            # B) Case where storage is allowed
+            else:
+                if y not in storage:
+                    terms.append((1, v['rs'].sel(y=y, x=x)))
+                s_ids = v['s'].sel(y=y, x=x)
+                s_loss = params.constraint('s_loss', y, x)
+                s_minus_one = (1 - s_loss) ** np.roll(time_res, 1)
+                s_minus_one[0] = 0
+                rhs = np.zeros(len(s_ids))
+                rhs[0] = -float(s_init.loc[dict(x=x, y=y)])
+                terms.append((s_minus_one, np.roll(s_ids, 1)))
+                terms.append((-1, s_ids))
+                mp.add_constraint(terms, '==', rhs)
+
+
+def _add_var_constraint(model, mp, var_id, y, var, x,
+                        _equals=None, _max=None, _min=None, scale=None):
+    """
+    Mirrors ``get_var_constraint`` in ``constraints.base.node_constraints_build``.
+    Returns True if a constraint was added.
+
+    """
+    if not _equals:
+        _equals = model.option_table.get_constraint(var + '.equals', y, x)
+    if not _max:
+        _max = model.option_table.get_constraint(var + '.max', y, x)
+    if not _min:
+        _min = model.option_table.get_constraint(var + '.min', y, x)
+    if scale:
+        _equals = scale * _equals
+        _min = scale * _min
+        _max = scale * _max
+    if _equals:
+        if np.isinf(_equals):
+            e = exceptions.ModelError
+            raise e('Cannot use inf in operational mode, for value of '
+                    '{}.{}.equals.{}'.format(y, var, x))
+        mp.add_constraint([(1, var_id)], '==', _equals)
+        return True
+    else:
+        if np.isinf(_max):
+            _max = None  # to disable upper bound
+        if _min == 0 and _max is None:
+            return False
+        if _min is not None:
+            mp.add_constraint([(1, var_id)], '>=', _min)
+        if _max is not None:
+            mp.add_constraint([(1, var_id)], '<=', _max)
+        return True
+
+
+def node_constraints_build(model, mp, params):
+    v = mp.variables
+    s = model._sets
+    # (y, x) pairs with a constraint on each capacity variable,
+    # used by node_costs to allow negative costs
+    mp.constrained = {i: set() for i in
+                      ['s_cap', 'r_cap', 'r_area', 'e_cap', 'rb_cap']}
+    constrained = mp.constrained
+    xs = v['e_cap'].coords[1]
+
+    def _get(y, option, x):
+        return model.option_table.get_constraint(option, y, x)
+
+    for y in sorted(s['y_pc']):
+        for x in xs:
+            if _get(y, 'use_s_time', x):
+                scale = _get(y, 'e_cap_scale', x)
+                s_time_max = _get(y, 's_time.max', x)
+                e_cap = _get(y, 'e_cap.equals', x)
+                if not e_cap:
+                    e_cap = _get(y, 'e_cap.max', x)
+                e_eff_ref = model.get_eff_ref('e', y)
+                s_cap_max = s_time_max * e_cap * scale / e_eff_ref
+            else:
+                s_cap_max = None
+            if _add_var_constraint(model, mp, v['s_cap'].sel(y=y, x=x),
+                                   y, 's_cap', x, _max=s_cap_max):
+                constrained['s_cap'].add((y, x))
+
+    for y in sorted(s['y_def_r']):
+        for x in xs:
+            r_cap = v['r_cap'].sel(y=y, x=x)
+            r_area = v['r_area'].sel(y=y, x=x)
+            e_cap = v['e_cap'].sel(y=y, x=x)
+            if _get(y, 'r_cap_equals_e_cap', x):
+                mp.add_constraint([(1, r_cap), (-1, e_cap)], '==')
+                constrained['r_cap'].add((y, x))
+            elif _add_var_constraint(model, mp, r_cap, y, 'r_cap', x):
+                constrained['r_cap'].add((y, x))
+
+            area_per_cap = _get(y, 'r_area_per_e_cap', x)
+            if area_per_cap:
+                mp.add_constraint([(1, r_area), (-area_per_cap, e_cap)], '==')
+            elif _get(y, 'e_cap.max', x) == 0:
+                # If a technology has no e_cap here, we force r_area to zero,
+                # so as not to accrue spurious costs
+                mp.add_constraint([(1, r_area)], '==', 0)
+            elif _get(y, 'r_area.max', x) is False:
+                mp.add_constraint([(1, r_area)], '==', 1)
+            elif not _add_var_constraint(model, mp, r_area, y, 'r_area', x):
+                continue
+            constrained['r_area'].add((y, x))
+
+    for y in sorted(s['y']):
+        for x in xs:
+            e_cap = v['e_cap'].sel(y=y, x=x)
+            # First check whether this tech is allowed at this location
+            if not model._locations.at[x, y] == 1:
+                mp.add_constraint([(1, e_cap)], '==', 0)
+                constrained['e_cap'].add((y, x))
+            elif _add_var_constraint(model, mp, e_cap, y, 'e_cap', x,
+                                     scale=_get(y, 'e_cap_scale', x)):
+                constrained['e_cap'].add((y, x))
+            mp.add_constraint([(_get(y, 'c_eff', x), e_cap),
+                               (-1, v['e_cap_net'].sel(y=y, x=x))], '==')
+
+    for y in sorted(s['y_rb']):
+        for x in xs:
+            rb_cap = v['rb_cap'].sel(y=y, x=x)
+            follow = _get(y, 'rb_cap_follow', x)
+            mode = _get(y, 'rb_cap_follow_mode', x)
+            if follow:
+                if follow in ['r_cap', 'e_cap']:
+                    rb_cap_val = v[follow].sel(y=y, x=x)
+                else:
+                    e = exceptions.ModelError
+                    raise e('rb_cab_follow set to invalid value at '
+                            '({}, {}): {}'.format(y, x, follow))
+                if mode == 'max':
+                    mp.add_constraint([(1, rb_cap), (-1, rb_cap_val)], '<=')
+                elif mode == 'equals':
+                    mp.add_constraint([(1, rb_cap), (-1, rb_cap_val)], '==')
+                constrained['rb_cap'].add((y, x))
+            elif _add_var_constraint(model, mp, rb_cap, y, 'rb_cap', x):
+                constrained['rb_cap'].add((y, x))
+
+
+def node_constraints_operational(model, mp, params):
+    v = mp.variables
+    s = model._sets
+    d = model.data
+    time_res = model.time_index.time_res
+    xs = v['e_cap'].coords[1]
+
+    for y in sorted(s['y_def_r']):
+        for x in xs:
+            rs = v['rs'].sel(y=y, x=x)
+            r_cap = v['r_cap'].sel(y=y, x=x)
+            mp.add_constraint([(1, rs), (-time_res, r_cap)], '<=')
+            mp.add_constraint([(1, rs), (time_res, r_cap)], '>=')
+
+    # es_prod, es_con and export are dense here, but the Pyomo model only
+    # defines them over cyx_prod, cyx_con and yx_export, so fix the
+    # entries outside of these sets to zero
+    cyx_prod, cyx_con = set(s['cyx_prod']), set(s['cyx_con'])
+    yx_export = set(s['yx_export'])
+    for c in v['es_prod'].coords[0]:
+        for y in v['es_prod'].coords[1]:
+            for x in xs:
+                if (c, y, x) not in cyx_prod:
+                    mp.add_constraint([(1, v['es_prod'].sel(c=c, y=y, x=x))], '==')
+                if (c, y, x) not in cyx_con:
+                    mp.add_constraint([(1, v['es_con'].sel(c=c, y=y, x=x))], '==')
+    for y in v['export'].coords[0]:
+        for x in xs:
+            if (y, x) not in yx_export:
+                mp.add_constraint([(1, v['export'].sel(y=y, x=x))], '==')
+
+    for c, y, x in s['cyx_prod']:
+        e_cap = v['e_cap'].sel(y=y, x=x)
+        es_prod = v['es_prod'].sel(c=c, y=y, x=x)
+        export = ([v['export'].sel(y=y, x=x)]
+                  if (y, x) in yx_export else [])
+        e_prod = params.constraint('e_prod', y, x)
+        min_use = params.constraint('e_cap_min_use', y, x).astype(float)
+        # e_prod must be exactly True, as in base.py
+        allowed = np.array([i is True for i in e_prod.tolist()])
+        mp.add_constraint(
+            [(1, es_prod[allowed]), (-time_res[allowed], e_cap)]
+            + [(1, i[allowed]) for i in export], '<=')
+        mp.add_constraint(
+            [(1, es_prod[~allowed])] + [(1, i[~allowed]) for i in export],
+            '==')
+        use = min_use != 0
+        mp.add_constraint(
+            [(1, es_prod[use]), (-time_res[use] * min_use[use], e_cap)]
+            + [(1, i[use]) for i in export], '>=')
+
+    for c, y, x in s['cyx_con']:
+        if y in s['y_conv']:
+            continue
+        es_con = v['es_con'].sel(c=c, y=y, x=x)
+        e_con = params.constraint('e_con', y, x)
+        allowed = np.array([i is True for i in e_con.tolist()])
+        mp.add_constraint(
+            [(1, es_con[allowed]),
+             (time_res[allowed], v['e_cap'].sel(y=y, x=x))], '>=')
+        mp.add_constraint([(1, es_con[~allowed])], '==')
+
+    for y in sorted(s['y_pc']):
+        for x in xs:
+            mp.add_constraint([(1, v['s'].sel(y=y, x=x)),
+                               (-1, v['s_cap'].sel(y=y, x=x))], '<=')
+
+    t = v['rs'].coords[2]
+    for y in sorted(s['y_rb']):
+        for x in xs:
+            rbs = v['rbs'].sel(y=y, x=x)
+            if model.option_table.get_constraint('rb_startup_only', y, x):
+                startup = np.array([i >= d.startup_time_bounds for i in t])
+            else:
+                startup = np.zeros(len(t), dtype=bool)
+            mp.add_constraint([(1, rbs[startup])], '==')
+            mp.add_constraint([(1, rbs[~startup]),
+                               (-time_res[~startup],
+                                v['rb_cap'].sel(y=y, x=x))], '<=')
+
+
+def node_constraints_transmission(model, mp, params):
+    v = mp.variables
+    y_trans = model._sets['y_trans']
+    for y in sorted(y_trans):
+        for x in v['e_cap'].coords[1]:
+            y_remote, x_remote = transmission.get_remotes(y, x)
+            if y_remote in y_trans:
+                mp.add_constraint([(1, v['e_cap'].sel(y=y, x=x)),
+                                   (-1, v['e_cap'].sel(y=y_remote, x=x_remote))],
+                                  '==')
+
+
+def node_parasitics(model, mp, params):
+    v = mp.variables
+    s = model._sets
+    for y in sorted(s['y_p']):
+        for x in v['e_cap'].coords[1]:
+            c_eff = model.option_table.get_constraint('c_eff', y, x)
+            if y in s['y_trans'] or y in s['y_conv']:
+                # Ensure that transmission and conversion technologies
+                # do not double count c_eff
+                c_eff_con = 1.0
+            else:
+                c_eff_con = c_eff
+            for c in v['ec_prod'].coords[0]:
+                mp.add_constraint([(1, v['ec_prod'].sel(c=c, y=y, x=x)),
+                                   (-c_eff, v['es_prod'].sel(c=c, y=y, x=x))],
+                                  '==')
+                ec_con = v['ec_con'].sel(c=c, y=y, x=x)
+                if c_eff_con > 0:
+                    mp.add_constraint(
+                        [(1, ec_con),
+                         (-1 / c_eff_con, v['es_con'].sel(c=c, y=y, x=x))],
+                        '==')
+                else:
+                    mp.add_constraint([(1, ec_con)], '==')
+
+
+def node_costs(model, mp, params):
+    v = mp.variables
+    s = model._sets
+    weights = model.time_index.weights
+    time_res_sum = model.time_index.time_res_sum
+
+    options = model.option_table
+
+    def _unit_cost(cost, y, x, k):
+        """Mirrors ``_check_and_set`` in ``constraints.base.node_costs``."""
+        if y in s['y_trans']:
+            # Divided by 2 for transmission techs because construction costs
+            # are counted at both ends
+            unit_cost = (options.get_cost(cost, y, k, x)
+                         + options.get_cost_per_distance(cost, y, k, x)) / 2
+        else:
+            unit_cost = options.get_cost(cost, y, k, x)
+        if (y, x) not in mp.constrained[cost] and unit_cost < 0:
+            raise exceptions.OptionNotSetError(
+                cost + '.max must be defined for {}:{} '
+                'as cost is negative'.format(y, x))
+        return unit_cost
+
+    for y in v['cost'].coords[0]:
+        carrier = model.option_table.carrier[y]
+        cap_vars = ['e_cap']
+        if y in s['y_pc']:
+            cap_vars.append('s_cap')
+        if y in s['y_def_r']:
+            cap_vars += ['r_cap', 'r_area']
+        if y in s['y_rb']:
+            cap_vars.append('rb_cap')
+        for x in v['cost'].coords[1]:
+            export = model.option_table.get_export(y, x)
+            r_eff = params.constraint('r_eff', y, x).astype(float)
+            rb_eff = params.constraint('rb_eff', y, x).astype(float)
+            for k in v['cost'].coords[2]:
+                ids = {var: v[var].sel(y=y, x=x, k=k) for var in
+                       ['cost', 'cost_con', 'cost_op_fixed',
+                        'cost_op_variable', 'cost_op_var',
+                        'cost_op_fuel', 'cost_op_rb']}
+
+                mp.add_constraint([(1, ids['cost']), (-1, ids['cost_con']),
+                                   (-1, ids['cost_op_fixed']),
+                                   (-1, ids['cost_op_variable'])], '==')
+
+                depreciation = (options.get_depreciation_rate(y, k)
+                                * time_res_sum / 8760)
+                mp.add_constraint(
+                    [(1, ids['cost_con'])] +
+                    [(-depreciation * _unit_cost(var, y, x, k),
+                      v[var].sel(y=y, x=x)) for var in cap_vars], '==')
+
+                om_fixed = options.get_cost('om_fixed', y, k, x)
+                if om_fixed < 0 and (y, x) not in mp.constrained['e_cap']:
+                    raise exceptions.OptionNotSetError(
+                        'e_cap.max must be defined for {}:{} as `om_fixed` '
+                        'cost is negative'.format(y, x))
+                mp.add_constraint(
+                    [(1, ids['cost_op_fixed']),
+                     (-options.get_cost('om_frac', y, k, x), ids['cost_con']),
+                     (-om_fixed * time_res_sum / 8760, v['e_cap'].sel(y=y, x=x))],
+                    '==')
+
+                mp.add_constraint(
+                    [(1, ids['cost_op_variable']), (-1, ids['cost_op_var']),
+                     (-1, ids['cost_op_fuel']), (-1, ids['cost_op_rb'])],
+                    '==', aggregate=True)
+
+                # Note: only counting es_prod for operational costs.
+                om_var = params.cost('om_var', k, y, x)
+                terms = [(1, ids['cost_op_var']),
+                         (-weights * om_var,
+                          v['es_prod'].sel(c=carrier, y=y, x=x))]
+                if export:
+                    terms.append((-weights * (om_var +
+                                              params.cost('export', k, y, x)),
+                                  v['export'].sel(y=y, x=x)))
+                mp.add_constraint(terms, '==')
+
+                # Where r_eff is zero, the coefficient is zero, which
+                # sets cost_op_fuel to zero
+                om_fuel = params.cost('om_fuel', k, y, x)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    fuel = np.where(r_eff > 0, -om_fuel * weights / r_eff, 0)
+                mp.add_constraint([(1, ids['cost_op_fuel']),
+                                   (fuel, v['rs'].sel(y=y, x=x))], '==')
+
+                terms = [(1, ids['cost_op_rb'])]
+                if y in s['y_rb']:
+                    om_rb = params.cost('om_rb', k, y, x)
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        rb = np.where(rb_eff > 0, -om_rb * weights / rb_eff, 0)
+                    terms.append((rb, v['rbs'].sel(y=y, x=x)))
+                mp.add_constraint(terms, '==')
+
+
+def model_constraints(model, mp, params):
+    v = mp.variables
+    s = model._sets
+    locations = model._locations
+    y_p = set(s['y_p'])
+
+    @utils.memoize
+    def get_children(parent):
+        children = list(locations[locations._within == parent].index)
+        return [i for i in children if len(get_children(i)) == 0]
+
+    for c in v['es_prod'].coords[0]:
+        for x in v['e_cap'].coords[1]:
+            # Balacing takes place at top-most (level 0) locations, as well
+            # as within any lower-level locations that contain children
+            if not (locations.at[x, '_level'] == 0 or
+                    len(get_children(x)) > 0):
+                continue
+            terms = []
+            for xs in get_children(x) + [x]:
+                for y in v['es_prod'].coords[1]:
+                    if y in y_p:
+                        terms += [(1, v['ec_prod'].sel(c=c, y=y, x=xs)),
+                                  (1, v['ec_con'].sel(c=c, y=y, x=xs))]
+                    else:
+                        terms += [(1, v['es_prod'].sel(c=c, y=y, x=xs)),
+                                  (1, v['es_con'].sel(c=c, y=y, x=xs))]
+            mp.add_constraint(terms, '==' if c == 'power' else '>=')
+
+
+def system_margin(model, mp, params):
+    v = mp.variables
+    time_res = model.time_index.get_time_res
+    for c in v['es_prod'].coords[0]:
+        # If no margin defined for a carrier, use 0 (i.e. no margin)
+        margin = model.config_model.system_margin.get_key(c, default=0)
+        if not margin:
+            continue
+        t = model.t_max_demand[c]
+        terms = [(1 + margin, v['es_prod'].sel(c=c, t=t))]
+        for y in v['e_cap'].coords[0]:
+            if model.option_table.carrier[y] == c:
+                for x in v['e_cap'].coords[1]:
+                    terms.append((-time_res(t) / model.get_eff_ref('e', y, x),
+                                  v['e_cap'].sel(y=y, x=x)))
+        mp.add_constraint(terms, '<=', aggregate=True)
+
+
+def node_constraints_build_total(model, mp, params):
+    v = mp.variables
+    for y in v['e_cap'].coords[0]:
+        total_max = model.get_option(y + '.constraints.e_cap.total_max')
+        total_equals = model.get_option(y + '.constraints.e_cap.total_equals')
+        scale = model.get_option(y + '.constraints.e_cap_scale')
+        if np.isinf(total_max) and not total_equals:
+            continue
+        terms = [(1, v['e_cap'].sel(y=y))]
+        if total_equals:
+            mp.add_constraint(terms, '==', total_equals * scale, aggregate=True)
+        else:
+            mp.add_constraint(terms, '<=', total_max * scale, aggregate=True)
+
+
+def objective_cost_minimization(model, mp, params):
+    v = mp.variables
+    mp.set_objective([(model.get_option(y + '.weight'),
+                       v['cost'].sel(y=y, k='monetary'))
+                      for y in v['cost'].coords[0]])
+
+
+def ramping_rate(model, mp, params):
+    v = mp.variables
+    time_res = model.time_index.time_res
+    for y in v['e_cap'].coords[0]:
+        # e_ramping: Ramping rate [fraction of installed capacity per hour]
+        ramping_rate_value = model.get_option(y + '.constraints.e_ramping')
+        if ramping_rate_value is False:
+            continue
+        carrier = model.option_table.carrier[y]
+        for x in v['e_cap'].coords[1]:
+            es_prod = v['es_prod'].sel(c=carrier, y=y, x=x)
+            es_con = v['es_con'].sel(c=carrier, y=y, x=x)
+            # No constraint for first timestep
+            diff = [(1 / time_res[1:], es_prod[1:]),
+                    (1 / time_res[1:], es_con[1:]),
+                    (-1 / time_res[:-1], es_prod[:-1]),
+                    (-1 / time_res[:-1], es_con[:-1])]
+            e_cap = v['e_cap'].sel(y=y, x=x)
+            mp.add_constraint(diff + [(-ramping_rate_value, e_cap)], '<=')
+            mp.add_constraint(diff + [(ramping_rate_value, e_cap)], '>=')
+
+
+OPTIONAL_CONSTRAINTS = {
+    'constraints.optional.ramping_rate': ramping_rate,
+}
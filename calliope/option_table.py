@@ -0,0 +1,161 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+option_table.py
+~~~~~~~~~~~~~~~
+
+Resolves the technology options used while building a model once for
+every technology, location and cost class, so that constraint rules
+look them up by index instead of walking the option inheritance chain.
+
+"""
+
+import numpy as np
+
+from . import constraints
+from . import exceptions
+from . import utils
+
+
+def _typed_array(values, shape):
+    """
+    Return ``values`` as an array of the given ``shape``: bool if all
+    values are bools, float if all are numbers, object otherwise.
+
+    """
+    if all(isinstance(i, (bool, np.bool_)) for i in values):
+        dtype = bool
+    elif all(isinstance(i, (int, float, np.number))
+             and not isinstance(i, (bool, np.bool_)) for i in values):
+        dtype = float
+    else:
+        dtype = object
+    arr = np.empty(len(values), dtype=dtype)
+    for i, v in enumerate(values):
+        arr[i] = v
+    return arr.reshape(shape)
+
+
+def _resolve(func, *args):
+    # Errors are kept and raised on access, so that options which are
+    # never used do not have to be defined
+    try:
+        return func(*args)
+    except exceptions.OptionNotSetError as e:
+        return e
+
+
+class OptionTable(object):
+    """
+    Technology options resolved for each (y, x) and costs for each
+    (y, x, k), stored as NumPy arrays.
+
+    The constraint and cost options covered are those listed under
+    ``techs.defaults`` in the model configuration.
+
+    """
+    def __init__(self, model):
+        self.model = model
+        s = model._sets
+        self.y = list(s['y'])
+        self.x = list(s['x'])
+        self.k = list(s['k'])
+        self._y = {v: i for i, v in enumerate(self.y)}
+        self._x = {v: i for i, v in enumerate(self.x)}
+        self._k = {v: i for i, v in enumerate(self.k)}
+
+        defaults = model.config_model.get_key('techs.defaults',
+                                              default=utils.AttrDict())
+        get_option = model.get_option
+        cost_getter = utils.cost_getter(get_option)
+        depreciation_getter = utils.depreciation_getter(get_option)
+        cost_per_distance_getter = utils.cost_per_distance_getter(
+            model.config_model)
+
+        yx = [(y, x) for y in self.y for x in self.x]
+        yxk = [(y, x, k) for y in self.y for x in self.x for k in self.k]
+        shape_yx = (len(self.y), len(self.x))
+        shape_yxk = shape_yx + (len(self.k), )
+
+        def option(y, x, opt):
+            return get_option(y + '.' + opt, x=x)
+
+        self.constraints = {}
+        for opt in defaults.get_key('constraints',
+                                    default=utils.AttrDict()).keys_nested():
+            self.constraints[opt] = _typed_array(
+                [_resolve(option, y, x, 'constraints.' + opt)
+                 for y, x in yx], shape_yx)
+
+        self.export = _typed_array(
+            [_resolve(option, y, x, 'export') for y, x in yx], shape_yx)
+        self.carrier = {y: get_option(y + '.carrier') for y in self.y}
+        self.source_carrier = {y: get_option(y + '.source_carrier')
+                               for y in self.y}
+
+        self.costs = {}
+        for cost in defaults.get_key('costs.default',
+                                     default=utils.AttrDict()).keys():
+            self.costs[cost] = _typed_array(
+                [_resolve(cost_getter, cost, y, k, x) for y, x, k in yxk],
+                shape_yxk)
+
+        self.depreciation_rate = _typed_array(
+            [_resolve(depreciation_getter, y, k)
+             for y in self.y for k in self.k], (len(self.y), len(self.k)))
+
+        # Per-distance values only exist for transmission techs
+        y_trans = set(s['y_trans'])
+        self.costs_per_distance = {}
+        for cost in defaults.get_key('costs_per_distance.default',
+                                     default=utils.AttrDict()).keys():
+            self.costs_per_distance[cost] = _typed_array(
+                [_resolve(cost_per_distance_getter, cost, y, k, x)
+                 if y in y_trans else 0 for y, x, k in yxk], shape_yxk)
+        self.e_eff_per_distance = _typed_array(
+            [_resolve(constraints.base.get_e_eff_per_distance, model, y, x)
+             if y in y_trans else 1.0 for y, x in yx], shape_yx)
+
+    @staticmethod
+    def _get(arr, *idx):
+        value = arr.item(*idx)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def get_constraint(self, option, y, x):
+        """
+        Value of ``y.constraints.<option>`` at ``x``, falling back to
+        Model.get_option for options not in the table.
+
+        """
+        try:
+            arr = self.constraints[option]
+        except KeyError:
+            return self.model.get_option(y + '.constraints.' + option, x=x)
+        return self._get(arr, self._y[y], self._x[x])
+
+    def get_export(self, y, x):
+        return self._get(self.export, self._y[y], self._x[x])
+
+    def get_cost(self, cost, y, k, x):
+        try:
+            arr = self.costs[cost]
+        except KeyError:
+            return utils.cost_getter(self.model.get_option)(cost, y, k, x=x)
+        return self._get(arr, self._y[y], self._x[x], self._k[k])
+
+    def get_cost_per_distance(self, cost, y, k, x):
+        try:
+            arr = self.costs_per_distance[cost]
+        except KeyError:
+            getter = utils.cost_per_distance_getter(self.model.config_model)
+            return getter(cost, y, k, x)
+        return self._get(arr, self._y[y], self._x[x], self._k[k])
+
+    def get_depreciation_rate(self, y, k):
+        return self._get(self.depreciation_rate, self._y[y], self._k[k])
+
+    def get_e_eff_per_distance(self, y, x):
+        return self._get(self.e_eff_per_distance, self._y[y], self._x[x])
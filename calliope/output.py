@@ -11,9 +11,95 @@ Functionality for generating model outputs.
 
 import numpy as np
 
+from . import exceptions
 from . import utils
 
 
+# Encoding applied to all variables unless overridden by a policy
+_DEFAULT_NETCDF_ENCODING = {'codec': 'zlib', 'level': 4}
+
+# Suffix of the column holding the numbers of a variable with mixed
+# numbers and strings in Parquet and Feather tables
+COLUMNAR_NUMERIC_SUFFIX = '__numeric'
+
+# Fill value marking missing values of object variables in Zarr stores,
+# which are stored as strings
+ZARR_OBJECT_FILL_VALUE = ''
+
+
+def _get_variable_encoding(var, settings):
+    encoding = {}
+
+    codec = settings.get('codec', None)
+    if codec == 'zlib':
+        encoding['zlib'] = True
+        encoding['complevel'] = int(settings.get('level', 4))
+        if 'shuffle' in settings:
+            encoding['shuffle'] = bool(settings['shuffle'])
+    elif codec not in [None, False, 'none']:
+        e = exceptions.ModelError
+        raise e('Unsupported NetCDF compression codec: `{}`. Use `zlib` '
+                'or `none`.'.format(codec))
+
+    # Downcasting and packing only apply to floating point data
+    if var.dtype.kind == 'f':
+        if settings.get('dtype', None):
+            encoding['dtype'] = np.dtype(settings['dtype'])
+        for k in ['scale_factor', 'add_offset']:
+            if k in settings:
+                encoding[k] = settings[k]
+        if 'fill_value' in settings:
+            encoding['_FillValue'] = settings['fill_value']
+        elif 'dtype' in encoding and encoding['dtype'].kind in 'iu':
+            # Packed into integers, so NaNs need a fill value
+            encoding['_FillValue'] = np.iinfo(encoding['dtype']).min
+
+    chunks = settings.get('chunks', None)
+    if chunks and var.ndim > 0 and any(d in chunks for d in var.dims):
+        encoding['chunksizes'] = tuple(
+            min(int(chunks.get(d, size)), size)
+            for d, size in zip(var.dims, var.shape)
+        )
+
+    return encoding
+
+
+def get_netcdf_encoding(dataset, policy=None):
+    """
+    Returns the ``encoding`` for writing ``dataset`` to NetCDF4 with
+    ``Dataset.to_netcdf``, following the encoding ``policy``, a dict as
+    given in the ``output.encoding`` run setting.
+
+    The policy's settings apply to all data variables, and its optional
+    ``variables`` dict can override them per variable:
+
+    * ``codec``: ``zlib`` or ``none`` (default: ``zlib``)
+    * ``level``: compression level from 1 to 9 (default: 4)
+    * ``shuffle``: whether to apply the HDF5 shuffle filter
+    * ``dtype``: dtype to store floating point variables as, e.g.
+      ``float32``, or an integer dtype to pack them into together with
+      ``scale_factor`` and ``add_offset``
+    * ``scale_factor``, ``add_offset``, ``fill_value``: packing settings
+      for floating point variables
+    * ``chunks``: chunk sizes along dimensions, e.g. ``{t: 168}``
+
+    Without a policy, all variables are compressed with zlib at level 4.
+
+    """
+    if policy is None:
+        policy = {}
+    defaults = dict(_DEFAULT_NETCDF_ENCODING)
+    defaults.update({k: v for k, v in policy.items() if k != 'variables'})
+    variables = policy.get('variables', {})
+
+    encoding = {}
+    for k in dataset.data_vars:
+        settings = dict(defaults)
+        settings.update(variables.get(k, {}))
+        encoding[k] = _get_variable_encoding(dataset[k], settings)
+    return encoding
+
+
 def generate_constraints(solution, output_path=None, specifier='max',
                          techs=None, constraints=None,
                          include_transmission=True, transmission_techs=None,
@@ -0,0 +1,120 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+problem_cache.py
+~~~~~~~~~~~~~~~~
+
+On-disk cache of generated matrix backend problems, keyed by a hash of
+everything that goes into building them, so that reruns of an unchanged
+model can skip reading its data, time resolution adjustments and model
+generation, and pass the stored LP file straight to the solver.
+
+Cache entries are loaded with :mod:`pickle`, which can execute
+arbitrary code, so the cache directory must only be writable by
+trusted users.
+
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+from ._version import __version__
+
+# Run settings that do not affect the generated problem, or whose
+# effect is already captured by the resolved model configuration
+_IGNORED_RUN_KEYS = ['model', 'model_override', 'solver', 'solver_io',
+                     'solver_options', 'problem_cache',
+                     'csv_cache', 'read_threads', 'data_chunks', 'output',
+                     'debug', 'parallel']
+
+
+def get_key(model):
+    """
+    Returns a hex digest identifying the problem generated from
+    ``model``: its calliope version, model configuration, the run
+    configuration except for solver and output settings, its time
+    steps, and the names and contents of the time series files it
+    reads and of set_t.csv, with a marker for files that do not
+    exist. The key is computed from inputs only, so it can be
+    checked before the model data are read.
+
+    """
+    h = hashlib.sha256()
+    h.update(__version__.encode('utf-8'))
+    h.update(model.config_model.to_yaml().encode('utf-8'))
+    config_run = model.config_run.copy()
+    for k in _IGNORED_RUN_KEYS:
+        config_run.pop(k, None)
+    h.update(config_run.to_yaml().encode('utf-8'))
+    # The time axis is read from set_t.csv unless declared with
+    # `time_axis` in the model configuration, which is hashed above
+    filenames = set(model._get_timeseries_filenames())
+    if not model.config_model.get_key('time_axis', default=False):
+        filenames.add('set_t.csv')
+    for filename in sorted(filenames):
+        h.update(filename.encode('utf-8'))
+        path = os.path.join(model.config_model.data_path, filename)
+        if not os.path.exists(path):
+            # Reported when the data are read on a cache miss
+            h.update(b'\0missing')
+            continue
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    # The resolved time steps, to be independent of how they were given
+    h.update('\n'.join(str(t) for t in model._sets['t']).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _get_paths(cache_dir, key):
+    base = os.path.join(cache_dir, key)
+    return base + '.lp', base + '.pickle'
+
+
+def load(key, cache_dir):
+    """
+    Returns a ``(data, sets, mp)`` tuple for the cache entry ``key``,
+    where ``data`` and ``sets`` are the model data and sets after
+    time resolution adjustments and ``mp`` is the ``MatrixProblem``
+    with its ``path`` pointing to the cached LP file, or None if
+    there is no such entry.
+
+    """
+    lp_path, pickle_path = _get_paths(cache_dir, key)
+    if not (os.path.exists(lp_path) and os.path.exists(pickle_path)):
+        logging.debug('Problem cache miss: {}'.format(key))
+        return None
+    with open(pickle_path, 'rb') as f:
+        data, sets, mp = pickle.load(f)
+    mp.path = lp_path
+    mp.cached = True
+    logging.debug('Problem cache hit: {}'.format(key))
+    return data, sets, mp
+
+
+def store(key, model, mp, cache_dir):
+    """
+    Write the LP file for ``mp`` to the cache entry ``key``, together
+    with the variable metadata needed to map a solution back to it
+    and the data and sets of ``model`` needed to process the
+    solution. The coefficient arrays of ``mp`` are released once
+    the LP file is written.
+
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    lp_path, pickle_path = _get_paths(cache_dir, key)
+    # Write to temporary files first so that an interrupted run
+    # does not leave an incomplete cache entry behind
+    mp.write_lp(lp_path + '.tmp')
+    mp.clear_coefficients()
+    mp.path = lp_path
+    mp.cached = True
+    with open(pickle_path + '.tmp', 'wb') as f:
+        pickle.dump((model.data, model._sets, mp), f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(lp_path + '.tmp', lp_path)
+    os.replace(pickle_path + '.tmp', pickle_path)
+    return mp
@@ -9,13 +9,16 @@ Functions to read saved model results.
 
 """
 
+import collections
 import glob
 import logging
 import os
 
+import numpy as np
 import pandas as pd
 import xarray as xr
 
+from .output import COLUMNAR_NUMERIC_SUFFIX, get_netcdf_encoding
 from .utils import AttrDict
 
 
@@ -46,6 +49,53 @@ def read_netcdf(path):
     return solution
 
 
+def read_zarr(path):
+    """
+    Read model solution from a Zarr store. If Dask is available, the
+    solution is opened lazily, with one Dask chunk per Zarr chunk, so
+    that selecting e.g. a single location or week only reads the chunks
+    needed from disk.
+
+    """
+    import zarr  # pylint: disable=import-error
+    try:
+        import dask.array as da  # pylint: disable=import-error
+    except ImportError:
+        da = None
+
+    group = zarr.open_group(path, mode='r')
+    coord_names = group.attrs.get('coordinates', [])
+    data_vars = {}
+    coords = {}
+    for k, array in group.arrays():
+        dims = array.attrs['_ARRAY_DIMENSIONS']
+        if '_FillValue' in array.attrs:
+            # Object variable stored as strings
+            values = array[...]
+            missing = values == array.attrs['_FillValue']
+            values = values.astype(object)
+            values[missing] = np.nan
+            (coords if k in coord_names else data_vars)[k] = (dims, values)
+        elif k in coord_names:
+            coords[k] = (dims, array[...])
+        elif da is not None and array.ndim > 0:
+            data_vars[k] = (dims, da.from_array(array, chunks=array.chunks))
+        else:
+            data_vars[k] = (dims, array[...])
+    solution = xr.Dataset(data_vars, coords=coords)
+
+    for k in ['run_time', 'calliope_version']:
+        if k in group.attrs:
+            solution.attrs[k] = group.attrs[k]
+    # Deserialize YAML attributes
+    for k in ['config_model', 'config_run']:
+        solution.attrs[k] = AttrDict.from_yaml_string(group.attrs[k])
+
+    _check(path, solution)
+
+    return solution
+
+
 def read_csv(directory):
     solution = AttrDict()
     tables_to_read = glob.glob(directory + '/*.csv')
@@ -73,10 +123,70 @@ def read_csv(directory):
     return solution
 
 
+def read_columnar(directory):
+    """
+    Read model solution from the Parquet or Feather tables in
+    ``directory``, rebuilding each variable directly from its column
+    and the dimensions recorded in ``metadata.yaml``.
+
+    """
+    md = AttrDict.from_yaml(os.path.join(directory, 'metadata.yaml'))
+    fmt = md.pop('table_format')
+    tables = md.pop('tables')
+    if fmt == 'parquet':
+        import pyarrow.parquet  # pylint: disable=import-error
+        read_table = lambda f: pyarrow.parquet.read_table(f).to_pandas()
+    else:
+        import pyarrow.feather  # pylint: disable=import-error
+        read_table = pyarrow.feather.read_feather
+
+    arrays = {}
+    for table, table_md in tables.items():
+        df = read_table(os.path.join(directory, '{}.{}'.format(table, fmt)))
+        dims = table_md['dims']
+        # Tables hold the full product of their dimensions' coordinates,
+        # in the order given by the dimensions, so each variable is a
+        # column that can be reshaped
+        coords = [(d, pd.unique(df[d].values)) for d in dims]
+        shape = [len(c) for d, c in coords]
+        split = table_md.get('split_numeric', [])
+        for k, var_dims in table_md['variables'].items():
+            values = df[k].values
+            if values.dtype.kind == 'O' or k in split:
+                # Strings and numbers of object variables are stored in
+                # separate columns, with missing values as null
+                values = np.where(pd.isnull(values), np.nan,
+                                  values).astype(object)
+                if k in split:
+                    numeric = df[k + COLUMNAR_NUMERIC_SUFFIX].values
+                    has_number = ~pd.isnull(numeric)
+                    values[has_number] = numeric[has_number]
+            array = xr.DataArray(values.reshape(shape),
+                                 coords=coords, dims=dims)
+            arrays[k] = array.transpose(*var_dims)
+    solution = xr.Dataset(arrays)
+
+    for k in md.keys():
+        solution.attrs[k] = md[k]
+
+    _check(directory, solution)
+
+    return solution
+
+
 def _detect_format(directory):
-    """Detects format, falling back to CSV if it can't find NetCDF4"""
+    """
+    Detects format, falling back to CSV if it can't find NetCDF4, Zarr,
+    Parquet or Feather
+
+    """
     if os.path.exists(os.path.join(directory, 'solution.nc')):
         return 'netcdf'
+    elif os.path.exists(os.path.join(directory, 'solution.zarr')):
+        return 'zarr'
+    elif (glob.glob(os.path.join(directory, '*.parquet')) or
+            glob.glob(os.path.join(directory, '*.feather'))):
+        return 'columnar'
     else:
         return 'csv'
 
@@ -101,6 +211,12 @@ def read_dir(directory):
             if fmt == 'netcdf':
                 sol_path = os.path.join(iteration_dir, 'solution.nc')
                 results.solutions[i] = read_netcdf(sol_path)
+            elif fmt == 'zarr':
+                sol_path = os.path.join(iteration_dir, 'solution.zarr')
+                results.solutions[i] = read_zarr(sol_path)
+            elif fmt == 'columnar':
+                sol_path = iteration_dir
+                results.solutions[i] = read_columnar(sol_path)
             else:
                 sol_path = iteration_dir
                 results.solutions[i] = read_csv(sol_path)
@@ -112,6 +228,128 @@ def read_dir(directory):
             continue
     return results
 
+
+class LazyConfigs(object):
+    """
+    Mapping of run index to the configuration stored in the ``key``
+    attribute of that run's NetCDF solution file, which is only read
+    and deserialized from YAML when first accessed.
+
+    """
+    def __init__(self, paths, key):
+        self._paths = paths
+        self._key = key
+        self._configs = {}
+
+    def __getitem__(self, run):
+        if run not in self._configs:
+            with xr.open_dataset(self._paths[run]) as ds:
+                yaml_string = ds.attrs[self._key]
+            self._configs[run] = AttrDict.from_yaml_string(yaml_string)
+        return self._configs[run]
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def keys(self):
+        return self._paths.keys()
+
+
+def _read_variable(path, name):
+    # The file is opened for each read and closed again right away,
+    # so that no file stays open however many runs there are
+    with xr.open_dataset(path) as ds:
+        return ds[name].values
+
+
+def _open_run(path, variables=None, chunks=None):
+    """
+    Returns the solution at ``path`` as a Dataset whose data variables
+    are Dask arrays that open the file, read the variable and close the
+    file again when they are computed. Only coordinates and metadata
+    are read here, and the file is closed on return.
+
+    """
+    import dask  # pylint: disable=import-error
+    import dask.array as da  # pylint: disable=import-error
+    with xr.open_dataset(path) as ds:
+        if variables is not None:
+            ds = ds[variables]
+        data_vars = {}
+        for name, var in ds.data_vars.items():
+            read = dask.delayed(_read_variable, pure=True)(path, name)
+            array = da.from_delayed(read, shape=var.shape, dtype=var.dtype)
+            if chunks:
+                array = array.rechunk({var.dims.index(k): v
+                                       for k, v in chunks.items()
+                                       if k in var.dims})
+            data_vars[name] = (var.dims, array, var.attrs)
+        coords = {k: (v.dims, v.values, v.attrs) for k, v in ds.coords.items()}
+        attrs = {k: v for k, v in ds.attrs.items() if k == 'calliope_version'}
+    return xr.Dataset(data_vars, coords=coords, attrs=attrs)
+
+
+def open_dir(directory, variables=None, chunks=None):
+    """
+    Lazily open the NetCDF solutions of the runs in ``directory``, as
+    written by parallel runs, without loading them into memory.
+
+    Returns an AttrDict with:
+
+    * ``iterations``: the iterations DataFrame, as in :func:`read_dir`
+    * ``solution``: a Dataset of all runs backed by Dask arrays, with a
+      ``run`` dimension and, if runs have different time steps, the
+      union of their time steps. Only ``variables`` are included if
+      given.
+    * ``config_run``, ``config_model``: mappings of run index to
+      configuration, read and deserialized when accessed
+
+    Each run's file is only opened while its coordinates are read
+    here, and again whenever data from it is computed, so the number
+    of runs is not limited by the number of files a process may keep
+    open. A variable of a run is read in full when any part of it is
+    computed; ``chunks``, a dict of chunk sizes by dimension, only
+    splits it up for further computations. Runs without a
+    ``solution.nc`` file are skipped with a warning.
+
+    """
+    try:
+        import dask  # pylint: disable=import-error,unused-variable
+    except ImportError:
+        raise ImportError('open_dir requires Dask.')
+
+    if isinstance(variables, str):
+        variables = [variables]
+    results = AttrDict()
+    results.iterations = pd.read_csv(os.path.join(directory, 'iterations.csv'),
+                                     index_col=0)
+    paths = collections.OrderedDict()
+    for i in results.iterations.index.tolist():
+        sol_path = os.path.join(directory, '{:0>4d}'.format(i), 'solution.nc')
+        if not os.path.exists(sol_path):
+            logging.warning('No solution for iteration `{}`: '
+                            '{}'.format(i, sol_path))
+            continue
+        paths[i] = sol_path
+
+    if len(paths) == 0:
+        raise IOError('No solutions found in `{}`'.format(directory))
+
+    # Runs are concatenated along `run`, aligning them to the union
+    # of their time steps
+    solution = xr.concat(
+        [_open_run(path, variables, chunks) for path in paths.values()],
+        dim=pd.Index(list(paths.keys()), name='run')
+    )
+
+    results.solution = solution
+    results.config_run = LazyConfigs(paths, 'config_run')
+    results.config_model = LazyConfigs(paths, 'config_model')
+    return results
+
 ##
 # Functionality to post-process parallel runs into aggregated NetCDF files
 ##
@@ -178,17 +416,32 @@ def dir_to_dataset(in_dir, run_name, reset_time_index=False):
     return results_to_dataset(results, run_name, reset_time_index)
 
 
-def convert_run_dir_to_netcdf(in_dir, out_file, reset_time_index=False):
+def convert_run_dir_to_netcdf(in_dir, out_file, reset_time_index=False,
+                              encoding_policy=None):
+    """
+    Combine the runs in ``in_dir`` into the NetCDF file ``out_file``,
+    encoded following ``encoding_policy`` (see
+    :func:`calliope.output.get_netcdf_encoding`). If not given, the
+    ``output.encoding`` run setting of the first run is used.
+
+    """
     this_dir = os.path.join(in_dir, 'Output')
     run_name = this_dir.split('/')[-1]
-    ds = dir_to_dataset(this_dir, run_name, reset_time_index)
-
-    encoding = {k: {'zlib': True, 'complevel': 4} for k in ds.data_vars}
+    results = read_dir(this_dir)
+    if encoding_policy is None and len(results.solutions) > 0:
+        first = results.solutions[sorted(results.solutions.keys())[0]]
+        encoding_policy = first.attrs['config_run'].get_key(
+            'output.encoding', default=None
+        )
+    ds = results_to_dataset(results, run_name, reset_time_index)
+
+    encoding = get_netcdf_encoding(ds, encoding_policy)
     ds.to_netcdf(out_file, format='netCDF4', encoding=encoding)
     ds.close()  # Force-close NetCDF file after writing
 
 
-def convert_subdirs_to_netcdfs(in_dir, out_dir, reset_time_index_for_subdirs=None):
+def convert_subdirs_to_netcdfs(in_dir, out_dir, reset_time_index_for_subdirs=None,
+                               encoding_policy=None):
     if reset_time_index_for_subdirs is None:
         reset_time_index_for_subdirs = []
 
@@ -211,10 +464,17 @@ def convert_subdirs_to_netcdfs(in_dir, out_dir, reset_time_index_for_subdirs=Non
             print('File exists, skipping: {}'.format(out_file))
         else:
             print('Processing {}'.format(this_path))
-            convert_run_dir_to_netcdf(this_path, out_file, reset_time_index)
+            convert_run_dir_to_netcdf(this_path, out_file, reset_time_index,
+                                      encoding_policy)
+
 
+def combine_subdir_netcdfs(in_dir, out_file, encoding_policy=None):
+    """
+    Combine the NetCDF files in ``in_dir`` along ``run_name`` into
+    ``out_file``, encoded following ``encoding_policy`` (see
+    :func:`calliope.output.get_netcdf_encoding`).
 
-def combine_subdir_netcdfs(in_dir, out_file):
+    """
     in_files = glob.glob(os.path.join(in_dir, '*.nc'))
     datasets = [xr.open_dataset(i) for i in in_files]
 
@@ -224,7 +484,7 @@ def combine_subdir_netcdfs(in_dir, out_file):
 
     ds = xr.concat(datasets, dim='run_name')
 
-    encoding = {k: {'zlib': True, 'complevel': 4} for k in ds.data_vars}
+    encoding = get_netcdf_encoding(ds, encoding_policy)
     ds.to_netcdf(out_file, format='netCDF4', encoding=encoding)
     ds.close()  # Force-close NetCDF file after writing
     for d in datasets:
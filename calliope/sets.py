@@ -133,3 +133,58 @@ def init_y_trans(model):
                         if colname not in model._locations.columns:
                             model._locations[colname] = np.nan
                         model._locations.at[x, colname] = tree[x][y].get_key(c)
+
+
+# Sparse index sets and the dimensions they span
+SPARSE_SETS = {
+    'cyx_prod': ['c', 'y', 'x'],
+    'cyx_con': ['c', 'y', 'x'],
+    'cyx_prod_p': ['c', 'y_p', 'x'],
+    'cyx_con_p': ['c', 'y_p', 'x'],
+    'yx_export': ['y_export', 'x'],
+}
+
+
+def init_sparse_sets(model):
+    """
+    Sparse index sets for the dispatch variables, covering only the
+    carriers a technology can produce and consume, at the locations
+    where it is allowed:
+
+    * cyx_prod: (c, y, x) for es_prod, with c the carrier of y
+    * cyx_con: (c, y, x) for es_con, with c the source carrier of
+      conversion techs and the carrier of all other techs
+    * cyx_prod_p, cyx_con_p: the subsets of the above for techs with
+      parasitics, for ec_prod and ec_con
+    * yx_export: (y, x) for export, where export is allowed
+
+    """
+    _cyx_prod = []
+    _cyx_con = []
+    _yx_export = []
+    for y in model._sets['y']:
+        carrier = model.get_option(y + '.carrier')
+        if y in model._sets['y_conv']:
+            source_carrier = model.get_option(y + '.source_carrier')
+        else:
+            source_carrier = carrier
+        for x in model._sets['x']:
+            if model._locations.at[x, y] != 1:
+                continue
+            _cyx_prod.append((carrier, y, x))
+            _cyx_con.append((source_carrier, y, x))
+            if (y in model._sets['y_export'] and
+                    model.get_option(y + '.export', x=x)):
+                _yx_export.append((y, x))
+
+    y_p = set(model._sets['y_p'])
+    sets = {
+        'cyx_prod': _cyx_prod,
+        'cyx_con': _cyx_con,
+        'cyx_prod_p': [i for i in _cyx_prod if i[1] in y_p],
+        'cyx_con_p': [i for i in _cyx_con if i[1] in y_p],
+        'yx_export': _yx_export,
+    }
+
+    return sets
+
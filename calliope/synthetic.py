@@ -0,0 +1,245 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+synthetic.py
+~~~~~~~~~~~~
+
+Generates synthetic models of arbitrary size for load testing, written
+to disk as a regular set of run and model configuration files and CSV
+time series that can be loaded with ``calliope.Model``.
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import exceptions
+from . import utils
+
+
+# Supply and storage technologies are assigned these archetypes in turn
+ARCHETYPES = ['dispatchable', 'renewable', 'storage']
+
+START_TIME = '2005-01-01 00:00:00'
+
+
+def _get_tech_names(n_techs):
+    names = []
+    for i in range(n_techs):
+        archetype = ARCHETYPES[i % len(ARCHETYPES)]
+        prefix = 'storage' if archetype == 'storage' else 'supply'
+        names.append(('{}_{}'.format(prefix, i), archetype))
+    return names
+
+
+def _get_techs(tech_names, carriers):
+    techs = utils.AttrDict()
+    primary = carriers[0]
+    for name, archetype in tech_names:
+        tech = utils.AttrDict()
+        if archetype == 'storage':
+            tech['parent'] = 'storage'
+            tech.set_key('constraints.s_cap.max', float('inf'))
+            tech.set_key('constraints.e_cap.max', float('inf'))
+            tech.set_key('constraints.e_eff', 0.95)
+            tech.set_key('constraints.s_loss', 0.001)
+            tech.set_key('costs.monetary.s_cap', 20)
+            tech.set_key('costs.monetary.e_cap', 200)
+        else:
+            tech['parent'] = 'supply'
+            tech.set_key('constraints.e_cap.max', float('inf'))
+            if archetype == 'dispatchable':
+                tech.set_key('constraints.r', float('inf'))
+                tech.set_key('constraints.r_eff', 0.5)
+                tech.set_key('costs.monetary.e_cap', 750)
+                tech.set_key('costs.monetary.om_fuel', 0.02)
+            else:
+                # Resource given as a capacity factor per unit of e_cap
+                tech.set_key('constraints.r', 'file={}_r.csv'.format(name))
+                tech.set_key('constraints.r_area.max', float('inf'))
+                tech.set_key('constraints.r_area_per_e_cap', 1)
+                tech.set_key('costs.monetary.e_cap', 1000)
+                tech.set_key('costs.monetary.om_var', 0.002)
+        tech['carrier'] = primary
+        techs[name] = tech
+
+    for carrier in carriers[1:]:
+        techs['conversion_' + carrier] = utils.AttrDict({
+            'parent': 'conversion',
+            'source_carrier': primary,
+            'carrier': carrier,
+            'constraints': {'e_eff': 0.9, 'e_cap': {'max': float('inf')}},
+            'costs': {'monetary': {'e_cap': 300}},
+        })
+
+    for carrier in carriers:
+        techs['demand_' + carrier] = utils.AttrDict({
+            'parent': 'demand',
+            'carrier': carrier,
+            'constraints': {'r': 'file=demand_{}.csv'.format(carrier)},
+        })
+        techs['unmet_demand_' + carrier] = utils.AttrDict({
+            'parent': 'unmet_demand',
+            'carrier': carrier,
+        })
+
+    # Distances are in metres, so per-distance values are per 100 km
+    techs['hvac'] = utils.AttrDict({
+        'parent': 'transmission',
+        'carrier': primary,
+        'per_distance': 100000,
+        'constraints': {'e_eff': 0.98},
+        'constraints_per_distance': {'e_loss': 0.005},
+        'costs': {'monetary': {'e_cap': 100, 'om_var': 0.002}},
+        'costs_per_distance': {'monetary': {'e_cap': 20}},
+    })
+    return techs
+
+
+def _get_links(locations, link_density, rng):
+    # A chain through all locations keeps the network connected
+    pairs = set(zip(locations[:-1], locations[1:]))
+    for i, a in enumerate(locations):
+        for b in locations[i + 2:]:
+            if rng.rand() < link_density:
+                pairs.add((a, b))
+    links = utils.AttrDict()
+    for a, b in sorted(pairs):
+        links['{},{}'.format(a, b)] = utils.AttrDict({'hvac': {}})
+    return links
+
+
+def _get_timeseries(timesteps, locations, rng, kind):
+    hours = np.asarray(timesteps.hour + timesteps.dayofyear * 24, dtype=float)
+    n_t, n_x = len(timesteps), len(locations)
+    noise = rng.rand(n_t, n_x)
+    if kind == 'demand':
+        # Daily and seasonal cycle around a location-specific peak
+        peak = rng.uniform(1000, 10000, size=n_x)
+        daily = 0.75 + 0.25 * np.sin(2 * np.pi * (hours - 9) / 24)
+        seasonal = 0.9 + 0.1 * np.cos(2 * np.pi * hours / (24 * 365))
+        profile = (daily * seasonal)[:, np.newaxis] * (0.9 + 0.1 * noise)
+        values = -(profile * peak).round(1)
+    else:
+        # Capacity factor with a daytime peak, varying by location
+        offset = rng.uniform(-2, 2, size=n_x)
+        daylight = np.sin(np.pi * ((hours[:, np.newaxis] - 6 - offset) % 24)
+                          / 12)
+        values = (np.clip(daylight, 0, None) * (0.5 + 0.5 * noise)).round(3)
+    return pd.DataFrame(values, columns=locations)
+
+
+def make_model(path, n_locations=10, n_techs=4, n_timesteps=8760,
+               link_density=0.2, carriers=('power', ), seed=None,
+               mode='plan', solver='glpk'):
+    """
+    Write a synthetic model to the directory ``path`` and return the
+    path to its run configuration, which can be passed to
+    ``calliope.Model``.
+
+    Parameters
+    ----------
+    path : str
+        Directory to write to. Created if it does not exist.
+    n_locations : int, default 10
+        Number of locations, each of which has all technologies.
+    n_techs : int, default 4
+        Number of supply and storage technologies, which cycle through
+        dispatchable supply, renewable supply with a time-varying
+        resource, and storage.
+    n_timesteps : int, default 8760
+        Number of hourly timesteps.
+    link_density : float, default 0.2
+        Probability of a transmission link between any two locations
+        in addition to a chain of links connecting all locations.
+    carriers : sequence of str, default ('power', )
+        Carriers with a demand at each location. Supply, storage and
+        transmission technologies use the first carrier, which is
+        converted to each of the others by a conversion technology.
+    seed : int, optional
+        Seed for the random number generator.
+    mode : str, default 'plan'
+        Run mode set in the run configuration.
+    solver : str, default 'glpk'
+        Solver set in the run configuration.
+
+    """
+    if n_locations < 1 or n_techs < 1 or n_timesteps < 1:
+        raise exceptions.ModelError(
+            'A synthetic model needs at least one location, technology '
+            'and timestep.'
+        )
+    if not carriers:
+        raise exceptions.ModelError(
+            'A synthetic model needs at least one carrier.'
+        )
+    carriers = list(carriers)
+    rng = np.random.RandomState(seed)
+
+    model_path = os.path.join(path, 'model_config')
+    data_path = os.path.join(model_path, 'data')
+    os.makedirs(data_path, exist_ok=True)
+
+    locations = ['loc_{}'.format(i) for i in range(n_locations)]
+    tech_names = _get_tech_names(n_techs)
+    techs = _get_techs(tech_names, carriers)
+    timesteps = pd.date_range(START_TIME, periods=n_timesteps, freq='H')
+
+    # Time series
+    for carrier in carriers:
+        df = _get_timeseries(timesteps, locations, rng, 'demand')
+        df.to_csv(os.path.join(data_path, 'demand_{}.csv'.format(carrier)))
+    for name, archetype in tech_names:
+        if archetype == 'renewable':
+            df = _get_timeseries(timesteps, locations, rng, 'renewable')
+            df.to_csv(os.path.join(data_path, '{}_r.csv'.format(name)))
+
+    # Locations and links, with coordinates from which link
+    # distances are computed
+    lat = rng.uniform(40, 50, size=n_locations)
+    lon = rng.uniform(0, 15, size=n_locations)
+    config_locations = utils.AttrDict({
+        'locations': {
+            ','.join(locations): {'techs': [y for y in techs.keys()
+                                            if y != 'hvac']}
+        },
+        'links': _get_links(locations, link_density, rng),
+        'metadata': {
+            'map_boundary': [float(lon.min()) - 1, float(lat.min()) - 1,
+                             float(lon.max()) + 1, float(lat.max()) + 1],
+            'location_coordinates': {
+                x: [float(lat[i]), float(lon[i])]
+                for i, x in enumerate(locations)
+            },
+        },
+    })
+    config_locations.to_yaml(os.path.join(model_path, 'locations.yaml'))
+    utils.AttrDict({'techs': techs}).to_yaml(
+        os.path.join(model_path, 'techs.yaml')
+    )
+
+    system_margin = {c: 0 for c in carriers}
+    utils.AttrDict({
+        'import': ['techs.yaml', 'locations.yaml'],
+        'name': 'Synthetic model',
+        'data_path': 'data',
+        'time_axis': {'start': START_TIME, 'freq': 'H',
+                      'periods': n_timesteps},
+        'system_margin': system_margin,
+    }).to_yaml(os.path.join(model_path, 'model.yaml'))
+
+    run_path = os.path.join(path, 'run.yaml')
+    utils.AttrDict({
+        'name': 'Synthetic model run',
+        'model': 'model_config/model.yaml',
+        'output': {'format': 'netcdf', 'path': 'Output'},
+        'mode': mode,
+        'solver': solver,
+        'subset_y': [],
+        'subset_x': [],
+        'subset_t': [],
+    }).to_yaml(run_path)
+    return run_path
@@ -91,6 +91,26 @@ class TestModel:
         share = analysis.get_group_share(model.solution, techs=['ccgt'])
         assert share == 1.0
 
+    def test_shares_match_get_group_share(self, builtin_model):
+        sol = builtin_model.solution
+        groups = sol['groups'].to_pandas()
+        shares = sol['shares'].to_pandas()
+        for group in groups.index:
+            techs = groups.at[group, 'members'].split('|')
+            group_type = groups.at[group, 'type']
+            for var in shares.columns:
+                share = analysis.get_group_share(sol, techs, group_type, var)
+                assert_almost_equal(shares.at[group, var], float(share))
+
+    def test_summary_aggregates_transmission(self, builtin_model):
+        summary = builtin_model.solution['summary'].to_pandas()
+        assert not summary.index.str.contains(':').any()
+        assert 'hvac' in summary.index
+        e_prod = builtin_model.solution['ec_prod'].loc[dict(c='power')].sum(dim='x')
+        hvac = [y for y in e_prod['y'].values if y.startswith('hvac:')]
+        assert_almost_equal(summary.at['hvac', 'e_prod'],
+                            float(e_prod.loc[dict(y=hvac)].sum()))
+
     def test_get_unmet_demand_hours(self, builtin_model):
         # TODO this should be tested with a more complex model
         unmet = analysis.get_unmet_demand_hours(builtin_model.solution)
@@ -0,0 +1,58 @@
+import pytest  # pylint: disable=unused-import
+import time
+
+from calliope import bench
+from calliope.utils import AttrDict
+from .common import solver, solver_io, _add_test_path
+
+
+def _get_config_run():
+    config_run = """
+        model: ['{model}', '{techs}', '{locations}']
+        mode: plan
+        override:
+            data_path: '{path}'
+    """.format(model=_add_test_path('common/model_minimal.yaml'),
+               techs=_add_test_path('common/techs_minimal.yaml'),
+               locations=_add_test_path('common/locations_minimal.yaml'),
+               path=_add_test_path('common/t_1h'))
+    return AttrDict.from_yaml_string(config_run)
+
+
+class TestBench:
+    def test_phase_recorder(self):
+        recorder = bench.PhaseRecorder()
+        with recorder.phase('outer'):
+            with recorder.phase('inner'):
+                time.sleep(0.02)
+        assert list(recorder.phases.keys()) == ['outer', 'inner']
+        assert recorder.phases['inner']['time'] >= 0.02
+        assert recorder.phases['outer']['time'] < 0.02
+
+    def test_get_cases(self):
+        cases = bench.get_cases(_get_config_run(), quick=True)
+        assert [c['name'] for c in cases] == ['x=0.25', 'y=0.25', 't=7']
+        assert cases[0]['override']['subset_x'] == ['1']
+
+    def test_run_case(self):
+        override = AttrDict({'solver': solver, 'solver_io': solver_io,
+                             'subset_t': ['2005-01-01', '2005-01-02']})
+        result = bench.run_case(_get_config_run(), override)
+        assert list(result['phases'].keys()) == [
+            'initialize', 'read_data', 'initialize_time', 'generate_model',
+            'solve', 'load_solution', 'other'
+        ]
+        assert result['size']['t'] == 48
+        assert result['phases']['generate_model']['peak_memory'] > 0
+
+    def test_compare(self):
+        results = {'results': [{
+            'name': 'x=1:plan',
+            'phases': {'solve': {'time': 2.0, 'peak_memory': 1.0}}
+        }]}
+        new_results = {'results': [{
+            'name': 'x=1:plan',
+            'phases': {'solve': {'time': 1.0, 'peak_memory': 1.0}}
+        }]}
+        comparison = bench.compare(results, new_results)
+        assert comparison.loc[('x=1:plan', 'solve'), 'ratio'] == 0.5
@@ -34,3 +34,13 @@ class TestCLI:
             result = runner.invoke(cli.generate, [run_config])
             assert result.exit_code == 0
             assert os.path.isfile(os.path.join(tempdir, 'runs', 'example-model', 'submit_array.sh'))
+
+    def test_bench(self):
+        runner = CliRunner()
+        this_dir = os.path.dirname(__file__)
+        run_config = os.path.join(this_dir, '..', 'example_model', 'run.yaml')
+        with runner.isolated_filesystem() as tempdir:
+            result = runner.invoke(cli.bench, [run_config, '--quick',
+                                               '--no_memory'])
+            assert result.exit_code == 0
+            assert os.path.isfile(os.path.join(tempdir, 'benchmarks.json'))
@@ -1,6 +1,8 @@
 import numpy as np
+import os
 import pandas as pd
 import pytest
+import shutil
 import tempfile
 
 import calliope
@@ -135,6 +137,45 @@ class TestInitialization:
         assert model.data['_time_res'].to_series().tolist() == [1] * 48
         assert model.data.attrs['startup_time_bounds'] == pd.Timestamp('2005-01-02 12:00')
 
+    def test_initialize_sets_time_axis(self):
+        override = calliope.utils.AttrDict.from_yaml_string("""
+            override:
+                time_axis: {start: '2005-01-01', freq: 1H, periods: 1416}
+        """)
+        model = common.simple_model(override=override)
+        default_model = common.simple_model()
+        assert (model._sets['t'] == default_model._sets['t']).all()
+        assert model.data['r'].equals(default_model.data['r'])
+
+    def test_initialize_sets_time_axis_invalid_length(self):
+        override = calliope.utils.AttrDict.from_yaml_string("""
+            override:
+                time_axis: {start: '2005-01-01', freq: 1H, periods: 48}
+        """)
+        with pytest.raises(calliope.exceptions.ModelError):
+            common.simple_model(override=override)
+
+    @pytest.mark.parametrize('shift', [0, 1])
+    def test_read_csv_time_index_alignment(self, shift):
+        path = common._add_test_path('common/t_1h')
+        default_model = common.simple_model()
+        t = default_model._sets['t'] + pd.Timedelta(hours=shift)
+        with tempfile.TemporaryDirectory() as tempdir:
+            for f in ['set_t.csv', 'demand-sin_r.csv']:
+                shutil.copy(os.path.join(path, f), tempdir)
+            df = pd.read_csv(os.path.join(path, 'demand-sin_r.csv'),
+                             index_col=0)
+            df.index = t.strftime('%Y-%m-%d %H:%M:%S')
+            df.to_csv(os.path.join(tempdir, 'demand-sin_r.csv'))
+            model = common.simple_model(path=tempdir)
+            if shift:
+                # Right number of rows, but shifted by an hour
+                with pytest.raises(calliope.exceptions.ModelError):
+                    model._get_option_from_csv('demand-sin_r.csv')
+            else:
+                df = model._get_option_from_csv('demand-sin_r.csv')
+                assert (df.index == default_model._sets['t']).all()
+
     def test_initialize_sets_technologies(self):
         model = common.simple_model()
         y = ['ccgt', 'csp', 'demand_power', 'unmet_demand_power']
@@ -248,13 +289,73 @@ class TestInitialization:
         assert np.isnan(locations.at['1', '_override.hvac:1.constraints.e_cap.max'])
         assert locations.at['2', '_override.hvac:1.constraints.e_cap.max'] == 100
 
+    def test_time_index(self):
+        model = common.simple_model()
+        t = model.data['t'].to_index()
+        assert model.get_t(t[0], offset=2) == t[2]
+        assert model.get_t(t[0], offset=t[3] - t[0]) == t[3]
+        assert model.prev_t(t[5]) == t[4]
+        assert model.time_index.next_t(t[5]) == t[6]
+        assert model.time_index.get_time_res(t[5]) == 1
+        with pytest.raises(calliope.exceptions.ModelError):
+            model.prev_t(t[0])
+        with pytest.raises(calliope.exceptions.ModelError):
+            model.get_t(t[-1], offset=1)
+
+    def test_read_data_threads(self):
+        override = calliope.utils.AttrDict({'read_threads': 4})
+        model = common.simple_model(override=override)
+        assert len(model._get_timeseries_filenames()) > 0
+        assert model.data.equals(common.simple_model().data)
+
+    def test_read_data_location_overrides(self):
+        override = calliope.utils.AttrDict.from_yaml_string("""
+            override:
+                locations:
+                    1,2:
+                        override:
+                            csp:
+                                constraints:
+                                    r: 10
+        """)
+        model = common.simple_model(override=override)
+        r = model.data['r'].loc[{'y': 'csp'}]
+        assert (r.loc[{'x': ['1', '2']}] == 10).all()
+        assert (r.loc[{'x': 'demand'}] == 20).all()
+        assert model.debug.data_sources.get_key('r.csp:1') == 'model_config'
+
+    def test_read_data_location_override_missing_column(self):
+        # The file has no columns for locations 1 and 2
+        override = calliope.utils.AttrDict.from_yaml_string("""
+            override:
+                locations:
+                    1,2:
+                        override:
+                            csp:
+                                constraints:
+                                    r: file=demand-sin_r.csv
+        """)
+        with pytest.raises(calliope.exceptions.ModelError) as excinfo:
+            common.simple_model(override=override)
+        assert str(excinfo.value).count('[missing_column]') == 2
+
     def test_read_data_supply_r_negative_check(self):
         path = common._add_test_path('common/t_positive_demand')
         override = ('override.techs.demand_power.'
                     'constraints.r: file=demand-sin_r.csv')
         override = calliope.utils.AttrDict.from_yaml_string(override)
-        with pytest.raises(AssertionError):
+        with pytest.raises(calliope.exceptions.ModelError) as excinfo:
             model = common.simple_model(path=path, override=override)
+        assert 'Demand resource must be <=0' in str(excinfo.value)
+
+    def test_read_data_validation_report(self):
+        override = calliope.utils.AttrDict.from_yaml_string("""
+            override.techs.demand_power.x_map: 'demand: foo, 1: bar'
+        """)
+        with pytest.raises(calliope.exceptions.ModelError) as excinfo:
+            common.simple_model(override=override)
+        # All mapping errors are reported at once
+        assert str(excinfo.value).count('[x_map]') == 2
 
 class TestOptions:
     def test_get_option(self):
@@ -311,3 +412,19 @@ class TestOptions:
         assert model.get_option('ccgt.constraints.e_cap.max') == 50
         model.set_option('ccgt.constraints.e_cap.max', 'foo')
         assert model.get_option('ccgt.constraints.e_cap.max') == 'foo'
+
+    def test_option_table(self):
+        model = common.simple_model()
+        table = calliope.option_table.OptionTable(model)
+        assert table.get_constraint('e_cap.max', 'ccgt', 'demand') == 50
+        assert table.get_constraint('e_cap.max', 'ccgt', '1') == 100
+        assert table.constraints['e_eff'].dtype == float
+        assert table.get_cost('e_cap', 'ccgt', 'monetary', '1') == \
+            model.get_option('ccgt.costs.monetary.e_cap', x='1')
+        assert table.carrier['ccgt'] == 'power'
+
+    def test_option_table_flushed_by_set_option(self):
+        model = common.simple_model()
+        model.option_table = calliope.option_table.OptionTable(model)
+        model.set_option('ccgt.constraints.e_cap.max', 60)
+        assert model.option_table is None
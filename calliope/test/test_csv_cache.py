@@ -0,0 +1,73 @@
+import pytest  # pylint: disable=unused-import
+import os
+import tempfile
+
+import pandas as pd
+
+from calliope import csv_cache
+from calliope.utils import AttrDict
+from . import common
+from .common import _add_test_path
+
+
+class TestCSVCache:
+    def test_read_csv(self):
+        path = _add_test_path('common/t_1h/demand-sin_r.csv')
+        expected = pd.read_csv(path, index_col=0)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = csv_cache.read_csv(path, cache_dir, index_col=0)
+            assert len(os.listdir(cache_dir)) == 3
+            cached = csv_cache.read_csv(path, cache_dir, index_col=0)
+            # Values are memory-mapped from the read-only cache file
+            assert not cached.values.flags.writeable
+        assert first.equals(expected)
+        assert cached.equals(expected)
+
+    def test_read_set_t(self):
+        path = _add_test_path('common/t_1h/set_t.csv')
+        kwargs = dict(header=None, index_col=1, parse_dates=[1])
+        expected = pd.read_csv(path, **kwargs)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            csv_cache.read_csv(path, cache_dir, **kwargs)
+            cached = csv_cache.read_csv(path, cache_dir, **kwargs)
+        assert isinstance(cached.index, pd.DatetimeIndex)
+        assert cached.equals(expected)
+
+    def test_read_csv_string_index(self):
+        df = pd.DataFrame({'a': [1.0, 2.0]},
+                          index=['2005-01-01 00:00', '2005-01-01 01:00'])
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'data.csv')
+            cache_dir = os.path.join(tempdir, 'cache')
+            df.to_csv(path)
+            expected = pd.read_csv(path, index_col=0)
+            csv_cache.read_csv(path, cache_dir, index_col=0)
+            assert len(os.listdir(cache_dir)) == 3
+            cached = csv_cache.read_csv(path, cache_dir, index_col=0)
+        assert not cached.values.flags.writeable
+        assert cached.index.tolist() == df.index.tolist()
+        assert cached.equals(expected)
+
+    def test_modified_file(self):
+        df = pd.DataFrame({'a': [1.0, 2.0]})
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'data.csv')
+            cache_dir = os.path.join(tempdir, 'cache')
+            df.to_csv(path)
+            csv_cache.read_csv(path, cache_dir, index_col=0)
+            (df * 2).to_csv(path)
+            os.utime(path, ns=(0, 0))
+            result = csv_cache.read_csv(path, cache_dir, index_col=0)
+        assert result['a'].tolist() == [2.0, 4.0]
+
+    def test_model_with_csv_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            override = AttrDict({'csv_cache': cache_dir})
+            model = common.simple_model(override=override)
+            assert len(os.listdir(cache_dir)) > 0
+            model._get_option_from_csv('demand-sin_r.csv')
+            cached_model = common.simple_model(override=override)
+            df = cached_model._get_option_from_csv('demand-sin_r.csv')
+            # Unchanged time series are not copied out of the cache
+            assert not df.values.flags.writeable
+        assert cached_model.data.equals(model.data)
@@ -2,9 +2,12 @@ import os
 import tempfile
 
 import numpy as np
+import pandas as pd
 import pytest
+import xarray as xr
 
 import calliope
+from calliope import exceptions, output
 
 
 def verify_solution_integrity(model_solution, solution_from_disk, tempdir):
@@ -34,6 +37,42 @@ class TestSave:
 
         verify_solution_integrity(model.solution, solution_from_disk, tempdir)
 
+    def test_save_netcdf_encoding(self, model):
+        encoding = {
+            'dtype': 'float32', 'level': 1, 'chunks': {'t': 24},
+            'variables': {'e_cap': {'dtype': 'float64', 'codec': 'none'}}
+        }
+        with tempfile.TemporaryDirectory() as tempdir:
+            model.config_run.set_key('output.path', tempdir)
+            model.config_run.set_key('output.encoding', encoding)
+            model.save_solution('netcdf')
+            del model.config_run.output['encoding']
+
+            sol_file = os.path.join(tempdir, 'solution.nc')
+            with xr.open_dataset(sol_file) as solution_from_disk:
+                e = solution_from_disk['e']
+                assert e.dtype == np.float32
+                assert e.encoding['complevel'] == 1
+                t_axis = e.dims.index('t')
+                assert e.encoding['chunksizes'][t_axis] == 24
+                assert solution_from_disk['e_cap'].dtype == np.float64
+                assert not solution_from_disk['e_cap'].encoding['zlib']
+                assert np.allclose(e.values, model.solution['e'].values,
+                                   rtol=1e-6, equal_nan=True)
+
+    def test_netcdf_encoding_packing(self, model):
+        policy = {'variables': {'e': {'dtype': 'int32', 'scale_factor': 0.01}}}
+        encoding = output.get_netcdf_encoding(model.solution, policy)
+        assert encoding['e']['dtype'] == np.int32
+        assert encoding['e']['scale_factor'] == 0.01
+        assert encoding['e']['_FillValue'] == np.iinfo(np.int32).min
+        assert encoding['e_cap'] == {'zlib': True, 'complevel': 4}
+
+    def test_netcdf_encoding_invalid_codec(self, model):
+        with pytest.raises(exceptions.ModelError):
+            output.get_netcdf_encoding(model.solution,
+                                       {'codec': 'lzma'})
+
     def test_save_csv(self, model):
         with tempfile.TemporaryDirectory() as tempdir:
             model.config_run.set_key('output.path', tempdir)
@@ -43,3 +82,99 @@ class TestSave:
             solution_from_disk = calliope.read.read_csv(tempdir)
 
         verify_solution_integrity(model.solution, solution_from_disk, tempdir)
+
+    def test_save_zarr(self, model):
+        pytest.importorskip('zarr')
+        solution = model.solution
+        model.solution = solution.copy()
+        model.solution['test_object'] = xr.DataArray(
+            np.array(['a', np.nan, 'b'], dtype=object), dims=['test_dim']
+        )
+        with tempfile.TemporaryDirectory() as tempdir:
+            model.config_run.set_key('output.path', tempdir)
+            model.config_run.set_key('output.chunks', {'t': 24, 'x': 1})
+            try:
+                model.save_solution('zarr')
+            finally:
+                model.solution = solution
+                del model.config_run.output['chunks']
+
+            # Try reading solution back in
+            sol_dir = os.path.join(tempdir, 'solution.zarr')
+            solution_from_disk = calliope.read.read_zarr(sol_dir)
+            assert np.allclose(solution_from_disk['e'].loc[dict(x='r1')].values,
+                               model.solution['e'].loc[dict(x='r1')].values,
+                               equal_nan=True)
+            # Missing values in object variables are kept
+            test_object = solution_from_disk['test_object'].values
+            assert test_object[0] == 'a' and test_object[2] == 'b'
+            assert pd.isnull(test_object[1])
+
+            verify_solution_integrity(model.solution, solution_from_disk, tempdir)
+
+    @pytest.mark.parametrize('fmt', ['parquet', 'feather'])
+    def test_save_columnar(self, model, fmt):
+        pytest.importorskip('pyarrow')
+        with tempfile.TemporaryDirectory() as tempdir:
+            model.config_run.set_key('output.path', tempdir)
+            model.save_solution(fmt)
+
+            # Try reading solution back in
+            solution_from_disk = calliope.read.read_columnar(tempdir)
+            for k in ['e', 'e_cap', 'costs', 'summary']:
+                assert solution_from_disk[k].dims == model.solution[k].dims
+                assert np.allclose(solution_from_disk[k].values,
+                                   model.solution[k].values, equal_nan=True)
+            # Types are kept, also for numbers in object variables
+            for k in model.solution.data_vars:
+                expected = model.solution[k].values
+                actual = solution_from_disk[k].transpose(
+                    *model.solution[k].dims).values
+                kinds = [i.dtype.kind.replace('U', 'O')
+                         for i in [expected, actual]]
+                assert kinds[0] == kinds[1], k
+                if kinds[0] != 'O':
+                    continue
+                for i, j in zip(expected.ravel(), actual.ravel()):
+                    if pd.isnull(i):
+                        assert pd.isnull(j), k
+                    elif isinstance(i, str):
+                        assert i == j, k
+                    else:
+                        assert not isinstance(j, str), k
+                        assert float(i) == float(j), k
+
+        verify_solution_integrity(model.solution, solution_from_disk, tempdir)
+
+    def test_open_dir(self, model):
+        pytest.importorskip('dask')
+        with tempfile.TemporaryDirectory() as tempdir:
+            for i in [1, 2]:
+                out_path = os.path.join(tempdir, '{:0>4d}'.format(i))
+                model.config_run.set_key('output.path', out_path)
+                model.save_solution('netcdf')
+            iterations = pd.DataFrame({'override': ['a', 'b']}, index=[1, 2])
+            iterations.to_csv(os.path.join(tempdir, 'iterations.csv'))
+
+            results = calliope.read.open_dir(tempdir, variables=['e_cap', 'e'])
+            sol = results.solution
+            assert sorted(sol.data_vars) == ['e', 'e_cap']
+            assert list(sol['run'].values) == [1, 2]
+            # Still backed by Dask, not loaded into memory
+            assert sol['e'].chunks is not None
+            assert np.allclose(sol['e_cap'].loc[dict(run=2)].values,
+                               model.solution['e_cap'].values, equal_nan=True)
+            # Configurations are only read when accessed
+            assert len(results.config_run._configs) == 0
+            assert results.config_run[2].output.path == out_path
+            assert list(results.config_run._configs.keys()) == [2]
+            assert len(results.config_model._configs) == 0
+
+            # No file is kept open, so the files can be replaced and
+            # are read again on the next computation
+            model.config_run.set_key('output.path', out_path)
+            model.solution['e_cap'] += 1
+            model.save_solution('netcdf')
+            assert np.allclose(sol['e_cap'].loc[dict(run=2)].values,
+                               model.solution['e_cap'].values, equal_nan=True)
+            model.solution['e_cap'] -= 1
@@ -0,0 +1,239 @@
+import os
+import pytest
+import shutil
+import tempfile
+
+import calliope
+from calliope.utils import AttrDict
+from calliope import exceptions
+from . import common
+from .common import assert_almost_equal, solver, solver_io
+
+
+LOCATIONS = {
+    'transmission': """
+        locations:
+            1:
+                techs: []
+            2:
+                techs: ['demand_power']
+                override:
+                    demand_power:
+                        constraints:
+                            r: -90
+            sub1,sub2:
+                within: 1
+                techs: ['ccgt']
+                override:
+                    ccgt:
+                        constraints:
+                            e_cap.max: 60
+        links:
+            1,2:
+                hvac:
+                    constraints:
+                        e_eff: 0.90
+                        e_cap.max: 100
+    """,
+    'storage': """
+        locations:
+            1:
+                techs: ['ccgt', 'test_storage', 'demand_power',
+                        'unmet_demand_power']
+                override:
+                    test_storage:
+                        constraints:
+                            e_cap.max: 0.5
+                            s_init: 0
+                    ccgt:
+                        export: True
+                        constraints:
+                            e_cap.max: 9.5
+                        costs:
+                            monetary:
+                                export: -0.2
+                    demand_power:
+                        x_map: '1: demand'
+                        constraints:
+                            r: file=demand-sin_r.csv
+        links:
+    """,
+    'multi_carrier': """
+        techs:
+            heat_pump:
+                parent: conversion
+                source_carrier: power
+                carrier: heat
+                constraints:
+                    e_eff: 3.0
+                    e_cap.max: 20
+                costs:
+                    monetary:
+                        e_cap: 2
+            demand_heat:
+                parent: demand
+                carrier: heat
+        locations:
+            1:
+                techs: ['ccgt', 'heat_pump', 'demand_power', 'demand_heat']
+                override:
+                    ccgt:
+                        export: True
+                        constraints:
+                            e_cap.max: 60
+                        costs:
+                            monetary:
+                                export: -0.2
+                    demand_power:
+                        constraints:
+                            r: -10
+                    demand_heat:
+                        constraints:
+                            r: -15
+        links:
+    """,
+}
+
+
+def create_model(locations, backend, mode='plan', override=None, path=None):
+    config_run = """
+        mode: {mode}
+        model: ['{{techs}}', '{{locations}}']
+        subset_t: ['2005-01-01', '2005-01-02']
+    """.format(mode=mode)
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(locations.encode('utf-8'))
+        f.read()
+        override_dict = AttrDict({
+            'solver': solver,
+            'solver_io': solver_io,
+            'backend': backend,
+        })
+        if override:
+            override_dict.union(override, allow_override=True)
+        model = common.simple_model(config_run=config_run,
+                                    config_locations=f.name,
+                                    path=path, override=override_dict)
+    return model
+
+
+class TestMatrixBackend:
+    @pytest.fixture(scope='module', params=sorted(LOCATIONS.keys()))
+    def models(self, request):
+        models = {}
+        for backend in ['pyomo', 'matrix']:
+            model = create_model(LOCATIONS[request.param], backend)
+            model.run()
+            models[backend] = model
+        return models
+
+    def test_model_solves(self, models):
+        results = models['matrix'].results
+        assert str(results.solver.termination_condition) == 'optimal'
+
+    def test_same_objective(self, models):
+        costs = {k: float(v.solution['costs'].loc[dict(k='monetary')].sum())
+                 for k, v in models.items()}
+        assert_almost_equal(costs['matrix'], costs['pyomo'], tolerance=1e-4)
+
+    def test_same_export(self, models):
+        if 'export' not in models['pyomo'].solution:
+            pytest.skip('No export in this model')
+        exports = {k: float(v.solution['export'].fillna(0).sum())
+                   for k, v in models.items()}
+        assert_almost_equal(exports['matrix'], exports['pyomo'], tolerance=1e-4)
+
+    def test_same_capacities(self, models):
+        for var in ['e_cap', 'e_cap_net', 's_cap']:
+            pyomo_sol = models['pyomo'].solution[var].fillna(0)
+            matrix_sol = models['matrix'].solution[var]
+            assert pyomo_sol.dims == matrix_sol.dims
+            assert float(abs(pyomo_sol - matrix_sol).max()) < 1e-6
+
+    def test_same_solution_structure(self, models):
+        pyomo_sol = models['pyomo'].solution
+        matrix_sol = models['matrix'].solution
+        assert set(pyomo_sol.data_vars) == set(matrix_sol.data_vars)
+        for var in pyomo_sol.data_vars:
+            assert pyomo_sol[var].dims == matrix_sol[var].dims
+
+    def test_get_var(self, models):
+        for var in ['e_cap', 'es_prod', 'cost']:
+            pyomo_var = models['pyomo'].get_var(var)
+            matrix_var = models['matrix'].get_var(var)
+            assert type(pyomo_var) == type(matrix_var)
+            assert pyomo_var.shape == matrix_var.shape
+
+
+class TestProblemCache:
+    def test_cache_hit(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            override = AttrDict({'problem_cache': cache_dir})
+            model1 = create_model(LOCATIONS['storage'], 'matrix',
+                                  override=override)
+            model1.run()
+            assert len(os.listdir(cache_dir)) == 2
+
+            def read_data(self):
+                raise AssertionError('Data read despite cache hit')
+
+            monkeypatch.setattr(calliope.Model, 'read_data', read_data)
+            model2 = create_model(LOCATIONS['storage'], 'matrix',
+                                  override=override)
+            assert model2.mp.cached
+            model2.run()
+            assert model2.mp.cached
+            assert model2.option_table is None  # Generation was skipped
+            assert_almost_equal(
+                float(model1.solution['e_cap'].sum()),
+                float(model2.solution['e_cap'].sum()), tolerance=1e-6)
+            assert os.path.exists(model2.mp.path)
+
+    def test_cache_miss_on_changed_config(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            override = AttrDict({'problem_cache': cache_dir})
+            model1 = create_model(LOCATIONS['storage'], 'matrix',
+                                  override=override)
+            model1.generate_model()
+            override.set_key('override.techs.ccgt.constraints.e_cap.max', 9)
+            model2 = create_model(LOCATIONS['storage'], 'matrix',
+                                  override=override)
+            model2.generate_model()
+            assert model1.mp.path != model2.mp.path
+            assert len(os.listdir(cache_dir)) == 4
+
+    @pytest.mark.parametrize('filename', ['demand-sin_r.csv', 'set_t.csv'])
+    def test_cache_miss_on_changed_data(self, filename):
+        with tempfile.TemporaryDirectory() as tempdir:
+            cache_dir = os.path.join(tempdir, 'cache')
+            path = os.path.join(tempdir, 'data')
+            shutil.copytree(common._add_test_path('common/t_1h'), path)
+            override = AttrDict({'problem_cache': cache_dir})
+            model1 = create_model(LOCATIONS['storage'], 'matrix',
+                                  override=override, path=path)
+            model1.generate_model()
+            with open(os.path.join(path, filename), 'a') as f:
+                f.write('\n')
+            model2 = create_model(LOCATIONS['storage'], 'matrix',
+                                  override=override, path=path)
+            assert not model2.mp
+            model2.generate_model()
+            assert model1.mp.path != model2.mp.path
+
+
+class TestMatrixBackendErrors:
+    def test_operate_mode(self):
+        model = create_model(LOCATIONS['storage'], 'matrix', mode='operate')
+        with pytest.raises(exceptions.ModelError):
+            model.generate_model(t_start=model.data['t'].to_index()[0])
+
+    def test_unsupported_optional_constraint(self):
+        model = create_model(LOCATIONS['storage'], 'matrix')
+        model.config_model['constraints'] = ['constraints.optional.group_fraction']
+        with pytest.raises(exceptions.ModelError):
+            model.generate_model()
+
+    def test_invalid_backend(self):
+        model = create_model(LOCATIONS['storage'], 'foo')
+        with pytest.raises(exceptions.ModelError):
+            model.generate_model()
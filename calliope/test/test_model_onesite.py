@@ -1,11 +1,47 @@
 import pytest
 import tempfile
 
+from calliope import exceptions
 from calliope.utils import AttrDict
 from . import common
 from .common import assert_almost_equal, solver, solver_io
 
 
+def create_model_with_override(run_override):
+    locations = """
+        locations:
+            1:
+                techs: ['ccgt', 'demand_power']
+                override:
+                    ccgt:
+                        constraints:
+                            e_cap.max: 100
+                    demand_power:
+                        constraints:
+                            r: -50
+        links:
+    """
+    config_run = """
+        mode: plan
+        model: ['{techs}', '{locations}']
+        subset_t: ['2005-01-01', '2005-01-02']
+    """
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(locations.encode('utf-8'))
+        f.read()
+        override_dict = AttrDict({
+            'solver': solver,
+            'solver_io': solver_io,
+        })
+        for k, v in run_override.items():
+            override_dict.set_key(k, v)
+        model = common.simple_model(config_run=config_run,
+                                    config_locations=f.name,
+                                    override=override_dict)
+    model.run()
+    return model
+
+
 class TestModel:
     @pytest.fixture(scope='module')
     def model(self):
@@ -52,3 +88,20 @@ class TestModel:
     def test_model_costs(self, model):
         sol = model.solution
         assert_almost_equal(sol['summary'].to_pandas().loc['ccgt', 'levelized_cost_monetary'], 0.1)
+
+    def test_solution_products_selected(self):
+        selected = create_model_with_override({'output.products': ['summary']})
+        sol = selected.solution
+        # Products needed to compute the summary are added too
+        assert 'summary' in sol and 'levelized_cost' in sol
+        for product in ['capacity_factor', 'metadata', 'groups', 'shares']:
+            assert product not in sol
+        assert_almost_equal(sol['summary'].to_pandas().loc['ccgt', 'levelized_cost_monetary'], 0.1)
+        # Other products are computed on first access
+        shares = selected.get_solution_product('shares')
+        assert 'groups' in selected.solution
+        assert shares.to_pandas().at['ccgt', 'e_prod'] == 1.0
+
+    def test_solution_products_invalid(self):
+        with pytest.raises(exceptions.ModelError):
+            create_model_with_override({'output.products': ['not_a_product']})
@@ -1,6 +1,12 @@
 import pytest  # pylint: disable=unused-import
+import os
 import tempfile
 
+import numpy as np
+import pandas as pd
+import pyomo.core as po  # pylint: disable=import-error
+import xarray as xr
+
 from calliope.utils import AttrDict
 from . import common
 from .common import assert_almost_equal, solver, solver_io, _add_test_path
@@ -133,3 +139,82 @@ class TestModel:
         # because higher output in second case
         assert cost1 == 60
         assert cost2 == 132
+
+    def test_model_stream_windows(self):
+        override = """
+            override:
+                techs:
+                    ccgt:
+                        costs:
+                            monetary:
+                                e_cap: 5
+                                om_fuel: 0.1
+            subset_t: ['2005-01-01', '2005-01-04']
+        """
+        demand = 'demand-blocky_r.csv'
+        model1 = create_and_run_model(override, demand_file=demand)
+        with tempfile.TemporaryDirectory() as tempdir:
+            stream = override + '\n            output.stream: {}'.format(tempdir)
+            model2 = create_and_run_model(stream, demand_file=demand)
+            assert len(os.listdir(tempdir)) > 1
+            sol1, sol2 = model1.solution, model2.solution
+            assert (sol1['t'].to_index() == sol2['t'].to_index()).all()
+            for var in ['e', 's', 'costs', 'ec_prod']:
+                assert_almost_equal(float(abs(sol1[var] - sol2[var]).sum()),
+                                    0, tolerance=0.0000001)
+            model2.solution.close()
+
+    def test_model_stream_windows_encoding(self):
+        override = """
+            subset_t: ['2005-01-01', '2005-01-03']
+            output.encoding: {{dtype: float32}}
+            output.stream: {}
+        """
+        with tempfile.TemporaryDirectory() as tempdir:
+            model = create_and_run_model(override.format(tempdir),
+                                         demand_file='demand-blocky_r.csv')
+            model.solution.close()
+            path = os.path.join(tempdir, sorted(os.listdir(tempdir))[0])
+            with xr.open_dataset(path) as window:
+                assert window['e'].dtype == np.float32
+
+    def test_update_parameters(self):
+        override = """
+            subset_t: ['2005-01-01', '2005-01-03']
+        """
+        model = create_and_run_model(override, demand_file='demand-blocky_r.csv')
+        m = model.m
+        model.data['s_init'].loc[:] = 5
+        model.update_parameters(t_offset=3)
+        r = model.data['r'].loc[dict(y='demand_power', x='1')].values
+        for t in list(m.t)[::7]:
+            shifted = model.time_index.get_loc(t) + 3
+            assert po.value(m.r['demand_power', '1', t]) == r[shifted]
+        for y in m.y_pc:
+            for x in m.x:
+                assert po.value(m.s_init[y, x]) == 5
+        # Applying the same offset again, also given as a time offset,
+        # changes nothing
+        changed = model.update_parameters(t_offset=3)
+        assert all(len(keys) == 0 for keys in changed.values())
+        changed = model.update_parameters(t_offset=pd.Timedelta(hours=3))
+        assert all(len(keys) == 0 for keys in changed.values())
+        # A different offset changes r
+        changed = model.update_parameters(t_offset=4)
+        assert len(changed['r']) > 0
+
+    def test_shift_variable_values(self):
+        override = """
+            subset_t: ['2005-01-01', '2005-01-03']
+        """
+        model = create_and_run_model(override, iterative_warmstart=True,
+                                     demand_file='demand-blocky_r.csv')
+        m = model.m
+        t = list(m.t)
+        before = {i: m.es_prod['power', 'ccgt', '1', i].value for i in t}
+        model.shift_variable_values(2)
+        for i, j in zip(t[:-2], t[2:]):
+            assert m.es_prod['power', 'ccgt', '1', i].value == before[j]
+        assert m.es_prod['power', 'ccgt', '1', t[-1]].value == before[t[-1]]
+        # Variables not indexed over time are left as they are
+        assert m.e_cap['ccgt', '1'].value is not None
@@ -1,3 +1,4 @@
+import os
 import pytest  # pylint: disable=unused-import
 import tempfile
 
@@ -61,6 +62,47 @@ class TestModel:
         sol = model.solution
         assert sol['e'].loc[dict(c='power', y='ccgt')].sum(dim=['x', 't']) == 1320
 
+    def test_model_time_res_uniform_chunked(self):
+        pytest.importorskip('dask')
+        override = """
+            time: {function: resample, function_options: {'resolution': '1D'}}
+            data_chunks: 24
+        """
+        model = create_and_run_model(override)
+        assert len(model.data['_time_res']) == 4
+        assert str(model.results.solver.termination_condition) == 'optimal'
+        sol = model.solution
+        assert sol['e'].loc[dict(c='power', y='ccgt')].sum(dim=['x', 't']) == 1320
+        # The unadjusted time series stay on disk, not in memory
+        assert model.data_original['r'].chunks is not None
+        assert len(os.listdir(model._data_chunks_dir.name)) > 0
+
+    @pytest.mark.parametrize('time', [
+        # Masks only compute the reduced series they select on
+        "{masks: [{function: extreme, options: {tech: demand_power, how: min}}], "
+        "function: resample, function_options: {'resolution': '6H'}}",
+        # Clustering loads the data it clusters
+        "{function: apply_clustering, function_options: "
+        "{clustering_func: get_clusters_hierarchical, how: closest, k: 2}}",
+    ])
+    def test_model_time_chunked_matches_unchunked(self, time):
+        pytest.importorskip('dask')
+        override = """
+            time: {}
+        """.format(time)
+        model = create_and_run_model(override)
+        chunked = create_and_run_model(override + """
+            data_chunks: 24
+        """)
+        assert (chunked.data['_time_res'].to_index() ==
+                model.data['_time_res'].to_index()).all()
+        assert (chunked.data['_time_res'].values ==
+                model.data['_time_res'].values).all()
+        assert str(chunked.results.solver.termination_condition) == 'optimal'
+        e = dict(c='power', y='ccgt')
+        assert (float(chunked.solution['e'].loc[e].sum(dim=['x', 't'])) ==
+                float(model.solution['e'].loc[e].sum(dim=['x', 't'])))
+
     def test_model_time_res_uniform_subset_t_from_start(self):
         override = """
             time: {function: resample, function_options: {'resolution': '1D'}}
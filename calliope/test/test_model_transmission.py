@@ -63,3 +63,44 @@ class TestModel:
     def test_model_costs(self, model):
         sol = model.solution
         assert_almost_equal(sol['summary'].to_pandas().loc['ccgt', 'levelized_cost_monetary'], 0.1)
+
+    def test_sparse_dispatch_sets(self, model):
+        cyx_prod = model._sets['cyx_prod']
+        assert ('power', 'ccgt', 'sub1') in cyx_prod
+        assert ('power', 'ccgt', '2') not in cyx_prod
+        assert ('power', 'demand_power', '1') not in cyx_prod
+        assert len(model.m.es_prod) == len(cyx_prod) * len(model.m.t)
+        # Extraction fills in the full (c, y, x, t) coordinates
+        es_prod = model.get_var('es_prod')
+        assert es_prod.loc[dict(c='power', y='ccgt', x='2')].sum() == 0
+        assert es_prod.shape == (len(model._sets['c']), len(model._sets['y']),
+                                 len(model._sets['x']), len(model.m.t))
+
+    def test_get_var_array(self, model):
+        es_prod = model.get_var('es_prod')
+        assert es_prod.dims == ('c', 'y', 'x', 't')
+        # Positions are computed once and reused
+        assert model.get_var('es_prod').equals(es_prod)
+        key = ('power', 'ccgt', 'sub1', model.m.t.first())
+        assert (es_prod.loc[dict(c='power', y='ccgt', x='sub1')][0]
+                == model.m.es_prod[key].value)
+
+    def test_get_var_extracted_once(self, model, monkeypatch):
+        model.get_var('es_prod')
+        model.get_ec('prod')
+
+        def _get_var(*args, **kwargs):
+            raise AssertionError('Variable extracted again')
+
+        monkeypatch.setattr(model, '_get_var', _get_var)
+        model.get_var('es_prod')
+        # Without parasitics, ec is es
+        assert model.get_ec('prod').equals(model.get_var('es_prod'))
+
+    @pytest.mark.parametrize('get, arg', [('get_var', 'es_prod'),
+                                          ('get_ec', 'prod')])
+    def test_get_var_returns_copy(self, model, get, arg):
+        es_prod = getattr(model, get)(arg)
+        expected = es_prod.copy()
+        es_prod.loc[dict(c='power')] = -1
+        assert getattr(model, get)(arg).equals(expected)
@@ -0,0 +1,55 @@
+import pytest  # pylint: disable=unused-import
+import tempfile
+
+import calliope
+from calliope import exceptions, synthetic
+from calliope.utils import AttrDict
+from .common import solver, solver_io
+
+
+def _make_model(path, **kwargs):
+    return synthetic.make_model(path, n_locations=3, n_techs=3,
+                                n_timesteps=48, seed=1, solver=solver,
+                                **kwargs)
+
+
+class TestSynthetic:
+    def test_model_sets(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            run_path = _make_model(tempdir, carriers=('power', 'heat'))
+            model = calliope.Model(run_path)
+        assert model._sets['x'] == ['loc_0', 'loc_1', 'loc_2']
+        assert len(model._sets['t']) == 48
+        assert sorted(model._sets['c']) == ['heat', 'power']
+        assert set(model._sets['y']) >= {
+            'supply_0', 'supply_1', 'storage_2', 'conversion_heat',
+            'demand_power', 'demand_heat', 'unmet_demand_power',
+            'unmet_demand_heat'
+        }
+        assert (model.data['r'].loc[{'y': 'demand_heat'}] < 0).all()
+
+    def test_seed(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            config_a = AttrDict.from_yaml(synthetic.make_model(
+                tempdir + '/a', n_locations=10, link_density=0.5, seed=2
+            ).replace('run.yaml', 'model_config/locations.yaml'))
+            config_b = AttrDict.from_yaml(synthetic.make_model(
+                tempdir + '/b', n_locations=10, link_density=0.5, seed=2
+            ).replace('run.yaml', 'model_config/locations.yaml'))
+        assert config_a.links.keys() == config_b.links.keys()
+        # Chain of links through all locations, plus random links
+        assert len(config_a.links) >= 9
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            run_path = _make_model(tempdir)
+            model = calliope.Model(run_path,
+                                   override=AttrDict({'solver_io': solver_io}))
+            model.run()
+        assert str(model.results.solver.termination_condition) == 'optimal'
+        assert model.solution['e_cap'].sum() > 0
+
+    def test_invalid_size(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            with pytest.raises(exceptions.ModelError):
+                synthetic.make_model(tempdir, n_locations=0)
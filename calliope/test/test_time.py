@@ -1,6 +1,10 @@
 import pytest  # pylint: disable=unused-import
 
-# import pandas as pd
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from calliope import time_funcs
 
 # import calliope
 
@@ -79,3 +83,32 @@ import pytest  # pylint: disable=unused-import
 
 #     def test_reduce_cut(self, df):
 #         pass
+
+
+class TestConstantParams:
+    @pytest.fixture
+    def t(self):
+        return pd.date_range('2005-01-01', periods=4, freq='1H')
+
+    def test_reduce_constant_t(self, t):
+        values = np.array([[[1.0, 1.0, 1.0, 1.0], [np.nan] * 4]])
+        array = xr.DataArray(values, dims=['y', 'x', 't'],
+                             coords={'y': ['a'], 'x': ['1', '2'], 't': t})
+        reduced = time_funcs.reduce_constant_t(array)
+        assert reduced.dims == ('y', 'x')
+        assert reduced.loc[{'y': 'a', 'x': '1'}] == 1.0
+
+    def test_reduce_varying_t(self, t):
+        values = np.array([[[1.0, 1.0, 2.0, 1.0], [0.0] * 4]])
+        array = xr.DataArray(values, dims=['y', 'x', 't'],
+                             coords={'y': ['a'], 'x': ['1', '2'], 't': t})
+        assert time_funcs.reduce_constant_t(array) is array
+
+    def test_broadcast_t(self, t):
+        array = xr.DataArray([[True, False]], dims=['y', 'x'],
+                             coords={'y': ['a'], 'x': ['1', '2']})
+        broadcast = time_funcs.broadcast_t(array, t)
+        assert broadcast.dtype == bool
+        assert len(broadcast['t']) == 4
+        assert broadcast.loc[{'x': '1'}].values.all()
+        assert not broadcast.loc[{'x': '2'}].values.any()
@@ -11,6 +11,7 @@ Functions to process time series data.
 
 import logging
 
+import numpy as np
 import pandas as pd
 import xarray as xr
 from xarray.ufuncs import fabs  # pylint: disable=no-name-in-module
@@ -19,6 +20,36 @@ from . import utils
 from . import time_clustering
 
 
+def reduce_constant_t(array):
+    """
+    Return ``array`` without its ``t`` dimension if its values are
+    constant over time for every other index, else return it unchanged.
+
+    """
+    if 't' not in array.dims:
+        return array
+    # Compared with DataArray operations, so that Dask-backed arrays
+    # are reduced chunk by chunk rather than loaded in full
+    first = array.isel(t=0, drop=True)
+    same = (array == first) | (array.isnull() & first.isnull())
+    if bool(same.all()):
+        return first
+    return array
+
+
+def broadcast_t(array, t):
+    """
+    Return ``array`` broadcast along the ``t`` coordinate ``t``, if it
+    was stored without a ``t`` dimension by
+    :func:`~calliope.time_funcs.reduce_constant_t`.
+
+    """
+    if 't' in array.dims:
+        return array
+    t = xr.DataArray(np.zeros(len(t)), coords={'t': t}, dims=['t'])
+    return xr.broadcast(array, t)[0]
+
+
 def normalized_copy(data):
     """
     Return a copy of data, with the absolute taken and normalized to 0-1.
@@ -30,12 +61,12 @@ def normalized_copy(data):
     data_vars_in_t = [v for v in time_clustering._get_datavars(data)
                       if 't' in data[v].dims]
     for var in data_vars_in_t:
-        for y in ds.coords['y'].values:
-            # Get max across all regions to normalize against
-            norm_max = fabs(ds[var].loc[{'y': y}]).max()
-            for x in ds.coords['x'].values:
-                df = ds[var].loc[{'x': x, 'y': y}]
-                ds[var].loc[{'x': x, 'y': y}] = fabs(df) / norm_max
+        # Get max for each y across all regions to normalize against.
+        # Assigning whole arrays rather than per-(x, y) slices also
+        # keeps chunked data lazy
+        other_dims = [i for i in ds[var].dims if i != 'y']
+        norm_max = fabs(ds[var]).max(dim=other_dims)
+        ds[var] = fabs(ds[var]) / norm_max
     return ds
 
 
@@ -132,6 +163,13 @@ _RESAMPLE_METHODS = {
 
 
 def resample(data, timesteps, resolution):
+    # Variables without a `t` dimension are constant over time and are
+    # carried over as they are, except for those that are summed
+    data = data.copy()
+    for var, how in _RESAMPLE_METHODS.items():
+        if how == 'sum' and var in data:
+            data[var] = broadcast_t(data[var], data['t'])
+
     data_new = data.copy(deep=True)
     if timesteps is not None:
         data_new = data_new.loc[{'t': timesteps}]
@@ -0,0 +1,88 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+time_index.py
+~~~~~~~~~~~~~
+
+Precomputed navigation over the model's time steps, so that constraint
+rules can look up neighbouring timesteps and per-timestep resolution
+and weights in constant time.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import exceptions
+
+
+class TimeIndex(object):
+    """
+    Position map, previous/next timestep arrays and per-timestep
+    ``time_res`` and ``weights`` arrays for the ``t`` coordinate of
+    the given model data.
+
+    """
+    def __init__(self, data):
+        self.index = data['t'].to_index()
+        self.pos = {t: i for i, t in enumerate(self.index)}
+        timesteps = list(self.index)
+        self.prev = np.array([None] + timesteps[:-1], dtype=object)
+        self.next = np.array(timesteps[1:] + [None], dtype=object)
+        self.time_res = data['_time_res'].to_series().reindex(self.index).values
+        if '_weights' in data:
+            self.weights = data['_weights'].to_series().reindex(self.index).values
+        else:
+            self.weights = np.ones(len(self.index))
+        self.time_res_sum = float((self.time_res * self.weights).sum())
+
+    def __len__(self):
+        return len(self.index)
+
+    def get_loc(self, timestamp):
+        return self.pos[timestamp]
+
+    def get_t(self, timestamp, offset=0):
+        """
+        Get a timestamp before/after (by offset) from the given timestamp.
+        Raises ModelError if out of bounds.
+
+        """
+        if isinstance(offset, pd.Timedelta):
+            loc = self.pos[timestamp + offset]
+        else:  # integer
+            loc = self.pos[timestamp] + offset
+        if loc < 0:
+            raise exceptions.ModelError(
+                'Attempted to get a timestep before the first one.'
+            )
+        elif loc >= len(self.index):
+            raise exceptions.ModelError(
+                'Attempted to get a timestep beoynd the last one.'
+            )
+        return self.index[loc]
+
+    def prev_t(self, timestamp):
+        """Return the timestep prior to the given timestep."""
+        prev = self.prev[self.pos[timestamp]]
+        if prev is None:
+            raise exceptions.ModelError(
+                'Attempted to get a timestep before the first one.'
+            )
+        return prev
+
+    def next_t(self, timestamp):
+        """Return the timestep following the given timestep."""
+        nxt = self.next[self.pos[timestamp]]
+        if nxt is None:
+            raise exceptions.ModelError(
+                'Attempted to get a timestep beoynd the last one.'
+            )
+        return nxt
+
+    def get_time_res(self, timestamp):
+        return self.time_res[self.pos[timestamp]]
+
+    def get_weight(self, timestamp):
+        return self.weights[self.pos[timestamp]]
@@ -547,6 +547,14 @@ def depreciation_getter(option_getter_func):
     return get_depreciation_rate
 
 
+def _sel_yxt(array, y, x, t):
+    # Parameters constant over time are stored without a `t` dimension
+    if 't' in array.dims:
+        return array.sel(y=y, x=x, t=t)
+    else:
+        return array.sel(y=y, x=x)
+
+
 def any_option_getter(model):
     """
     Get any option from the given Model or SolutionModel, including
@@ -561,7 +569,7 @@ def any_option_getter(model):
             if t and x:
                 y, cost_type, k, cost = option.split('.')
                 try:
-                    return model.data['_'.join([cost_type,k,cost])].sel(y=y,x=x,t=t)
+                    return _sel_yxt(model.data['_'.join([cost_type,k,cost])], y, x, t)
                 except:
                     return model.get_cost(cost, y, k, x=x, costs_type=cost_type)
             elif t and not x:
@@ -576,7 +584,7 @@ def any_option_getter(model):
                 y = option.split('.', 1)[0]
                 field = option.rsplit('.', 1)[-1]
                 try:
-                    return model.data[field].sel(y=y,x=x,t=t)
+                    return _sel_yxt(model.data[field], y, x, t)
                 except:
                     return model.get_option(option, x=x)
             elif t and not x:
@@ -0,0 +1,155 @@
+"""
+Copyright (C) 2013-2017 Stefan Pfenninger.
+Licensed under the Apache 2.0 License (see LICENSE file).
+
+validation.py
+~~~~~~~~~~~~~
+
+Validation of model input data, collecting every violation found into
+a single report instead of stopping at the first one.
+
+"""
+
+import collections
+import warnings
+
+import xarray as xr
+
+from . import exceptions
+
+
+Violation = collections.namedtuple(
+    'Violation', ['level', 'check', 'param', 'y', 'x', 'message']
+)
+
+
+class ValidationReport(object):
+    """
+    Violations found while reading and validating model data. Each
+    violation has a ``level`` of ``'error'`` or ``'warning'``, the
+    name of the ``check`` that found it, the ``param``, tech ``y`` and
+    location ``x`` it applies to (any of which may be None), and a
+    ``message``.
+
+    """
+    def __init__(self):
+        self.violations = []
+
+    def add(self, level, check, message, param=None, y=None, x=None):
+        self.violations.append(Violation(level, check, param, y, x, message))
+
+    @property
+    def errors(self):
+        return [i for i in self.violations if i.level == 'error']
+
+    @property
+    def warnings(self):
+        return [i for i in self.violations if i.level == 'warning']
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.violations, columns=Violation._fields)
+
+    @staticmethod
+    def _format(violations):
+        lines = []
+        for v in violations:
+            where = ', '.join('{}: {}'.format(k, getattr(v, k))
+                              for k in ['param', 'y', 'x']
+                              if getattr(v, k) is not None)
+            lines.append('* [{}] {}{}'.format(
+                v.check, v.message, ' ({})'.format(where) if where else ''
+            ))
+        return '\n'.join(lines)
+
+    def raise_or_warn(self):
+        """
+        Raise a ModelError listing all errors if there are any, else
+        issue a single ModelWarning listing all warnings.
+
+        """
+        if self.errors:
+            e = exceptions.ModelError
+            raise e('Model data failed validation with {} error(s):\n'
+                    '{}'.format(len(self.errors), self._format(self.errors)))
+        elif self.warnings:
+            message = ('Model data validation issued {} warning(s):\n'
+                       '{}'.format(len(self.warnings),
+                                   self._format(self.warnings)))
+            warnings.warn(message, exceptions.ModelWarning)
+
+
+def _get_allowed(model, dataset):
+    """
+    Returns a boolean (y, x) DataArray of the techs allowed at each
+    location.
+
+    """
+    y = list(dataset['y'].values)
+    x = list(dataset['x'].values)
+    allowed = model._locations.loc[x, y] != 0
+    return xr.DataArray(allowed.values.T.astype(bool), dims=['y', 'x'],
+                        coords={'y': y, 'x': x})
+
+
+def _add_violations(report, bad, level, check, message, param=None):
+    """
+    Add a violation for each True entry of the boolean (y, x)
+    DataArray ``bad``.
+
+    """
+    s = bad.transpose('y', 'x').to_series()
+    for y, x in s[s].index:
+        report.add(level, check, message, param=param, y=y, x=x)
+
+
+def check_resource_sign(model, dataset, report):
+    """Demand resource must be <=0, and supply resource >=0, at all times."""
+    # FIXME update these checks on implementing conditional param updates.
+    r = dataset['r']
+    allowed = _get_allowed(model, dataset)
+    y_def_r = [y for y in r['y'].values if y in model._sets['y_def_r']]
+    parents = {y: model.get_parent(y) for y in y_def_r}
+    checks = [('demand', r > 0, 'Demand resource must be <=0'),
+              ('supply', r < 0, 'Supply resource must be >=0')]
+    for base_tech, invalid, message in checks:
+        ys = [y for y in y_def_r if parents[y] == base_tech]
+        if not ys:
+            continue
+        bad = invalid.loc[{'y': ys}].any(dim='t') & allowed.loc[{'y': ys}]
+        _add_violations(report, bad, 'error', 'resource_sign', message,
+                        param='r')
+
+
+def check_nans(model, dataset, report):
+    """
+    Time series read from file must not contain NaNs where the tech is
+    allowed, since these are set to 0 before the model is built.
+
+    """
+    allowed = _get_allowed(model, dataset)
+    for param in model.config_model.timeseries_constraints:
+        da = dataset[param]
+        ys = [y for y in da['y'].values
+              if y in model._sets['y_def_' + param]]
+        if not ys:
+            continue
+        other_dims = [i for i in da.dims if i not in ['y', 'x']]
+        nans = da.loc[{'y': ys}].isnull()
+        if other_dims:
+            nans = nans.any(dim=other_dims)
+        bad = nans & allowed.loc[{'y': ys}]
+        _add_violations(report, bad, 'warning', 'nan',
+                        'Contains NaN values, which were set to 0',
+                        param=param)
+
+
+def validate_dataset(model, dataset, report):
+    """
+    Run all checks on the assembled model ``dataset``, adding any
+    violations found to ``report``.
+
+    """
+    check_resource_sign(model, dataset, report)
+    check_nans(model, dataset, report)
+    return report